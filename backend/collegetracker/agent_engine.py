@@ -1,14 +1,42 @@
+import functools
 import os
 import time
 import logging
-from typing import Generator, Dict, Any, List, Optional
+from typing import AsyncGenerator, Generator, Dict, Any, List, Optional
+import numpy as np
+from asgiref.sync import sync_to_async
 from google import genai
 from google.genai import types
 from collegetracker import agent_tools
 from collegetracker.models import ChatMessage, AICallLog
+from collegetracker.answer_cache import CachedAnswer, get_answer_cache, is_cacheable_prompt
+from collegetracker.embeddings import get_query_embeddings
 
 logger = logging.getLogger(__name__)
 
+OFFLINE_MESSAGE = "Wormie AI is currently offline. Please configure GEMINI_API_KEY."
+
+
+def _chunk_text(chunk) -> str:
+    """Text parts of a streamed chunk; function-call chunks between tool rounds have none."""
+    if not chunk.candidates or not chunk.candidates[0].content or not chunk.candidates[0].content.parts:
+        return ""
+    return "".join(part.text for part in chunk.candidates[0].content.parts if part.text and not part.thought)
+
+
+def _as_async_tool(func):
+    """
+    Wraps a tool closure as a coroutine for the async client's automatic function
+    calling. functools.wraps keeps the signature and docstring the SDK builds the
+    function declaration from.
+    """
+    run = sync_to_async(func)
+
+    @functools.wraps(func)
+    async def tool(*args, **kwargs):
+        return await run(*args, **kwargs)
+    return tool
+
 
 class WormieManagedAgent:
     """
@@ -120,6 +148,120 @@ AGENT INSTRUCTIONS:
 - Be encouraging, highly knowledgeable, and data-driven. Use bolding for key statistics.
 """
 
+    def _ensure_client(self):
+        if not self.api_key:
+            self.api_key = os.environ.get("GEMINI_API_KEY")
+            if self.api_key:
+                self.client = genai.Client(api_key=self.api_key)
+        return self.client
+
+    def _build_config(self, user, tools) -> types.GenerateContentConfig:
+        return types.GenerateContentConfig(
+            system_instruction=self._build_system_prompt(user),
+            tools=tools,
+            temperature=0.7,
+        )
+
+    def _models_to_try(self) -> List[str]:
+        models_to_try = [self.model_name]
+        if self.model_name != "gemini-flash-latest":
+            models_to_try.append("gemini-flash-latest")
+        return models_to_try
+
+    @staticmethod
+    def _history_contents(chat_history: Optional[List[Dict[str, Any]]]) -> Optional[List[types.Content]]:
+        """Format history for Google GenAI SDK if provided"""
+        history_contents = []
+        if chat_history:
+            for msg in chat_history[-6:]:
+                role = msg.get("role")
+                parts = msg.get("parts", [""])
+                text_val = parts[0] if isinstance(parts, list) and parts else str(parts)
+                if role and text_val:
+                    history_contents.append(
+                        types.Content(
+                            role="user" if role == "user" else "model",
+                            parts=[types.Part.from_text(text=text_val)]
+                        )
+                    )
+        return history_contents if history_contents else None
+
+    @staticmethod
+    def _should_try_next_model(model_candidate: str, err: Exception, streamed_text: str) -> bool:
+        if streamed_text:
+            # Part of the answer already reached the client; another model would repeat it
+            raise err
+        err_str = str(err).lower()
+        if "429" in err_str or "quota" in err_str or "404" in err_str:
+            logger.warning(f"Model {model_candidate} hit quota/error ({err}), trying next candidate...")
+            return True
+        logger.error(f"Error calling {model_candidate}: {err}")
+        return False
+
+    @staticmethod
+    def _save_reply(user, full_response_text: str):
+        # Persist chat history to database
+        if user and user.is_authenticated and full_response_text:
+            ChatMessage.objects.create(
+                user=user,
+                role="model",
+                content=full_response_text
+            )
+
+    def _embed(self, text: str) -> np.ndarray:
+        return np.asarray(get_query_embeddings().embed_query(text), dtype=np.float32)
+
+    def _cached_answer(self, user_message: str, chat_history: Optional[List[Dict[str, Any]]] = None):
+        """
+        Look the prompt up in the semantic answer cache. Returns the cached
+        answer (or None) and the prompt embedding, which _cache_answer reuses
+        to store a freshly generated answer. Prompts with a conversation
+        before them bypass the cache both ways: "What is the average SAT
+        score?" after a question about MIT is about MIT, which the prompt
+        alone doesn't say.
+        """
+        cache = get_answer_cache()
+        if cache is None or chat_history or not is_cacheable_prompt(user_message):
+            return None, None
+        cached = cache.get_exact(user_message)
+        if cached:
+            return cached, None
+        try:
+            vector = self._embed(user_message)
+        except Exception as e:
+            logger.warning(f"Answer cache embedding failed: {e}")
+            return None, None
+        return cache.lookup(user_message, vector), vector
+
+    @staticmethod
+    def _cache_answer(user, user_message: str, vector: Optional[np.ndarray], full_response_text: str,
+                      executed_actions: List[str], start_time: float):
+        # Only guest answers are shared: a signed-in student's reply can draw on
+        # their profile, and replies that took actions are not answers to reuse
+        cache = get_answer_cache()
+        if cache is None or vector is None or executed_actions or (user and user.is_authenticated):
+            return
+        cache.store(user_message, vector, full_response_text, int((time.perf_counter() - start_time) * 1000))
+
+    @staticmethod
+    def _log_call(user, user_message: str, full_response_text: str, start_time: float,
+                  first_token_time: Optional[float], success: bool, cached: Optional[CachedAnswer] = None):
+        latency_ms = int((time.perf_counter() - start_time) * 1000)
+        ttfb_ms = int((first_token_time - start_time) * 1000) if first_token_time else None
+        try:
+            AICallLog.objects.create(
+                user=user if user and user.is_authenticated else None,
+                prompt_summary=user_message[:500],
+                response_summary=full_response_text[:1000],
+                latency_ms=latency_ms,
+                ttfb_ms=ttfb_ms,
+                success=success,
+                cache_hit=cached is not None,
+                latency_saved_ms=max(0, cached.latency_ms - latency_ms) if cached else None
+            )
+        except Exception as log_err:
+            logger.error(f"Error saving AICallLog: {log_err}")
+
     def stream_chat(
         self,
         user_message: str,
@@ -128,118 +270,146 @@ AGENT INSTRUCTIONS:
     ) -> Generator[str, None, None]:
         """
         Executes the agent loop with streaming output and automatic tool calling.
-        Yields text chunks for HTTP streaming.
+        Yields text chunks for HTTP streaming as the model produces them.
         """
-        if not self.api_key:
-            self.api_key = os.environ.get("GEMINI_API_KEY")
-            if self.api_key:
-                self.client = genai.Client(api_key=self.api_key)
+        if not self._ensure_client():
+            yield OFFLINE_MESSAGE
+            return
 
-        if not self.client:
-            yield "Wormie AI is currently offline. Please configure GEMINI_API_KEY."
+        start_time = time.perf_counter()
+        cached, prompt_vector = self._cached_answer(user_message, chat_history)
+        if cached:
+            first_token_time = time.perf_counter()
+            try:
+                yield cached.answer
+                self._save_reply(user, cached.answer)
+            finally:
+                self._log_call(user, user_message, cached.answer, start_time, first_token_time, True, cached)
             return
 
-        start_time = time.time()
+        first_token_time = None
         full_response_text = ""
         success = True
         executed_actions: List[str] = []
 
-        tools = self._build_tools_for_user(user, executed_actions)
-        system_instruction = self._build_system_prompt(user)
+        config = self._build_config(user, self._build_tools_for_user(user, executed_actions))
+        history_contents = self._history_contents(chat_history)
 
-        config = types.GenerateContentConfig(
-            system_instruction=system_instruction,
-            tools=tools,
-            temperature=0.7,
-        )
+        try:
+            last_error = None
+            for model_candidate in self._models_to_try():
+                try:
+                    chat = self.client.chats.create(model=model_candidate, config=config, history=history_contents)
 
-        models_to_try = [self.model_name]
-        if self.model_name != "gemini-flash-latest":
-            models_to_try.append("gemini-flash-latest")
+                    # The SDK runs the tool calls between streamed rounds; forward text as it arrives
+                    for chunk in chat.send_message_stream(user_message):
+                        text = _chunk_text(chunk)
+                        if not text:
+                            continue
+                        if first_token_time is None:
+                            first_token_time = time.perf_counter()
+                        full_response_text += text
+                        yield text
+                    if full_response_text:
+                        break
+                except Exception as candidate_err:
+                    last_error = candidate_err
+                    if not self._should_try_next_model(model_candidate, candidate_err, full_response_text):
+                        break
+
+            if not full_response_text:
+                raise last_error or Exception("No response generated from AI.")
+
+            # Ensure any executed actions have their badge tag in the response
+            for tag in executed_actions:
+                if tag not in full_response_text:
+                    full_response_text += f"\n\n{tag}"
+                    yield f"\n\n{tag}"
+
+            self._save_reply(user, full_response_text)
+            self._cache_answer(user, user_message, prompt_vector, full_response_text, executed_actions, start_time)
+
+        except Exception as e:
+            success = False
+            logger.error(f"Error in WormieManagedAgent: {e}", exc_info=True)
+            yield f"\n[Agent Notification: {str(e)}]"
+        finally:
+            # Also reached when the client disconnects mid-stream (GeneratorExit)
+            self._log_call(user, user_message, full_response_text, start_time, first_token_time, success)
 
-        chat = None
-        last_error = None
+    async def astream_chat(
+        self,
+        user_message: str,
+        user=None,
+        chat_history: Optional[List[Dict[str, Any]]] = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        Async counterpart of stream_chat for the ASGI chat view. Gemini round trips
+        are awaited on the event loop and the ORM-backed tools run through
+        sync_to_async, so an open chat does not hold a server thread.
+        """
+        if not self._ensure_client():
+            yield OFFLINE_MESSAGE
+            return
 
-        for model_candidate in models_to_try:
+        start_time = time.perf_counter()
+        cached, prompt_vector = await sync_to_async(self._cached_answer)(user_message, chat_history)
+        if cached:
+            first_token_time = time.perf_counter()
             try:
-                # Format history for Google GenAI SDK if provided
-                history_contents = []
-                if chat_history:
-                    for msg in chat_history[-6:]:
-                        role = msg.get("role")
-                        parts = msg.get("parts", [""])
-                        text_val = parts[0] if isinstance(parts, list) and parts else str(parts)
-                        if role and text_val:
-                            history_contents.append(
-                                types.Content(
-                                    role="user" if role == "user" else "model",
-                                    parts=[types.Part.from_text(text=text_val)]
-                                )
-                            )
-
-                chat = self.client.chats.create(
-                    model=model_candidate,
-                    config=config,
-                    history=history_contents if history_contents else None
-                )
-
-                response = chat.send_message(user_message)
-                if response and response.text:
-                    full_response_text = response.text
-                    break
-            except Exception as candidate_err:
-                last_error = candidate_err
-                err_str = str(candidate_err).lower()
-                if "429" in err_str or "quota" in err_str or "404" in err_str:
-                    logger.warning(f"Model {model_candidate} hit quota/error ({candidate_err}), trying next candidate...")
-                    continue
-                else:
-                    logger.error(f"Error calling {model_candidate}: {candidate_err}")
-                    break
+                yield cached.answer
+                await sync_to_async(self._save_reply)(user, cached.answer)
+            finally:
+                await sync_to_async(self._log_call)(user, user_message, cached.answer, start_time,
+                                                    first_token_time, True, cached)
+            return
+
+        first_token_time = None
+        full_response_text = ""
+        success = True
+        executed_actions: List[str] = []
+
+        tools = [_as_async_tool(tool) for tool in self._build_tools_for_user(user, executed_actions)]
+        config = self._build_config(user, tools)
+        history_contents = self._history_contents(chat_history)
 
         try:
+            last_error = None
+            for model_candidate in self._models_to_try():
+                try:
+                    chat = self.client.aio.chats.create(model=model_candidate, config=config, history=history_contents)
+
+                    async for chunk in await chat.send_message_stream(user_message):
+                        text = _chunk_text(chunk)
+                        if not text:
+                            continue
+                        if first_token_time is None:
+                            first_token_time = time.perf_counter()
+                        full_response_text += text
+                        yield text
+                    if full_response_text:
+                        break
+                except Exception as candidate_err:
+                    last_error = candidate_err
+                    if not self._should_try_next_model(model_candidate, candidate_err, full_response_text):
+                        break
+
             if not full_response_text:
-                if last_error:
-                    raise last_error
-                else:
-                    raise Exception("No response generated from AI.")
+                raise last_error or Exception("No response generated from AI.")
 
-            # Ensure any executed actions have their badge tag in the response
             for tag in executed_actions:
                 if tag not in full_response_text:
                     full_response_text += f"\n\n{tag}"
+                    yield f"\n\n{tag}"
 
-            # Stream chunks (e.g. by words/phrases) for smooth real-time rendering in frontend
-            words = full_response_text.split(" ")
-            chunk_size = 4
-            for i in range(0, len(words), chunk_size):
-                chunk = " ".join(words[i:i + chunk_size])
-                if i + chunk_size < len(words):
-                    chunk += " "
-                yield chunk
-                time.sleep(0.015)
-
-            # Persist chat history to database
-            if user and user.is_authenticated and full_response_text:
-                ChatMessage.objects.create(
-                    user=user,
-                    role="model",
-                    content=full_response_text
-                )
+            await sync_to_async(self._save_reply)(user, full_response_text)
+            await sync_to_async(self._cache_answer)(user, user_message, prompt_vector, full_response_text,
+                                                    executed_actions, start_time)
 
         except Exception as e:
             success = False
             logger.error(f"Error in WormieManagedAgent: {e}", exc_info=True)
             yield f"\n[Agent Notification: {str(e)}]"
         finally:
-            latency_ms = int((time.time() - start_time) * 1000)
-            try:
-                AICallLog.objects.create(
-                    user=user if user and user.is_authenticated else None,
-                    prompt_summary=user_message[:500],
-                    response_summary=full_response_text[:1000],
-                    latency_ms=latency_ms,
-                    success=success
-                )
-            except Exception as log_err:
-                logger.error(f"Error saving AICallLog: {log_err}")
+            await sync_to_async(self._log_call)(user, user_message, full_response_text, start_time,
+                                                first_token_time, success)
@@ -2,6 +2,7 @@ import logging
 from typing import Dict, Any, List, Optional
 from django.db.models import Q
 from collegetracker.models import College, Bookmark, LeadStatus, User
+from collegetracker.text_search import match_filter
 
 logger = logging.getLogger(__name__)
 
@@ -82,10 +83,14 @@ def search_colleges(
         if min_sat:
             queryset = queryset.filter(sat_score__gte=min_sat)
         if major_keyword:
-            queryset = queryset.filter(
-                Q(top_major__icontains=major_keyword) |
-                Q(programs__cipdesc__icontains=major_keyword)
-            ).distinct()
+            major_match = match_filter(major_keyword, fields=('top_major', 'programs'))
+            if major_match is not None:
+                queryset = queryset.filter(major_match)
+            else:
+                queryset = queryset.filter(
+                    Q(top_major__icontains=major_keyword) |
+                    Q(programs__cipdesc__icontains=major_keyword)
+                ).distinct()
 
         results = []
         for c in queryset[:min(limit, 10)]:
@@ -0,0 +1,235 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+from django.conf import settings
+
+from collegetracker.data_version import get_data_version, versioned_cache, COLLEGE_DATA
+from collegetracker.models import College
+
+logger = logging.getLogger(__name__)
+
+# Questions about the asker can't be answered from someone else's reply: their
+# own profile or plans, their odds, and requests for agent actions. Follow-ups
+# ("What about the acceptance rate?") are kept out by the caller, which skips
+# the cache whenever the prompt has conversation history.
+PERSONAL_PATTERN = re.compile(
+    r"\b(i|i'm|im|i've|i'd|i'll|me|my|mine|myself|we|we're|our|ours|"
+    r"chance|chances|odds|bookmark|bookmarks|bookmarked|save|saved|connect|recruiter|recruiters)\b",
+    re.IGNORECASE,
+)
+
+# Capitalized words that are just sentence structure, not names
+QUESTION_WORDS = {'what', 'whats', "what's", 'which', 'who', 'how', 'where', 'when', 'why', 'tell', 'is', 'are',
+                  'does', 'do', 'can', 'should', 'compare', 'list', 'show', 'give', 'find', 'the', 'a', 'an'}
+
+# Words of college names that don't narrow down which colleges are meant
+NAME_STOP_WORDS = {'the', 'and', 'for'}
+
+
+class CachedAnswer(NamedTuple):
+    answer: str
+    similarity: float
+    latency_ms: int  # What generating the answer originally took
+
+
+class _Entry(NamedTuple):
+    vector: Optional[np.ndarray]
+    guard: frozenset
+    answer: str
+    latency_ms: int
+    expires_at: float
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivial rewordings share an entry."""
+    return " ".join(re.findall(r"[a-z0-9]+(?:'[a-z]+)?", prompt.lower()))
+
+
+class CollegeNameIndex:
+    """
+    College names by their normalized words, to tell which colleges a prompt
+    names whatever its casing. A full name ("boston college") resolves to its
+    own college; otherwise each name word ("harvard", "ohio", "nursing")
+    resolves to every college whose name contains it.
+    """
+
+    def __init__(self, names, version: int = 0):
+        self.version = version
+        full_names = {}
+        word_ids = {}
+        for pk, name in names:
+            words = tuple(normalize_prompt(name or '').split())
+            if not words:
+                continue
+            full_names.setdefault(words, set()).add(pk)
+            for word in set(words):
+                word_ids.setdefault(word, set()).add(pk)
+
+        # Longest names first, so "boston college" wins over a shorter name inside it
+        self.full_names = {}
+        for words, ids in sorted(full_names.items(), key=lambda item: -len(item[0])):
+            self.full_names.setdefault(words[0], []).append((words, frozenset(ids)))
+        self.words = {word: frozenset(ids) for word, ids in word_ids.items()
+                      if len(word) >= 3 and word not in NAME_STOP_WORDS}
+
+    @classmethod
+    def from_database(cls, version: int = 0):
+        return cls(College.objects.values_list('id', 'name'), version=version)
+
+    def colleges(self, prompt: str) -> set:
+        """The id sets of the colleges `prompt` names."""
+        tokens = normalize_prompt(prompt).split()
+        found = set()
+        i = 0
+        while i < len(tokens):
+            for words, ids in self.full_names.get(tokens[i], ()):
+                if len(words) > 1 and tuple(tokens[i:i + len(words)]) == words:
+                    found.add(ids)
+                    i += len(words)
+                    break
+            else:
+                if tokens[i] in self.words:
+                    found.add(self.words[tokens[i]])
+                i += 1
+        return found
+
+
+_NAME_INDEX = versioned_cache(lambda version: CollegeNameIndex.from_database(version=version),
+                              label='answer cache name index')
+
+
+def prompt_guard(prompt: str) -> frozenset:
+    """
+    Numbers, capitalized names and the colleges named in the prompt.
+    Embeddings put "tell me about harvard" and "tell me about yale" close
+    together, so two prompts only share an answer when these match exactly.
+    Without the name index every word counts, so only rewordings of the same
+    words share.
+    """
+    terms = set(re.findall(r"\d+(?:\.\d+)?", prompt))
+    for word in re.findall(r"[A-Za-z][A-Za-z&'.-]*", prompt):
+        word = re.sub(r"'s$", "", word)
+        if word[0].isupper() and word.lower() not in QUESTION_WORDS:
+            terms.add(word.lower())
+
+    names = _NAME_INDEX.get()
+    if names is None:
+        terms.update(w for w in normalize_prompt(prompt).split() if w not in QUESTION_WORDS)
+    else:
+        terms.update(names.colleges(prompt))
+    return frozenset(terms)
+
+
+def is_cacheable_prompt(prompt: str) -> bool:
+    return bool(normalize_prompt(prompt)) and not PERSONAL_PATTERN.search(prompt)
+
+
+class SemanticAnswerCache:
+    """
+    Per-process LRU of Wormie answers to general questions, matched by cosine
+    similarity of prompt embeddings. Entries expire after `ttl` seconds and the
+    whole cache is dropped when the College data version changes, since answers
+    quote College rows.
+    """
+
+    def __init__(self, threshold: float, ttl: float, max_entries: int):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self):
+        version = get_data_version(COLLEGE_DATA)
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def _hit(self, key: str, entry: _Entry, similarity: float) -> CachedAnswer:
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return CachedAnswer(entry.answer, similarity, entry.latency_ms)
+
+    def get_exact(self, prompt: str) -> Optional[CachedAnswer]:
+        """Lookup by normalized text alone, which saves embedding repeated prompts."""
+        key = normalize_prompt(prompt)
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return self._hit(key, entry, 1.0)
+
+    def lookup(self, prompt: str, vector: np.ndarray) -> Optional[CachedAnswer]:
+        guard = prompt_guard(prompt)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        now = time.monotonic()
+        with self._lock:
+            self._check_version()
+            for key in [k for k, e in self._entries.items() if e.expires_at < now]:
+                del self._entries[key]
+
+            candidates = [(k, e) for k, e in self._entries.items()
+                          if e.guard == guard and e.vector is not None and e.vector.shape == vector.shape]
+            if candidates:
+                similarities = np.stack([e.vector for _, e in candidates]) @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    key, entry = candidates[best]
+                    return self._hit(key, entry, float(similarities[best]))
+            self.misses += 1
+            return None
+
+    def store(self, prompt: str, vector: Optional[np.ndarray], answer: str, latency_ms: int):
+        if vector is not None:
+            vector = vector / (np.linalg.norm(vector) or 1.0)
+        guard = prompt_guard(prompt)
+        with self._lock:
+            self._check_version()
+            key = normalize_prompt(prompt)
+            self._entries[key] = _Entry(vector, guard, answer, latency_ms, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / max(1, self.hits + self.misses),
+        }
+
+
+_CACHE: Optional[SemanticAnswerCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """The process-wide cache, or None when WORMIE_CACHE_ENABLED is off."""
+    global _CACHE
+    if not getattr(settings, 'WORMIE_CACHE_ENABLED', False):
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = SemanticAnswerCache(
+                threshold=settings.WORMIE_CACHE_THRESHOLD,
+                ttl=settings.WORMIE_CACHE_TTL,
+                max_entries=settings.WORMIE_CACHE_MAX_ENTRIES,
+            )
+    return _CACHE
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class CollegetrackerConfig(AppConfig):
+    name = 'collegetracker'
+
+    def ready(self):
+        # Wire up data-version invalidation for the in-process college indexes
+        from collegetracker import signals  # noqa: F401
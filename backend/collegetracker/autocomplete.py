@@ -0,0 +1,146 @@
+import bisect
+from collections import defaultdict
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+
+from collegetracker.models import College, CollegeProgram
+from collegetracker.data_version import versioned_cache
+
+MIN_QUERY_LENGTH = 2
+DEFAULT_LIMIT = 10
+
+# Match classes, best first: the whole term starts with the query, a later
+# word starts with it, or it only appears somewhere inside the term.
+PREFIX_MATCH, WORD_MATCH, INFIX_MATCH = 0, 1, 2
+
+
+def _bigrams(text: str) -> set:
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class CompletionIndex:
+    """
+    Read-only completion structure for one autocomplete field. Prefix lookups
+    bisect a sorted array of lowercased terms; substring lookups intersect the
+    postings of the query's rarest bigrams and verify the survivors. Matches are
+    ranked by match class, then popularity, then alphabetically.
+    """
+
+    def __init__(self, weighted_terms: Iterable[Tuple[str, float]], version: int = 0):
+        self.version = version
+        weights = defaultdict(float)
+        for term, weight in weighted_terms:
+            if term:
+                weights[term] += weight or 0
+
+        self.terms = sorted(weights, key=lambda t: (t.lower(), t))
+        self.keys = [t.lower() for t in self.terms]
+        self.weights = np.array([weights[t] for t in self.terms], dtype=np.float64)
+
+        postings = defaultdict(list)
+        for pos, key in enumerate(self.keys):
+            for gram in _bigrams(key):
+                postings[gram].append(pos)
+        self.postings = {g: np.array(p, dtype=np.int32) for g, p in postings.items()}
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _prefix_range(self, query_lower: str) -> Tuple[int, int]:
+        lo = bisect.bisect_left(self.keys, query_lower)
+        hi = bisect.bisect_left(self.keys, query_lower + '\uffff', lo)
+        return lo, hi
+
+    def _substring_candidates(self, query_lower: str) -> np.ndarray:
+        grams = _bigrams(query_lower)
+        lists = []
+        for gram in grams:
+            hits = self.postings.get(gram)
+            if hits is None:
+                return np.empty(0, dtype=np.int32)
+            lists.append(hits)
+        lists.sort(key=len)
+        candidates = lists[0]
+        for hits in lists[1:3]:
+            candidates = np.intersect1d(candidates, hits, assume_unique=True)
+        return np.array([i for i in candidates if query_lower in self.keys[i]], dtype=np.int32)
+
+    def complete(self, query: str, limit: int = DEFAULT_LIMIT) -> List[str]:
+        """Case-insensitive substring completions for `query`, most relevant first."""
+        query_lower = (query or '').lower()
+        if len(query_lower) < MIN_QUERY_LENGTH or not self.terms:
+            return []
+
+        lo, hi = self._prefix_range(query_lower)
+        if hi - lo >= limit:
+            # Enough whole-term prefix matches; skip the substring scan entirely
+            candidates = np.arange(lo, hi, dtype=np.int32)
+            classes = np.zeros(len(candidates), dtype=np.int8)
+        else:
+            candidates = self._substring_candidates(query_lower)
+            word_prefix = ' ' + query_lower
+            classes = np.array([
+                PREFIX_MATCH if lo <= i < hi else
+                WORD_MATCH if word_prefix in self.keys[i] else INFIX_MATCH
+                for i in candidates
+            ], dtype=np.int8)
+
+        if not len(candidates):
+            return []
+        # lexsort sorts by the last key first; the position doubles as the
+        # alphabetical tiebreak since terms are stored sorted.
+        order = np.lexsort((candidates, -self.weights[candidates], classes))
+        return [self.terms[candidates[i]] for i in order[:limit]]
+
+
+def _city_terms():
+    # A city is as popular as the students enrolled there
+    rows = (College.objects.values('city')
+            .annotate(weight=Sum(Coalesce('enrollment_all', 0)))
+            .values_list('city', 'weight'))
+    return list(rows)
+
+
+def _college_terms():
+    return list(College.objects.values_list('name', Coalesce('enrollment_all', 0)))
+
+
+def _program_terms():
+    # A program is as popular as the number of colleges offering it
+    rows = (CollegeProgram.objects.values('cipdesc')
+            .annotate(weight=Count('college', distinct=True))
+            .values_list('cipdesc', 'weight'))
+    return list(rows)
+
+
+TERM_LOADERS = {
+    'city': _city_terms,
+    'college': _college_terms,
+    'program': _program_terms,
+}
+
+_INDEXES = {
+    kind: versioned_cache(lambda version, load=load: CompletionIndex(load(), version=version),
+                          label=f"{kind} autocomplete index")
+    for kind, load in TERM_LOADERS.items()
+}
+
+
+def get_completion_index(kind: str) -> Optional[CompletionIndex]:
+    """
+    Per-worker completion index for 'city', 'college' or 'program', rebuilt
+    when the college data version moves (the import commands bump it).
+    """
+    cache = _INDEXES.get(kind)
+    return cache.get() if cache is not None else None
+
+
+def autocomplete(kind: str, query: str, limit: int = DEFAULT_LIMIT) -> Optional[List[str]]:
+    """Completions for `query`, or None when the index is unavailable so callers can query the DB."""
+    index = get_completion_index(kind)
+    if index is None:
+        return None
+    return index.complete(query, limit=limit)
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import logging
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Set, Tuple
+
+from django.db import connections, router
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class UpsertResult(NamedTuple):
+    created: int
+    updated: int
+    unchanged: int
+
+
+def _supports_on_conflict(model, key_fields: Sequence[str]) -> bool:
+    # INSERT ... ON CONFLICT (Postgres, SQLite) needs a unique constraint on exactly the key
+    if len(key_fields) != 1 or not model._meta.get_field(key_fields[0]).unique:
+        return False
+    return connections[router.db_for_write(model)].features.supports_update_conflicts_with_target
+
+
+def existing_rows(model, key_fields: Sequence[str], fields: Sequence[str],
+                  queryset=None) -> Dict[tuple, List[Tuple[int, tuple]]]:
+    """Map every existing key tuple to the (pk, field values) of the rows that carry it, in one query."""
+    existing = {}
+    width = len(key_fields)
+    queryset = model.objects.all() if queryset is None else queryset
+    rows = queryset.values_list('pk', *key_fields, *fields).iterator(chunk_size=5000)
+    for pk, *values in rows:
+        existing.setdefault(tuple(values[:width]), []).append((pk, tuple(values[width:])))
+    return existing
+
+
+def bulk_upsert(model, rows: Sequence[dict], key_fields: Sequence[str], update_fields: Sequence[str],
+                batch_size: int = DEFAULT_BATCH_SIZE, queryset=None) -> UpsertResult:
+    """
+    Insert or update `rows` (dicts of key_fields + update_fields) in batches.
+    Existing rows are preloaded and compared first, so only new and changed
+    rows are written; a key matching several rows updates all of them. With
+    a single unique key on Postgres/SQLite the write is one
+    INSERT ... ON CONFLICT DO UPDATE per batch, otherwise new rows go through
+    bulk_create and changed ones through bulk_update. With no update_fields
+    only missing keys are inserted. `queryset` limits the preload to the
+    rows a batch can match. Signals are not sent, so callers bump data
+    versions themselves.
+    """
+    key_fields, update_fields = list(key_fields), list(update_fields)
+    existing = existing_rows(model, key_fields, update_fields, queryset)
+
+    # Later rows win, as they would with repeated update_or_create calls
+    by_key = {}
+    for row in rows:
+        by_key[tuple(row[f] for f in key_fields)] = row
+
+    to_create, to_update, unchanged = [], [], 0
+    for key, row in by_key.items():
+        matches = existing.get(key)
+        if matches is None:
+            to_create.append(model(**row))
+            continue
+        values = tuple(row[f] for f in update_fields)
+        changed = [pk for pk, current in matches if current != values]
+        unchanged += len(matches) - len(changed)
+        to_update.extend(model(pk=pk, **row) for pk in changed)
+
+    if update_fields and _supports_on_conflict(model, key_fields):
+        # pk is left unset on updates so the conflict target decides which row is hit
+        for obj in to_update:
+            obj.pk = None
+        writes = to_create + to_update
+        if writes:
+            model.objects.bulk_create(writes, batch_size=batch_size, update_conflicts=True,
+                                      unique_fields=key_fields, update_fields=update_fields)
+    else:
+        if to_create:
+            model.objects.bulk_create(to_create, batch_size=batch_size)
+        if to_update:
+            model.objects.bulk_update(to_update, update_fields, batch_size=batch_size)
+
+    logger.info(f"{model.__name__} upsert: {len(to_create)} created, {len(to_update)} updated, {unchanged} unchanged")
+    return UpsertResult(len(to_create), len(to_update), unchanged)
+
+
+class SyncResult(NamedTuple):
+    created: int
+    updated: int
+    deleted: int
+    unchanged: int
+
+    def summary(self) -> str:
+        return (f"{self.created} created, {self.updated} updated, "
+                f"{self.deleted} deleted, {self.unchanged} unchanged")
+
+
+def content_hash(values: Sequence) -> str:
+    """Stable digest of a row's imported values."""
+    return hashlib.sha1(json.dumps(list(values), default=str, separators=(',', ':')).encode()).hexdigest()
+
+
+class IncrementalSync:
+    """
+    Make a table (or `queryset` scope of it) match a full snapshot fed in
+    batches through add(), touching only rows whose content changed. Each
+    incoming row is hashed over `fields` and compared with the hash stored
+    in `hash_field`: new keys are inserted, changed hashes updated, and
+    keys never seen by finish() deleted. Stored duplicates of a key are
+    deleted too. With dry_run nothing is written, only counted.
+    """
+
+    def __init__(self, model, key_fields: Sequence[str], fields: Sequence[str], queryset=None,
+                 hash_field: str = 'content_hash', batch_size: int = DEFAULT_BATCH_SIZE, dry_run: bool = False):
+        self.model = model
+        self.key_fields = list(key_fields)
+        self.fields = list(fields)
+        self.hash_field = hash_field
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+
+        queryset = model.objects.all() if queryset is None else queryset
+        self.existing: Dict[tuple, List[Tuple[int, str]]] = {}
+        width = len(self.key_fields)
+        for pk, *values in queryset.values_list('pk', *self.key_fields, hash_field).iterator(chunk_size=5000):
+            self.existing.setdefault(tuple(values[:width]), []).append((pk, values[width]))
+
+        self.seen: Set[tuple] = set()
+        # Keys that were inserted, updated or deleted, for callers that refresh derived data
+        self.changed_keys: Set[tuple] = set()
+        self.created = self.updated = self.deleted = self.unchanged = 0
+
+    def add(self, rows: Iterable[dict]):
+        to_create, to_update = [], []
+        for row in rows:
+            key = tuple(row[f] for f in self.key_fields)
+            if key in self.seen:
+                continue
+            self.seen.add(key)
+            digest = content_hash([row[f] for f in self.fields])
+            matches = self.existing.get(key)
+            if not matches:
+                to_create.append(self.model(**row, **{self.hash_field: digest}))
+            elif matches[0][1] != digest:
+                to_update.append(self.model(pk=matches[0][0], **row, **{self.hash_field: digest}))
+            else:
+                self.unchanged += 1
+                continue
+            self.changed_keys.add(key)
+
+        self.created += len(to_create)
+        self.updated += len(to_update)
+        if self.dry_run:
+            return
+        if to_create:
+            self.model.objects.bulk_create(to_create, batch_size=self.batch_size)
+        if to_update:
+            self.model.objects.bulk_update(to_update, self.fields + [self.hash_field], batch_size=self.batch_size)
+
+    def finish(self) -> SyncResult:
+        stale = []
+        for key, matches in self.existing.items():
+            extra = matches if key not in self.seen else matches[1:]
+            if extra:
+                stale.extend(pk for pk, _ in extra)
+                self.changed_keys.add(key)
+        self.deleted = len(stale)
+        if not self.dry_run:
+            for i in range(0, len(stale), self.batch_size):
+                self.model.objects.filter(pk__in=stale[i:i + self.batch_size]).delete()
+
+        result = SyncResult(self.created, self.updated, self.deleted, self.unchanged)
+        logger.info(f"{self.model.__name__} sync: {result.summary()}")
+        return result
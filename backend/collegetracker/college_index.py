@@ -0,0 +1,154 @@
+import re
+from typing import Optional, List, Tuple
+
+import numpy as np
+
+from collegetracker.models import College
+from collegetracker.data_version import versioned_cache
+
+# Sort keys understood by DetailedSearchListView -> ORM ordering used to rank them.
+# Ranks are taken from the database itself so collation and NULL placement
+# match the ORM path exactly on both SQLite and Postgres.
+SORT_ORDERINGS = {
+    'name': ('name', 'id'),
+    'admission_rate': ('admission_rate', 'id'),
+    'cost': ('cost_of_attendance', 'id'),
+    'grad_rate': ('-grad_rate', 'id'),
+}
+
+LOCALE_RANGES = {
+    'city': (11, 13),
+    'suburb': (21, 23),
+    'town': (31, 33),
+    'rural': (41, 43),
+}
+
+NYC_CITY_RE = re.compile(r'^New York(\s+City)?$', re.IGNORECASE)
+
+
+def _float_column(values):
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+class CollegeIndex:
+    """
+    Columnar, read-only snapshot of the College table used to answer the
+    slider/checkbox filters of the detailed search with NumPy masks instead of
+    a fresh SQL query per request.
+    """
+
+    def __init__(self, version: int = 0):
+        self.version = version
+        rows = list(College.objects.values_list(
+            'id', 'name', 'state', 'city', 'admission_rate', 'sat_score',
+            'cost_of_attendance', 'locale', 'control', 'hbcu', 'hsi', 'grad_rate',
+        ).order_by('id'))
+
+        self.size = len(rows)
+        cols = list(zip(*rows)) if rows else [()] * 12
+
+        self.ids = np.array(cols[0], dtype=np.int64)
+        self.names = np.array(cols[1], dtype=object)
+        # Dictionary-encode the low-cardinality text columns so a filter only
+        # evaluates its predicate once per distinct value.
+        self.state_values, self.state_codes = np.unique(
+            np.array([(s or '').lower() for s in cols[2]], dtype=object), return_inverse=True)
+        self.city_values, self.city_codes = np.unique(
+            np.array([(c or '').lower() for c in cols[3]], dtype=object), return_inverse=True)
+        self.admission_rate = _float_column(cols[4])
+        self.sat_score = _float_column(cols[5])
+        self.cost_of_attendance = _float_column(cols[6])
+        self.locale = _float_column(cols[7])
+        self.control = _float_column(cols[8])
+        self.hbcu = np.array(cols[9], dtype=bool)
+        self.hsi = np.array(cols[10], dtype=bool)
+        self.grad_rate = _float_column(cols[11])
+
+        self.ranks = {}
+        for key, ordering in SORT_ORDERINGS.items():
+            ordered_ids = np.fromiter(
+                College.objects.order_by(*ordering).values_list('id', flat=True),
+                dtype=np.int64, count=-1)
+            # Rows inserted between the two queries are ignored until the next rebuild
+            ordered_ids = ordered_ids[np.isin(ordered_ids, self.ids)]
+            rank = np.full(self.size, self.size, dtype=np.int64)
+            rank[self.positions(ordered_ids)] = np.arange(len(ordered_ids))
+            self.ranks[key] = rank
+
+    def positions(self, ids) -> np.ndarray:
+        """Map College ids to row positions (ids are stored sorted)."""
+        return np.searchsorted(self.ids, np.asarray(ids, dtype=np.int64))
+
+    def _text_mask(self, values, codes, predicate) -> np.ndarray:
+        matching = np.flatnonzero([predicate(v) for v in values])
+        return np.isin(codes, matching)
+
+    def search(
+        self,
+        states: Optional[List[str]] = None,
+        city: Optional[str] = None,
+        names: Optional[List[str]] = None,
+        control: Optional[int] = None,
+        locale_category: Optional[str] = None,
+        hbcu: bool = False,
+        hsi: bool = False,
+        cost_range: Tuple[Optional[int], Optional[int]] = (None, None),
+        admission_range: Tuple[Optional[float], Optional[float]] = (None, None),
+        sat_range: Tuple[Optional[int], Optional[int]] = (None, None),
+        sort: str = 'name',
+    ) -> np.ndarray:
+        """Return matching College ids in the same order as the ORM query."""
+        mask = np.ones(self.size, dtype=bool)
+
+        # Every given state must match (the state filter and a state typed into the name box)
+        for state in states or []:
+            state_lower = state.lower()
+            mask &= self._text_mask(self.state_values, self.state_codes, lambda s: s == state_lower)
+
+        if city:
+            city_lower = city.lower()
+            if city_lower in ('new york city', 'new york'):
+                mask &= self._text_mask(self.city_values, self.city_codes, lambda c: bool(NYC_CITY_RE.match(c)))
+            else:
+                mask &= self._text_mask(self.city_values, self.city_codes, lambda c: c == city_lower)
+
+        if names is not None:
+            mask &= np.isin(self.names, names)
+
+        if control is not None:
+            mask &= self.control == control
+
+        if locale_category in LOCALE_RANGES:
+            low, high = LOCALE_RANGES[locale_category]
+            mask &= (self.locale >= low) & (self.locale <= high)
+
+        if hbcu:
+            mask &= self.hbcu
+        if hsi:
+            mask &= self.hsi
+
+        # NaN compares False, mirroring SQL NULL semantics for range filters
+        for column, (low, high) in (
+            (self.cost_of_attendance, cost_range),
+            (self.admission_rate, admission_range),
+            (self.sat_score, sat_range),
+        ):
+            if low is not None:
+                mask &= column >= low
+            if high is not None:
+                mask &= column <= high
+
+        matches = np.flatnonzero(mask)
+        rank = self.ranks.get(sort, self.ranks['name'])
+        return self.ids[matches[np.argsort(rank[matches], kind='stable')]]
+
+
+_INDEX = versioned_cache(lambda version: CollegeIndex(version=version), label='college index')
+
+
+def get_college_index() -> Optional[CollegeIndex]:
+    """
+    Return this worker's index, rebuilding it when the college data version has
+    moved since it was built (imports, staff edits, deletes).
+    """
+    return _INDEX.get()
@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Generic, Optional, TypeVar
+
+from django.db.models import F
+
+from collegetracker.models import DataVersion
+
+logger = logging.getLogger(__name__)
+
+COLLEGE_DATA = 'college'
+
+# How long a worker trusts its last read of a version before asking the DB again
+VERSION_CHECK_INTERVAL = 5.0
+
+_LOCAL_VERSIONS = {}
+_SUSPENDED = threading.local()
+
+
+def get_data_version(name: str = COLLEGE_DATA) -> int:
+    """
+    Return the current version of a shared dataset. Reads are throttled so hot
+    endpoints only pay for one tiny query every few seconds per worker.
+    """
+    cached = _LOCAL_VERSIONS.get(name)
+    now = time.monotonic()
+    if cached and now - cached[1] < VERSION_CHECK_INTERVAL:
+        return cached[0]
+
+    version = DataVersion.objects.filter(name=name).values_list('version', flat=True).first() or 0
+    _LOCAL_VERSIONS[name] = (version, now)
+    return version
+
+
+def is_batched(name: str = COLLEGE_DATA) -> bool:
+    """True inside batched_data_change(); per-row hooks should defer to the batch."""
+    return getattr(_SUSPENDED, name, False)
+
+
+def bump_data_version(name: str = COLLEGE_DATA) -> None:
+    """Mark a dataset as changed so every worker rebuilds its derived indexes."""
+    if is_batched(name):
+        setattr(_SUSPENDED, f"{name}_dirty", True)
+        return
+
+    updated = DataVersion.objects.filter(name=name).update(version=F('version') + 1)
+    if not updated:
+        DataVersion.objects.get_or_create(name=name, defaults={'version': 1})
+    _LOCAL_VERSIONS.pop(name, None)
+
+
+@contextmanager
+def batched_data_change(name: str = COLLEGE_DATA):
+    """
+    Collapse the per-row signal bumps of an import loop into a single bump
+    once the block finishes.
+    """
+    setattr(_SUSPENDED, name, True)
+    setattr(_SUSPENDED, f"{name}_dirty", False)
+    try:
+        yield
+    finally:
+        dirty = getattr(_SUSPENDED, f"{name}_dirty", False)
+        setattr(_SUSPENDED, name, False)
+        setattr(_SUSPENDED, f"{name}_dirty", False)
+        if dirty:
+            bump_data_version(name)
+
+
+T = TypeVar('T')
+
+
+class VersionedCache(Generic[T]):
+    """
+    A per-worker value derived from a shared dataset (an in-memory index, an
+    engine), built by `build(version)` and rebuilt when the dataset's version
+    moves. Build errors are logged and get() returns None so callers can fall
+    back to querying the database.
+    """
+
+    def __init__(self, build: Callable[[int], T], name: str = COLLEGE_DATA, label: Optional[str] = None):
+        self.build = build
+        self.name = name
+        self.label = label or getattr(build, '__qualname__', 'versioned cache')
+        self._value: Optional[T] = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[T]:
+        try:
+            version = get_data_version(self.name)
+            if self._value is not None and self._version == version:
+                return self._value
+            with self._lock:
+                if self._value is None or self._version != version:
+                    self._value = self.build(version)
+                    self._version = version
+            return self._value
+        except Exception as e:
+            logger.error(f"Error building {self.label}: {e}")
+            return None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._value = None
+            self._version = None
+
+
+def versioned_cache(build: Callable[[int], T], name: str = COLLEGE_DATA, label: Optional[str] = None) -> VersionedCache[T]:
+    return VersionedCache(build, name=name, label=label)
@@ -0,0 +1,246 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from langchain_core.embeddings import Embeddings
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+logger = logging.getLogger(__name__)
+
+VECTOR_INDEX_PATH = "college_faiss_index"
+# Backend spec of indexes built before collegetracker.vector_index kept it in the manifest
+SPEC_FILE = "embedding.json"
+IDF_FILE = "hashing_idf.npy"
+
+GEMINI_MODEL = "models/gemini-embedding-001"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Offline fallback: signed feature hashing of word unigrams and bigrams with
+    sublinear term frequency, optionally IDF-weighted, L2-normalized. Needs no
+    model download or network, so rebuilds and queries work anywhere.
+    """
+    backend = 'hashing'
+
+    def __init__(self, dim: int = 2048, idf: Optional[np.ndarray] = None):
+        self.dim = dim
+        self.idf = idf
+
+    def _counts(self, text: str) -> np.ndarray:
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if features:
+            # crc32, not hash(): bucket numbers must be stable across processes
+            hashes = np.array([zlib.crc32(f.encode()) for f in features], dtype=np.uint32)
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(vector, hashes % self.dim, signs)
+        return vector
+
+    def _vectorize(self, text: str) -> List[float]:
+        counts = self._counts(text)
+        vector = np.sign(counts) * np.log1p(np.abs(counts))
+        if self.idf is not None:
+            vector *= self.idf
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def fit(self, texts: List[str]) -> "HashingEmbeddings":
+        """Learn IDF weights per hash bucket from the documents being indexed."""
+        df = np.zeros(self.dim, dtype=np.float32)
+        for text in texts:
+            df += self._counts(text) != 0
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+        return self
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vectorize(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vectorize(text)
+
+    def spec(self) -> dict:
+        return {'backend': self.backend, 'dim': self.dim}
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """Local CPU model through sentence-transformers (optional dependency)."""
+    backend = 'local'
+
+    def __init__(self, model_name: str):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImproperlyConfigured("EMBEDDING_BACKEND=local needs the sentence-transformers package") from e
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device='cpu')
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.model.encode(texts, batch_size=64, normalize_embeddings=True).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def spec(self) -> dict:
+        return {'backend': self.backend, 'model': self.model_name}
+
+
+class GeminiEmbeddings(GoogleGenerativeAIEmbeddings):
+    """Remote Gemini embeddings (the original backend)."""
+
+    def spec(self) -> dict:
+        return {'backend': 'gemini', 'model': self.model}
+
+
+def _gemini(model: str = GEMINI_MODEL, **_):
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        raise ImproperlyConfigured("EMBEDDING_BACKEND=gemini needs GEMINI_API_KEY")
+    return GeminiEmbeddings(model=model, google_api_key=api_key)
+
+
+def _local(model: Optional[str] = None, **_):
+    return SentenceTransformerEmbeddings(model or settings.EMBEDDING_LOCAL_MODEL)
+
+
+def _hashing(dim: int = 2048, **_):
+    return HashingEmbeddings(dim=dim)
+
+
+BACKENDS = {'gemini': _gemini, 'local': _local, 'hashing': _hashing}
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """'auto' means Gemini when an API key is configured, the hashing fallback otherwise."""
+    backend = backend or getattr(settings, 'EMBEDDING_BACKEND', 'auto')
+    if backend == 'auto':
+        backend = 'gemini' if os.environ.get("GEMINI_API_KEY") else 'hashing'
+    if backend not in BACKENDS:
+        raise ImproperlyConfigured(f"Unknown EMBEDDING_BACKEND {backend!r}; choose from {', '.join(BACKENDS)} or auto")
+    return backend
+
+
+def make_embeddings(backend: Optional[str] = None, **options) -> Embeddings:
+    return BACKENDS[resolve_backend(backend)](**options)
+
+
+def load_index_embeddings(index_path: str, spec: Optional[dict] = None, idf_file: Optional[str] = IDF_FILE) -> Embeddings:
+    """
+    The embedding backend an index was built with: `spec` from the index
+    manifest, else SPEC_FILE; indexes older than both are Gemini.
+    """
+    if spec is None:
+        spec_path = os.path.join(index_path, SPEC_FILE)
+        if not os.path.exists(spec_path):
+            return _gemini()
+        with open(spec_path) as f:
+            spec = json.load(f)
+    embeddings = make_embeddings(**spec)
+    idf_path = os.path.join(index_path, idf_file) if idf_file else None
+    if isinstance(embeddings, HashingEmbeddings) and idf_path and os.path.exists(idf_path):
+        embeddings.idf = np.load(idf_path)
+    return embeddings
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    LRU of query embeddings keyed by normalized text, so repeated chat
+    questions skip the embedding round trip. Documents pass straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_entries: Optional[int] = None):
+        self.embeddings = embeddings
+        self.max_entries = max_entries or getattr(settings, 'QUERY_EMBEDDING_CACHE_SIZE', 1000)
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return vector
+            self.misses += 1
+
+        vector = self.embeddings.embed_query(text)
+        with self._lock:
+            self._cache[key] = vector
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return vector
+
+    def spec(self) -> dict:
+        return self.embeddings.spec()
+
+
+_QUERY_EMBEDDINGS = None
+_QUERY_EMBEDDINGS_LOCK = threading.Lock()
+
+
+def get_query_embeddings() -> CachedQueryEmbeddings:
+    """Process-wide cached embedder for the configured backend (used by the Wormie answer cache)."""
+    global _QUERY_EMBEDDINGS
+    with _QUERY_EMBEDDINGS_LOCK:
+        if _QUERY_EMBEDDINGS is None:
+            _QUERY_EMBEDDINGS = CachedQueryEmbeddings(make_embeddings())
+    return _QUERY_EMBEDDINGS
+
+
+def _is_rate_limit(err: Exception) -> bool:
+    text = str(err).lower()
+    return "429" in text or "quota" in text or "resource_exhausted" in text or "rate limit" in text
+
+
+def embed_in_batches(embeddings: Embeddings, texts: List[str], batch_size: int = 100, workers: int = 4,
+                     retries: int = 5, on_batch: Optional[Callable[[int, int], None]] = None) -> List[List[float]]:
+    """
+    Embed documents in batches on a thread pool, keeping input order. Rate
+    limit errors back off exponentially and retry instead of pacing every
+    batch with a fixed sleep.
+    """
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    done = [0]
+    lock = threading.Lock()
+
+    def run(batch):
+        for attempt in range(retries + 1):
+            try:
+                vectors = embeddings.embed_documents(batch)
+                break
+            except Exception as e:
+                if attempt == retries or not _is_rate_limit(e):
+                    raise
+                delay = 2 ** (attempt + 1)
+                logger.warning(f"Embedding rate limited, retrying in {delay}s: {e}")
+                time.sleep(delay)
+        if on_batch:
+            with lock:
+                done[0] += 1
+                on_batch(done[0], len(batches))
+        return vectors
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return [vector for vectors in pool.map(run, batches) for vector in vectors]
@@ -0,0 +1,152 @@
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+from collegetracker.models import College
+from collegetracker.data_version import versioned_cache
+
+EARTH_RADIUS_KM = 6371.0088
+# Half the Earth's circumference: no two points are farther apart than this
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+
+# Grid cell size in degrees (~28km of latitude); one cell is one geohash-style bucket
+CELL_DEGREES = 0.25
+LAT_CELLS = int(180 / CELL_DEGREES)
+LON_CELLS = int(360 / CELL_DEGREES)
+
+# First ring searched by nearest(); widened until enough matches are found
+NEAREST_START_RADIUS_KM = 25.0
+
+
+def haversine_km(lat, lon, lats_rad, lons_rad) -> np.ndarray:
+    """Great-circle distance from (lat, lon) in degrees to arrays of points in radians."""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    a = (np.sin((lats_rad - lat1) / 2) ** 2
+         + math.cos(lat1) * np.cos(lats_rad) * np.sin((lons_rad - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _lat_cell(lat: float) -> int:
+    return min(max(int(math.floor((lat + 90.0) / CELL_DEGREES)), 0), LAT_CELLS - 1)
+
+
+def _lon_cell(lon: float) -> int:
+    return min(max(int(math.floor((lon + 180.0) / CELL_DEGREES)), 0), LON_CELLS - 1)
+
+
+class GeoIndex:
+    """
+    Fixed lat/lon grid over College coordinates. Points are stored sorted by
+    cell id, so every row of cells inside a query's bounding box is one
+    contiguous slice found with searchsorted; candidates are then filtered by
+    exact haversine distance.
+    """
+
+    def __init__(self, ids, lats, lons, version: int = 0):
+        self.version = version
+        ids = np.asarray(ids, dtype=np.int64)
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+
+        lat_cells = np.clip(np.floor((lats + 90.0) / CELL_DEGREES), 0, LAT_CELLS - 1).astype(np.int64)
+        lon_cells = np.clip(np.floor((lons + 180.0) / CELL_DEGREES), 0, LON_CELLS - 1).astype(np.int64)
+        cells = lat_cells * LON_CELLS + lon_cells
+        order = np.argsort(cells, kind='stable')
+        self.cells = cells[order]
+        self.ids = ids[order]
+        self.lats_rad = np.radians(lats[order])
+        self.lons_rad = np.radians(lons[order])
+        self.size = len(self.ids)
+
+    @classmethod
+    def from_database(cls, version: int = 0):
+        rows = list(College.objects.filter(latitude__isnull=False, longitude__isnull=False)
+                    .values_list('id', 'latitude', 'longitude'))
+        rows = [r for r in rows if -90 <= r[1] <= 90 and -180 <= r[2] <= 180]
+        cols = list(zip(*rows)) if rows else [(), (), ()]
+        return cls(cols[0], cols[1], cols[2], version=version)
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Positions of every point in the cells overlapping the query's bounding box."""
+        if radius_km >= MAX_DISTANCE_KM / 2:
+            return np.arange(self.size)
+
+        dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        lat_lo, lat_hi = lat - dlat, lat + dlat
+        if lat_lo <= -90 or lat_hi >= 90:
+            # The circle covers a pole, so it spans every longitude
+            lon_ranges = [(0, LON_CELLS - 1)]
+        else:
+            widest = max(abs(lat_lo), abs(lat_hi))
+            dlon = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(widest))))
+            if dlon >= 180:
+                lon_ranges = [(0, LON_CELLS - 1)]
+            else:
+                lo, hi = lon - dlon, lon + dlon
+                # Split boxes that cross the antimeridian into two longitude ranges
+                if lo < -180:
+                    lon_ranges = [(_lon_cell(lo + 360), LON_CELLS - 1), (0, _lon_cell(hi))]
+                elif hi > 180:
+                    lon_ranges = [(_lon_cell(lo), LON_CELLS - 1), (0, _lon_cell(hi - 360))]
+                else:
+                    lon_ranges = [(_lon_cell(lo), _lon_cell(hi))]
+
+        rows = np.arange(_lat_cell(max(lat_lo, -90.0)), _lat_cell(min(lat_hi, 90.0)) + 1) * LON_CELLS
+        firsts = np.concatenate([rows + first for first, _ in lon_ranges])
+        lasts = np.concatenate([rows + last for _, last in lon_ranges])
+        starts = np.searchsorted(self.cells, firsts, side='left')
+        lengths = np.searchsorted(self.cells, lasts, side='right') - starts
+
+        # Expand the (start, length) slices into one position array without a Python loop
+        total = int(lengths.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64)
+        slice_offsets = np.cumsum(lengths) - lengths
+        return np.arange(total) + np.repeat(starts - slice_offsets, lengths)
+
+    def _within(self, lat, lon, radius_km, allowed: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        pos = self._candidates(lat, lon, radius_km)
+        if allowed is not None and len(pos):
+            pos = pos[np.isin(self.ids[pos], allowed)]
+        dist = haversine_km(lat, lon, self.lats_rad[pos], self.lons_rad[pos])
+        hit = dist <= radius_km
+        return pos[hit], dist[hit]
+
+    @staticmethod
+    def _by_distance(ids, dist, limit=None) -> Tuple[np.ndarray, np.ndarray]:
+        if limit is not None and len(dist) > limit:
+            keep = np.argpartition(dist, limit - 1)[:limit]
+            ids, dist = ids[keep], dist[keep]
+        order = np.lexsort((ids, dist))
+        return ids[order], dist[order]
+
+    def within_radius(self, lat: float, lon: float, radius_km: float,
+                      allowed: Optional[np.ndarray] = None, limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(ids, distances_km) of colleges within radius_km, nearest first."""
+        pos, dist = self._within(lat, lon, radius_km, allowed)
+        return self._by_distance(self.ids[pos], dist, limit)
+
+    def nearest(self, lat: float, lon: float, k: int, allowed: Optional[np.ndarray] = None,
+                max_radius_km: float = MAX_DISTANCE_KM) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (ids, distances_km) of the k nearest colleges, optionally capped at
+        max_radius_km. The search ring widens until it holds k matches; any
+        point closer than the ring's radius is guaranteed to be inside it.
+        """
+        radius = min(NEAREST_START_RADIUS_KM, max_radius_km)
+        while True:
+            pos, dist = self._within(lat, lon, radius, allowed)
+            if len(pos) >= k or radius >= max_radius_km:
+                return self._by_distance(self.ids[pos], dist, k)
+            # Matches grow with the ring's area, so scale the radius by sqrt of the shortfall
+            growth = max(2.0, 1.2 * math.sqrt(k / max(len(pos), 1)))
+            radius = min(radius * growth, max_radius_km)
+
+
+_INDEX = versioned_cache(lambda version: GeoIndex.from_database(version=version), label='geo index')
+
+
+def get_geo_index() -> Optional[GeoIndex]:
+    """Per-worker spatial index, rebuilt when the college data version moves (e.g. after imports)."""
+    return _INDEX.get()
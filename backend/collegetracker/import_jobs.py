@@ -0,0 +1,281 @@
+import logging
+from datetime import timedelta
+from io import StringIO
+from typing import List, NamedTuple, Optional, Set, Tuple
+
+import chardet
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from collegetracker.bulk_upsert import DEFAULT_BATCH_SIZE, bulk_upsert
+from collegetracker.data_version import bump_data_version
+from collegetracker.models import College, CollegeProgram, ImportJob, SmartCollege
+from collegetracker.text_search import rebuild_search_index
+
+logger = logging.getLogger(__name__)
+
+# A running job whose progress has not moved for this long belongs to a dead worker
+STALE_AFTER = timedelta(minutes=10)
+MAX_RECORDED_ERRORS = 100
+
+# How each upload endpoint's files were decoded; None means detect with chardet
+ENCODINGS = {
+    'colleges': 'utf-8',
+    'smart_colleges': None,
+    'college_updates': 'latin1',
+    'programs': 'latin1',
+}
+
+# Scorecard column -> College field, shared by the create and update uploads
+SCORECARD_TEXT = {'INSTNM': 'name', 'CITY': 'city', 'STABBR': 'state', 'INSTURL': 'website'}
+SCORECARD_FLOATS = {'ADM_RATE': 'admission_rate', 'LATITUDE': 'latitude', 'LONGITUDE': 'longitude',
+                    'PFTFAC': 'ft_faculty_rate'}
+SCORECARD_INTS = {'SAT_AVG': 'sat_score', 'COSTT4_A': 'cost_of_attendance',
+                  'TUITIONFEE_IN': 'tuition_in_state', 'TUITIONFEE_OUT': 'tuition_out_state'}
+
+SMART_COLLEGE_FIELDS = ['website', 'admission_rate', 'sat_score', 'cost_of_attendance', 'tuition_in_state',
+                        'tuition_out_state', 'latitude', 'longitude', 'enrollment_all', 'ft_faculty_rate']
+
+
+class BatchResult(NamedTuple):
+    created: int
+    updated: int
+    unchanged: int
+    errors: List[str]
+    # Colleges whose search documents need rebuilding once the job is done
+    college_ids: Set[int]
+
+
+def enqueue_import(kind: str, upload, user=None) -> ImportJob:
+    """Store an uploaded file and queue it; the worker picks it up in creation order."""
+    return ImportJob.objects.create(
+        kind=kind, file=upload, original_name=upload.name,
+        created_by=user if user is not None and user.is_authenticated else None)
+
+
+def _text(df: pd.DataFrame, column: str) -> pd.Series:
+    values = df[column].astype(object).where(df[column].notna(), None)
+    return values.map(lambda v: (v.strip() or None) if isinstance(v, str) else v)
+
+
+def _numbers(df: pd.DataFrame, column: str, integer: bool = False) -> pd.Series:
+    values = pd.to_numeric(df[column], errors='coerce')
+    if integer:
+        # Truncate like int(float(...)) did
+        values = np.trunc(values).astype('Int64')
+    return values.astype(object).where(values.notna(), None)
+
+
+def _require(df: pd.DataFrame, columns):
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+
+
+def _scorecard_rows(df: pd.DataFrame, enrollment_column: str) -> pd.DataFrame:
+    _require(df, [*SCORECARD_TEXT, *SCORECARD_FLOATS, *SCORECARD_INTS, enrollment_column, 'UNITID'])
+    rows = pd.DataFrame(index=df.index)
+    for column, field in SCORECARD_TEXT.items():
+        rows[field] = _text(df, column)
+    for column, field in SCORECARD_FLOATS.items():
+        rows[field] = _numbers(df, column)
+    for column, field in SCORECARD_INTS.items():
+        rows[field] = _numbers(df, column, integer=True)
+    rows['enrollment_all'] = _numbers(df, enrollment_column, integer=True)
+    rows['UNITID'] = _text(df, 'UNITID')
+    # College.website is not nullable
+    rows['website'] = rows['website'].where(rows['website'].notna(), '')
+    return rows
+
+
+def _split_invalid(rows: pd.DataFrame, required) -> Tuple[pd.DataFrame, List[str]]:
+    invalid = rows[list(required)].isna().any(axis=1)
+    errors = [
+        f"Row {index + 1}: missing {', '.join(f for f in required if row[f] is None)}"
+        for index, row in rows[invalid].iterrows()
+    ]
+    return rows[~invalid], errors
+
+
+def import_colleges(df: pd.DataFrame, batch_size: int) -> BatchResult:
+    """upload/: create colleges whose UNITID is new, leaving existing ones untouched."""
+    rows, errors = _split_invalid(_scorecard_rows(df, 'UGDS'), ['UNITID', 'name', 'city', 'state'])
+    records = rows.to_dict('records')
+    unitids = [r['UNITID'] for r in records]
+    result = bulk_upsert(College, records, ['UNITID'], [], batch_size=batch_size,
+                         queryset=College.objects.filter(UNITID__in=unitids))
+    college_ids = set()
+    if result.created:
+        college_ids = set(College.objects.filter(UNITID__in=unitids).values_list('id', flat=True))
+    return BatchResult(result.created, 0, result.unchanged, errors, college_ids)
+
+
+def import_college_updates(df: pd.DataFrame, batch_size: int) -> BatchResult:
+    """upload3/: create or update colleges matched by name."""
+    rows, errors = _split_invalid(_scorecard_rows(df, 'UG'), ['name'])
+    records = rows.to_dict('records')
+    names = [r['name'] for r in records]
+    fields = [f for f in rows.columns if f != 'name']
+    result = bulk_upsert(College, records, ['name'], fields, batch_size=batch_size,
+                         queryset=College.objects.filter(name__in=names))
+    college_ids = set()
+    if result.created or result.updated:
+        college_ids = set(College.objects.filter(name__in=names).values_list('id', flat=True))
+    return BatchResult(result.created, result.updated, result.unchanged, errors, college_ids)
+
+
+def import_smart_colleges(df: pd.DataFrame, batch_size: int) -> BatchResult:
+    """
+    upload2/: copy fully populated colleges, looked up by UNITID, into
+    SmartCollege with the file's HLOFFER / CCBASIC codes, matched by name.
+    Rows whose college is unknown or incomplete are skipped as before.
+    """
+    _require(df, ['UNITID', 'INSTNM', 'CITY', 'STABBR', 'HLOFFER', 'CCBASIC'])
+    unitids = _text(df, 'UNITID')
+    colleges = {
+        c['UNITID']: c for c in
+        College.objects.filter(UNITID__in=unitids.dropna().tolist()).values('UNITID', *SMART_COLLEGE_FIELDS)
+    }
+    names, cities, states = _text(df, 'INSTNM'), _text(df, 'CITY'), _text(df, 'STABBR')
+    hloffer, ccbasic = _text(df, 'HLOFFER'), _text(df, 'CCBASIC')
+
+    records, skipped = [], 0
+    for i, unitid in unitids.items():
+        college = colleges.get(unitid)
+        complete = college is not None and all(college[f] for f in SMART_COLLEGE_FIELDS if f != 'website')
+        if not (complete and names[i] and hloffer[i] and ccbasic[i]):
+            skipped += 1
+            continue
+        records.append({
+            'name': names[i], 'city': cities[i], 'state': states[i],
+            **{f: college[f] for f in SMART_COLLEGE_FIELDS},
+            'HLOFFER': hloffer[i], 'CCBASIC': ccbasic[i],
+        })
+
+    fields = ['city', 'state', *SMART_COLLEGE_FIELDS, 'HLOFFER', 'CCBASIC']
+    result = bulk_upsert(SmartCollege, records, ['name'], fields, batch_size=batch_size,
+                         queryset=SmartCollege.objects.filter(name__in=[r['name'] for r in records]))
+    return BatchResult(result.created, result.updated, result.unchanged + skipped, [], set())
+
+
+def import_programs(df: pd.DataFrame, batch_size: int) -> BatchResult:
+    """upload4/: add programs missing for (college by UNITID, CIP code); existing ones are kept."""
+    _require(df, ['UNITID', 'CIPCODE', 'CIPDESC', 'CREDDESC'])
+    unitids = _text(df, 'UNITID')
+    colleges = dict(College.objects.filter(UNITID__in=unitids.dropna().tolist()).values_list('UNITID', 'id'))
+    cipcodes, cipdescs, creddescs = _text(df, 'CIPCODE'), _text(df, 'CIPDESC'), _text(df, 'CREDDESC')
+
+    records, skipped = [], 0
+    for i, unitid in unitids.items():
+        if unitid not in colleges:
+            skipped += 1
+            continue
+        records.append({
+            'college_id': colleges[unitid], 'cipcode': cipcodes[i], 'cipdesc': cipdescs[i],
+            'creddesc': creddescs[i], 'UNITID': unitid,
+        })
+
+    college_ids = {r['college_id'] for r in records}
+    result = bulk_upsert(CollegeProgram, records, ['college_id', 'cipcode'], [], batch_size=batch_size,
+                         queryset=CollegeProgram.objects.filter(college_id__in=college_ids))
+    return BatchResult(result.created, 0, result.unchanged + skipped, [],
+                       college_ids if result.created else set())
+
+
+HANDLERS = {
+    'colleges': import_colleges,
+    'smart_colleges': import_smart_colleges,
+    'college_updates': import_college_updates,
+    'programs': import_programs,
+}
+
+
+def read_upload(job: ImportJob) -> pd.DataFrame:
+    with job.file.open('rb') as f:
+        raw = f.read()
+    encoding = ENCODINGS[job.kind]
+    if encoding is None:
+        encoding = chardet.detect(raw)['encoding']
+        if not encoding:
+            raise ValueError("Could not detect the encoding of the file")
+    return pd.read_csv(StringIO(raw.decode(encoding, 'replace')), sep=',', on_bad_lines='skip',
+                       index_col=False, dtype='unicode')
+
+
+def requeue_stale_jobs() -> int:
+    cutoff = timezone.now() - STALE_AFTER
+    count = ImportJob.objects.filter(status='running', updated_at__lt=cutoff).update(
+        status='queued', updated_at=timezone.now())
+    if count:
+        logger.warning(f"Requeued {count} import job(s) abandoned by a stopped worker")
+    return count
+
+
+def claim_next_job() -> Optional[ImportJob]:
+    """Oldest queued job, marked running. Safe with several workers polling the same table."""
+    requeue_stale_jobs()
+    while True:
+        job = ImportJob.objects.filter(status='queued').order_by('created_at', 'id').first()
+        if job is None:
+            return None
+        now = timezone.now()
+        # Compare-and-set: only one worker's UPDATE can still see the job queued
+        if ImportJob.objects.filter(pk=job.pk, status='queued').update(
+                status='running', started_at=now, updated_at=now):
+            job.refresh_from_db()
+            return job
+
+
+PROGRESS_FIELDS = ['total_rows', 'processed_rows', 'created_count', 'updated_count', 'unchanged_count',
+                   'error_count', 'errors', 'updated_at']
+
+
+def run_job(job: ImportJob, batch_size: int = DEFAULT_BATCH_SIZE) -> ImportJob:
+    """
+    Apply a claimed job batch by batch. Each batch is its own transaction
+    and saves progress, so the status endpoint moves while large files run
+    and a failure keeps the batches already written.
+    """
+    handler = HANDLERS[job.kind]
+    job.processed_rows = job.created_count = job.updated_count = job.unchanged_count = job.error_count = 0
+    job.errors = []
+    college_ids = set()
+    try:
+        df = read_upload(job)
+        job.total_rows = len(df)
+        job.save(update_fields=PROGRESS_FIELDS)
+
+        for start in range(0, len(df), batch_size):
+            batch = df.iloc[start:start + batch_size]
+            with transaction.atomic():
+                result = handler(batch, batch_size)
+            job.processed_rows += len(batch)
+            job.created_count += result.created
+            job.updated_count += result.updated
+            job.unchanged_count += result.unchanged
+            job.error_count += len(result.errors)
+            job.errors = (job.errors + result.errors)[:MAX_RECORDED_ERRORS]
+            job.save(update_fields=PROGRESS_FIELDS)
+            college_ids |= result.college_ids
+
+        job.status = 'succeeded'
+    except Exception as e:
+        logger.exception(f"Import job {job.pk} failed")
+        job.status = 'failed'
+        job.error_message = str(e)
+    finally:
+        if college_ids:
+            # Bulk writes skip the College signals
+            bump_data_version()
+            rebuild_search_index(college_ids)
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error_message', 'finished_at', 'updated_at'])
+    logger.info(f"Import job {job.pk} {job.status}: {job.created_count} created, {job.updated_count} updated, "
+                f"{job.unchanged_count} unchanged, {job.error_count} errors")
+    if job.status == 'succeeded':
+        # The upload has served its purpose; failed ones are kept for inspection
+        job.file.delete()
+    return job
@@ -0,0 +1,268 @@
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from collegetracker.source_data import read_excel_sheet
+
+logger = logging.getLogger(__name__)
+
+# Institutions described by the data dictionaries' counts (N of LATITUDE in hd2024.xlsx)
+REFERENCE_INSTITUTIONS = 6072
+
+# Generated IPEDS file -> (data dictionary in IPEDS_data/, columns identifying a row).
+# Columns, rows per institution, value ranges, code frequencies and how often
+# each value is missing all come from the dictionary's Varlist, Statistics
+# and Frequencies sheets, so the files look like the real ones to pandas.
+IPEDS_FILES = {
+    'hd2024.csv': ('hd2024.xlsx', ['UNITID']),
+    'drvadm2024.csv': ('drvAdm2024.xlsx', ['UNITID']),
+    'adm2024.csv': ('adm2024.xlsx', ['UNITID']),
+    'drvcost2024.csv': ('drvcost2024.xlsx', ['UNITID']),
+    'drvef2024.csv': ('drvef2024.xlsx', ['UNITID']),
+    'ef2024d.csv': ('ef2024d.xlsx', ['UNITID']),
+    'sfa2324.csv': ('sfa2324.xlsx', ['UNITID']),
+    'gr2024.csv': ('gr2024.xlsx', ['UNITID', 'GRTYPE']),
+    'c2024_a.csv': ('c2024_a.xlsx', ['UNITID', 'CIPCODE', 'MAJORNUM', 'AWLEVEL']),
+}
+# The completions importers also read the dictionary itself for CIP and award titles
+COPIED_DICTIONARIES = ['c2024_a.xlsx']
+
+CUSTOM_FILE = 'Data_2-16-2026---799.csv'
+SCORECARD_INSTITUTION_FILE = 'Most-Recent-Cohorts-Institution.csv'
+SCORECARD_FOS_FILE = 'Most-Recent-Cohorts-Field-of-Study.csv'
+
+# hd2024 and the IPEDS Data Center export start with a byte-order mark
+BOM_FILES = {'hd2024.csv', CUSTOM_FILE}
+
+# The real institution file has ~3,300 columns; the importers read a handful
+SCORECARD_INSTITUTION_WIDTH = 3305
+# Share of completions programs that have a Field-of-Study earnings row
+FOS_COVERAGE = 0.8
+PRIVACY_SUPPRESSED = 'PrivacySuppressed'
+
+# IPEDS award level -> Scorecard (CREDLEV, CREDDESC)
+CREDENTIALS = {
+    2: (1, 'Undergraduate Certificate or Diploma'),
+    20: (1, 'Undergraduate Certificate or Diploma'),
+    21: (1, 'Undergraduate Certificate or Diploma'),
+    4: (1, 'Undergraduate Certificate or Diploma'),
+    3: (2, "Associate's Degree"),
+    5: (3, "Bachelor's Degree"),
+    6: (4, 'Post-baccalaureate Certificate'),
+    7: (5, "Master's Degree"),
+    17: (6, 'Doctoral Degree'),
+    19: (6, 'Doctoral Degree'),
+    18: (7, 'First Professional Degree'),
+    8: (8, 'Graduate/Professional Certificate'),
+}
+
+
+def dictionary_dir() -> Path:
+    return Path(settings.BASE_DIR).parent / 'IPEDS_data'
+
+
+def _sheet(path: Path, name: str) -> Optional[pd.DataFrame]:
+    try:
+        df = read_excel_sheet(str(path), name)
+    except ValueError:
+        # Not every dictionary has every sheet (the derived files have no Frequencies)
+        return None
+    df = df.copy()
+    df.columns = [str(c).lower() for c in df.columns]
+    return df
+
+
+class DataDictionary:
+    """The parts of one IPEDS dictionary workbook the generator samples from."""
+
+    def __init__(self, path: Path):
+        varlist = _sheet(path, 'Varlist')
+        self.columns = list(zip(varlist['varname'], varlist['datatype']))
+        stats = _sheet(path, 'Statistics')
+        self.stats = stats.drop_duplicates('varname').set_index('varname')
+        self.max_n = float(self.stats['n'].max())
+
+        self.codes, self.labels = {}, {}
+        freqs = _sheet(path, 'Frequencies')
+        if freqs is not None:
+            # Some workbooks store counts as text with thousands separators
+            freqs['frequency'] = pd.to_numeric(freqs['frequency'].astype(str).str.replace(',', ''), errors='coerce')
+            freqs = freqs[freqs['frequency'] > 0]
+            for var, group in freqs.groupby('varname'):
+                self.codes[var] = (group['codevalue'].to_numpy(), group['frequency'].to_numpy(dtype=float))
+                self.labels[var] = dict(zip(group['codevalue'], group['valuelabel']))
+
+    @property
+    def rows_per_institution(self) -> float:
+        return self.max_n / REFERENCE_INSTITUTIONS
+
+    def column(self, var: str, datatype: str, n: int, rng: np.random.Generator):
+        if var in self.codes:
+            values, weights = self.codes[var]
+            sample = rng.choice(values, n, p=weights / weights.sum())
+            if datatype == 'N' and all(float(v).is_integer() for v in values):
+                return sample.astype(np.int64)
+            return sample
+
+        if var in self.stats.index:
+            row = self.stats.loc[var]
+            low, high = float(row['min']), float(row['max'])
+            # Counts and dollar amounts are right-skewed: exponential around the mean, clipped to the observed range
+            values = np.clip(low + rng.exponential(max(float(row['mean']) - low, 1e-6), n), low, high)
+            values[rng.random(n) > row['n'] / self.max_n] = np.nan
+            if low.is_integer() and high.is_integer():
+                return pd.array(np.round(values), dtype='Int64')
+            return values.round(4)
+
+        if datatype == 'A':
+            return (var.lower() + '-') + pd.Series(np.arange(n)).astype(str)
+        return rng.integers(0, 100, n)
+
+
+def _unitids_for(rate: float, unitids: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    if rate <= 1:
+        count = int(round(rate * len(unitids)))
+        return np.sort(rng.choice(unitids, count, replace=False))
+    # Several rows per institution (programs, cohorts), grouped like the real files
+    return np.repeat(unitids, rng.poisson(rate, len(unitids)))
+
+
+def _write(df: pd.DataFrame, directory: str, name: str) -> int:
+    df.to_csv(os.path.join(directory, name), index=False,
+              encoding='utf-8-sig' if name in BOM_FILES else 'utf-8')
+    return len(df)
+
+
+def generate_ipeds_file(name: str, unitids: np.ndarray, rng: np.random.Generator) -> pd.DataFrame:
+    dictionary_file, key = IPEDS_FILES[name]
+    dictionary = DataDictionary(dictionary_dir() / dictionary_file)
+    rows = _unitids_for(dictionary.rows_per_institution, unitids, rng)
+
+    df = pd.DataFrame({'UNITID': rows})
+    for var, datatype in dictionary.columns:
+        if var != 'UNITID':
+            df[var] = dictionary.column(var, datatype, len(rows), rng)
+
+    if 'CIPCODE' in df:
+        # The CSV writes CIP codes as text with the leading zero, e.g. 01.0101
+        df['CIPCODE'] = [f"{float(c):07.4f}" for c in df['CIPCODE']]
+    if name == 'hd2024.csv':
+        df['INSTNM'] = 'Synthetic College ' + df['UNITID'].astype(str)
+        df['CITY'] = 'City ' + (df['UNITID'] % 997).astype(str)
+        df['WEBADDR'] = 'www.college' + df['UNITID'].astype(str) + '.edu'
+    return df.drop_duplicates(key, keep='first')
+
+
+def generate_custom_file(hd: pd.DataFrame, rng: np.random.Generator) -> pd.DataFrame:
+    """The IPEDS Data Center export import_ipeds and ingest_ipeds_data read Carnegie / admission flags from."""
+    carnegie = DataDictionary(dictionary_dir() / 'hd2024.xlsx').column('CARNEGIEIC', 'N', len(hd), rng)
+    return pd.DataFrame({
+        'UnitID': hd['UNITID'],
+        'Institution Name': hd['INSTNM'],
+        'Carnegie Classification 2025: Institutional Classification (HD2024)': carnegie,
+        # 1=Yes, 2=No; roughly the national shares
+        'Open admission policy (IC2024)': np.where(rng.random(len(hd)) < 0.3, 1, 2),
+        'All programs offered completely via distance education (IC2024)': np.where(rng.random(len(hd)) < 0.05, 1, 2),
+    })
+
+
+def _suppressed(values: np.ndarray, rng: np.random.Generator, share: float) -> np.ndarray:
+    values = values.astype(object)
+    values[rng.random(len(values)) < share] = PRIVACY_SUPPRESSED
+    return values
+
+
+def generate_scorecard_institutions(hd: pd.DataFrame, rng: np.random.Generator,
+                                    width: int = SCORECARD_INSTITUTION_WIDTH) -> pd.DataFrame:
+    n = len(hd)
+    df = pd.DataFrame({
+        'UNITID': hd['UNITID'],
+        'OPEID': rng.integers(100000, 4300000, n),
+        'INSTNM': hd['INSTNM'],
+        'CITY': hd['CITY'],
+        'STABBR': hd['STABBR'],
+        'INSTURL': hd['WEBADDR'],
+        'HBCU': (rng.random(n) < 0.02).astype(int),
+        'HSI': (rng.random(n) < 0.1).astype(int),
+        'LOCALE': hd['LOCALE'],
+        'CCBASIC': hd['C21BASIC'],
+        'CONTROL': hd['CONTROL'],
+        'RELAFFIL': np.where(rng.random(n) < 0.25, rng.integers(22, 108, n), -2),
+        'WOMENONLY': (rng.random(n) < 0.01).astype(int),
+        'MENONLY': (rng.random(n) < 0.005).astype(int),
+        'MD_EARN_WNE_4YR': _suppressed(rng.integers(20000, 120000, n), rng, 0.25),
+        'GT_THRESHOLD_4YR': _suppressed(rng.random(n).round(4), rng, 0.25),
+    })
+    filler = max(0, width - len(df.columns))
+    if filler:
+        values = rng.random((n, filler)).round(4)
+        values[rng.random((n, filler)) < 0.5] = np.nan
+        df = pd.concat([df, pd.DataFrame(values, columns=[f'SC{i:04d}' for i in range(filler)])], axis=1)
+    return df
+
+
+def generate_field_of_study(completions: pd.DataFrame, hd: pd.DataFrame, rng: np.random.Generator) -> pd.DataFrame:
+    """Earnings rows for most of the (institution, 4-digit CIP, credential) programs in the completions file."""
+    titles = DataDictionary(dictionary_dir() / 'c2024_a.xlsx').labels.get('CIPCODE', {})
+    programs = completions[completions['CIPCODE'] != '99.0000'][['UNITID', 'CIPCODE', 'AWLEVEL']].copy()
+    programs = programs[programs['AWLEVEL'].isin(list(CREDENTIALS))]
+    programs['CIP4'] = programs['CIPCODE'].str.replace('.', '', regex=False).str[:4].astype(int)
+    programs['CREDLEV'] = programs['AWLEVEL'].map(lambda a: CREDENTIALS[a][0])
+    programs = programs.drop_duplicates(['UNITID', 'CIP4', 'CREDLEV'])
+    programs = programs[rng.random(len(programs)) < FOS_COVERAGE]
+
+    n = len(programs)
+    names = hd.set_index('UNITID')['INSTNM']
+    return pd.DataFrame({
+        'UNITID': programs['UNITID'].to_numpy(),
+        'OPEID6': rng.integers(1000, 43000, n),
+        'INSTNM': names.reindex(programs['UNITID']).to_numpy(),
+        'CONTROL': rng.integers(1, 4, n),
+        'MAIN': 1,
+        'CIPCODE': programs['CIP4'].to_numpy(),
+        'CIPDESC': [titles.get(float(c), 'Program') for c in programs['CIPCODE']],
+        'CREDLEV': programs['CREDLEV'].to_numpy(),
+        'CREDDESC': programs['AWLEVEL'].map(lambda a: CREDENTIALS[a][1]).to_numpy(),
+        'IPEDSCOUNT1': rng.integers(0, 500, n),
+        'EARN_COUNT_WNE_4YR': rng.integers(0, 300, n),
+        'EARN_MDN_4YR': _suppressed(rng.integers(20000, 150000, n), rng, 0.6),
+        'EARN_MDN_4YR_NAT': _suppressed(rng.integers(25000, 110000, n), rng, 0.1),
+    })
+
+
+def write_fixtures(directory: str, institutions: int, seed: int = 42,
+                   scorecard_width: int = SCORECARD_INSTITUTION_WIDTH) -> Dict[str, int]:
+    """
+    Write a full synthetic IPEDS + College Scorecard drop for `institutions`
+    schools into `directory`, with the file names the import commands expect.
+    Returns the number of data rows per file.
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    unitids = np.arange(100000, 100000 + institutions)
+    rows = {}
+
+    frames = {}
+    for name in IPEDS_FILES:
+        frames[name] = generate_ipeds_file(name, unitids, rng)
+        rows[name] = _write(frames[name], directory, name)
+        logger.info(f"Wrote {rows[name]} rows to {name}")
+
+    hd = frames['hd2024.csv']
+    rows[CUSTOM_FILE] = _write(generate_custom_file(hd, rng), directory, CUSTOM_FILE)
+    rows[SCORECARD_INSTITUTION_FILE] = _write(
+        generate_scorecard_institutions(hd, rng, scorecard_width), directory, SCORECARD_INSTITUTION_FILE)
+    rows[SCORECARD_FOS_FILE] = _write(
+        generate_field_of_study(frames['c2024_a.csv'], hd, rng), directory, SCORECARD_FOS_FILE)
+
+    for name in COPIED_DICTIONARIES:
+        target = os.path.join(directory, name)
+        if not os.path.exists(target):
+            shutil.copyfile(dictionary_dir() / name, target)
+    return rows
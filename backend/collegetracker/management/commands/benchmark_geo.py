@@ -0,0 +1,79 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from collegetracker.geo_index import GeoIndex, haversine_km
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the college geo index (radius and k-nearest) against a brute-force haversine scan.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--synthetic', type=int, default=0,
+                            help='Benchmark N random points across the US instead of the College table')
+        parser.add_argument('--queries', type=int, default=1000)
+        parser.add_argument('--radius', type=float, default=50.0, help='Radius in km for radius queries')
+        parser.add_argument('--k', type=int, default=10, help='Neighbours for k-nearest queries')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+
+        if options['synthetic']:
+            n = options['synthetic']
+            # Roughly the contiguous US, plus a few points in Alaska / Hawaii / territories
+            lats = rng.uniform(25.0, 49.0, n)
+            lons = rng.uniform(-124.0, -67.0, n)
+            outliers = rng.random(n) < 0.02
+            lats[outliers] = rng.uniform(13.0, 71.0, outliers.sum())
+            lons[outliers] = rng.uniform(-179.9, 145.0, outliers.sum())
+            start = time.perf_counter()
+            index = GeoIndex(np.arange(1, n + 1), lats, lons)
+        else:
+            start = time.perf_counter()
+            index = GeoIndex.from_database()
+            if not index.size:
+                self.stdout.write(self.style.ERROR("No colleges with coordinates in the database."))
+                return
+        build_ms = (time.perf_counter() - start) * 1000
+        self.stdout.write(f"Built geo index over {index.size} points in {build_ms:.1f}ms")
+
+        # Query around existing points so most queries have nearby matches
+        picks = rng.integers(0, index.size, options['queries'])
+        queries = [(float(np.degrees(index.lats_rad[i])) + rng.normal(0, 0.2),
+                    float(np.degrees(index.lons_rad[i])) + rng.normal(0, 0.2)) for i in picks]
+
+        radius, k = options['radius'], options['k']
+        timings = {'radius (index)': [], 'radius (scan)': [], 'k-nearest (index)': [], 'k-nearest (scan)': []}
+        mismatches = 0
+        for lat, lon in queries:
+            start = time.perf_counter()
+            ids, _ = index.within_radius(lat, lon, radius)
+            timings['radius (index)'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            dist = haversine_km(lat, lon, index.lats_rad, index.lons_rad)
+            scan_ids = index.ids[dist <= radius]
+            timings['radius (scan)'].append(time.perf_counter() - start)
+            mismatches += not np.array_equal(np.sort(ids), np.sort(scan_ids))
+
+            start = time.perf_counter()
+            ids, dists = index.nearest(lat, lon, k)
+            timings['k-nearest (index)'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            dist = haversine_km(lat, lon, index.lats_rad, index.lons_rad)
+            scan_top = np.sort(dist)[:k]
+            timings['k-nearest (scan)'].append(time.perf_counter() - start)
+            mismatches += not np.allclose(dists, scan_top)
+
+        for label, samples in timings.items():
+            us = np.array(samples) * 1e6
+            self.stdout.write(f"{label:<20} mean {us.mean():9.1f}us   p95 {np.percentile(us, 95):9.1f}us")
+
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f"{mismatches} results differed from the brute-force scan"))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"All {len(queries) * 2} index results matched the brute-force scan"))
@@ -0,0 +1,203 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from collegetracker.ipeds_fixtures import (
+    CUSTOM_FILE, SCORECARD_FOS_FILE, SCORECARD_INSTITUTION_FILE, SCORECARD_INSTITUTION_WIDTH, write_fixtures,
+)
+
+DEFAULT_SCALES = [1000, 10000]
+DEFAULT_POSTGRES_URL = 'postgres://postgres@localhost:5432/collegetracker_benchmark'
+MANIFEST = 'manifest.json'
+
+# Runs manage.py and, on the way out, writes the process's own peak RSS in kB
+# to $BENCHMARK_PEAK_FILE. Measured inside the child because ru_maxrss from
+# wait4() starts at the parent's high-water mark on Linux (a forked child
+# inherits it across exec). VmHWM belongs to the exec'd image alone.
+PEAK_LAUNCHER = """
+import os, resource, runpy, sys
+
+def peak_kb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+sys.argv = sys.argv[1:]
+try:
+    runpy.run_path(sys.argv[0], run_name='__main__')
+finally:
+    with open(os.environ['BENCHMARK_PEAK_FILE'], 'w') as f:
+        f.write(str(peak_kb()))
+"""
+
+# Import commands in the order a fresh database needs them: (command, arguments
+# given the fixture directory, fixture files whose rows it processes)
+IMPORTS = [
+    ('import_ipeds', lambda d: ['--data-dir', d], ['hd2024.csv']),
+    ('ingest_ipeds_data', lambda d: ['--data-dir', d], [CUSTOM_FILE]),
+    ('import_programs', lambda d: ['--data-dir', d], ['c2024_a.csv']),
+    ('ingest_performance', lambda d: ['--data-dir', d],
+     ['gr2024.csv', 'ef2024d.csv', 'c2024_a.csv', 'drvcost2024.csv', 'sfa2324.csv']),
+    ('update_scorecard_2026',
+     lambda d: [os.path.join(d, SCORECARD_INSTITUTION_FILE), os.path.join(d, SCORECARD_FOS_FILE)],
+     [SCORECARD_INSTITUTION_FILE, SCORECARD_FOS_FILE]),
+]
+
+
+class Command(BaseCommand):
+    help = ('Times each IPEDS / Scorecard import command on synthetic fixtures against throwaway SQLite and '
+            'Postgres databases, recording rows/sec and peak memory to a JSON baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES,
+                            help='Institution counts to generate fixtures for (e.g. 1000 10000 100000)')
+        parser.add_argument('--databases', nargs='+', choices=['sqlite', 'postgres'], default=['sqlite'])
+        parser.add_argument('--postgres-url', default=os.environ.get('BENCHMARK_POSTGRES_URL', DEFAULT_POSTGRES_URL),
+                            help='Database to migrate and flush for the Postgres runs; its contents are deleted')
+        parser.add_argument('--commands', nargs='+', choices=[name for name, _, _ in IMPORTS],
+                            help='Only time these commands (the others still run, untimed, when later ones need them)')
+        parser.add_argument('--fixtures-dir', default=os.path.join(tempfile.gettempdir(), 'collegetracker-import-fixtures'),
+                            help='Generated files are kept here and reused by later runs with the same scale and seed')
+        parser.add_argument('--scorecard-width', type=int, default=SCORECARD_INSTITUTION_WIDTH,
+                            help='Columns in the synthetic Scorecard institution file')
+        parser.add_argument('--source-cache', action='store_true',
+                            help='Leave the parsed-source cache on (runs measure cold parsing by default)')
+        parser.add_argument('--output', default=os.path.join(settings.BASE_DIR, 'benchmarks', 'import_baseline.json'))
+        parser.add_argument('--compare-only', action='store_true',
+                            help='Print the comparison with the stored baseline without updating it')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        baseline = self._load(options['output'])
+        runs = baseline.setdefault('runs', {})
+        timed = set(options['commands'] or [name for name, _, _ in IMPORTS])
+        last = max(i for i, (name, _, _) in enumerate(IMPORTS) if name in timed)
+
+        for scale in options['scales']:
+            directory, rows = self._fixtures(options['fixtures_dir'], scale, options['seed'], options['scorecard_width'])
+            for database in options['databases']:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{scale:,} institutions on {database}"))
+                env = self._environment(database, scale, options)
+                with tempfile.TemporaryFile('w+') as log:
+                    if not self._prepare(database, env, log):
+                        continue
+                    results = runs.setdefault(database, {}).setdefault(str(scale), {})
+                    for name, arguments, files in IMPORTS[:last + 1]:
+                        log.seek(0)
+                        log.truncate()
+                        code, seconds, peak_mb = self._run([name, *arguments(directory)], env, log)
+                        if code != 0:
+                            self.stdout.write(self.style.ERROR(f"{name} exited with {code}:\n{self._tail(log)}"))
+                            break
+                        if name not in timed:
+                            continue
+                        processed = sum(rows[f] for f in files)
+                        result = {
+                            'rows': processed,
+                            'seconds': round(seconds, 3),
+                            'rows_per_sec': round(processed / seconds, 1),
+                            'peak_rss_mb': round(peak_mb, 1),
+                            'recorded_at': timezone.now().isoformat(),
+                        }
+                        self._report(name, result, results.get(name))
+                        results[name] = result
+                    if database == 'sqlite':
+                        os.remove(env['BENCHMARK_DATABASE_URL'][len('sqlite:///'):])
+
+        if options['compare_only']:
+            return
+        baseline['environment'] = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'source_cache': options['source_cache'],
+        }
+        os.makedirs(os.path.dirname(options['output']), exist_ok=True)
+        with open(options['output'], 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['output']}"))
+
+    def _load(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _fixtures(self, root, scale, seed, width):
+        directory = os.path.join(root, f"{scale}-seed{seed}-w{width}")
+        manifest = os.path.join(directory, MANIFEST)
+        if os.path.exists(manifest):
+            with open(manifest) as f:
+                return directory, json.load(f)
+
+        self.stdout.write(f"Generating fixtures for {scale:,} institutions in {directory}...")
+        start = time.perf_counter()
+        rows = write_fixtures(directory, scale, seed=seed, scorecard_width=width)
+        with open(manifest, 'w') as f:
+            json.dump(rows, f, indent=2)
+        self.stdout.write(f"Generated {sum(rows.values()):,} rows in {time.perf_counter() - start:.1f}s")
+        return directory, rows
+
+    def _environment(self, database, scale, options):
+        if database == 'sqlite':
+            path = os.path.join(tempfile.gettempdir(), f"collegetracker-benchmark-{scale}-{os.getpid()}.sqlite3")
+            url = 'sqlite:///' + path
+        else:
+            url = options['postgres_url']
+        return {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': 'collegetracker.settings_benchmark',
+            'BENCHMARK_DATABASE_URL': url,
+            'SOURCE_CACHE_ENABLED': str(options['source_cache']),
+        }
+
+    def _prepare(self, database, env, log):
+        """Migrate (and for Postgres, empty) the benchmark database."""
+        steps = [['migrate', '--no-input']]
+        if database == 'postgres':
+            steps.append(['flush', '--no-input'])
+        for step in steps:
+            code, _, _ = self._run(step, env, log)
+            if code != 0:
+                self.stdout.write(self.style.ERROR(f"Skipping {database}: {' '.join(step)} failed\n{self._tail(log)}"))
+                return False
+        return True
+
+    def _run(self, arguments, env, log):
+        """Run one manage.py command in a fresh process; returns (exit code, seconds, peak RSS in MB)."""
+        with tempfile.NamedTemporaryFile('r', suffix='.peak') as peak:
+            start = time.perf_counter()
+            process = subprocess.run([sys.executable, '-c', PEAK_LAUNCHER, 'manage.py', *arguments],
+                                     cwd=settings.BASE_DIR, env={**env, 'BENCHMARK_PEAK_FILE': peak.name},
+                                     stdout=log, stderr=subprocess.STDOUT)
+            seconds = time.perf_counter() - start
+            written = peak.read().strip()
+        return process.returncode, seconds, int(written) / 1024 if written else float('nan')
+
+    def _tail(self, log, lines=20):
+        log.seek(0)
+        return ''.join(log.readlines()[-lines:])
+
+    def _report(self, name, result, previous):
+        line = (f"  {name:<22} {result['rows']:>10,} rows {result['seconds']:>9.2f}s "
+                f"{result['rows_per_sec']:>12,.0f} rows/sec {result['peak_rss_mb']:>8.0f}MB peak")
+        if previous:
+            speed = result['rows_per_sec'] / previous['rows_per_sec'] - 1
+            memory = result['peak_rss_mb'] / previous['peak_rss_mb'] - 1
+            line += f"  ({speed:+.0%} rows/sec, {memory:+.0%} memory vs baseline)"
+        self.stdout.write(line)
@@ -0,0 +1,143 @@
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from collegetracker.source_data import iter_csv_chunks
+from collegetracker.scorecard_sync import (
+    EARNINGS_FIELDS, FOS_COLUMNS, FOS_NA_VALUES, SUPPRESSED_VALUES,
+    normalize_cip, match_field_of_study, match_field_of_study_chunks,
+)
+
+CREDENTIALS = [
+    "Undergraduate Certificate or Diploma", "Associate's Degree", "Bachelor's Degree",
+    "Post-baccalaureate Certificate", "Master's Degree", "Doctoral Degree",
+    "First Professional Degree", "Graduate/Professional Certificate",
+]
+
+
+def legacy_match(programs: pd.DataFrame, fos: pd.DataFrame) -> dict:
+    """The old per-school nested loop, run on in-memory programs; {program id: (earnings, national)}."""
+    by_unitid = {u: group.to_dict('records') for u, group in programs.groupby('UNITID')}
+    result = {}
+    for unitid, school_df in fos.groupby('UNITID'):
+        school_programs = by_unitid.get(str(unitid))
+        if not school_programs:
+            continue
+        for _, row in school_df.iterrows():
+            csv_cip_4 = normalize_cip(row['CIPCODE'])
+            csv_cred = str(row['CREDDESC']).lower().strip()
+            for prog in school_programs:
+                db_cip_4 = normalize_cip(prog['cipcode'])
+                db_cred = str(prog['creddesc']).lower().strip()
+                if db_cip_4 == csv_cip_4 and (csv_cred in db_cred or db_cred in csv_cred):
+                    earnings = result.get(prog['id'], (None, None))
+                    for i, col in enumerate(('EARN_MDN_4YR', 'EARN_MDN_4YR_NAT')):
+                        val = row[col]
+                        if pd.notna(val) and str(val) not in SUPPRESSED_VALUES:
+                            try:
+                                value = int(float(val))
+                            except (ValueError, TypeError):
+                                continue
+                            earnings = earnings[:i] + (value,) + earnings[i + 1:]
+                    if earnings != (None, None):
+                        result[prog['id']] = earnings
+    return result
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the update_scorecard_2026 field-of-study join on a synthetic Field-of-Study file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Field-of-Study CSV rows to generate')
+        parser.add_argument('--schools', type=int, default=6000)
+        parser.add_argument('--programs-per-school', type=int, default=60)
+        parser.add_argument('--legacy-schools', type=int, default=50,
+                            help='Schools to run through the old nested loop for comparison')
+        parser.add_argument('--chunk-size', type=int, default=50_000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        n_rows, n_schools = options['rows'], options['schools']
+        unitids = np.arange(100000, 100000 + n_schools)
+        cip_families = np.unique(rng.integers(100, 5500, 400))
+
+        n_programs = n_schools * options['programs_per_school']
+        programs = pd.DataFrame({
+            'id': np.arange(1, n_programs + 1),
+            'UNITID': np.repeat(unitids, options['programs_per_school']).astype(str),
+            'cipcode': [f"{c // 100:02d}.{c % 100:02d}{rng.integers(0, 100):02d}"
+                        for c in rng.choice(cip_families, n_programs)],
+            'creddesc': rng.choice(CREDENTIALS, n_programs),
+            'median_earnings': None,
+            'national_median': None,
+        })
+        programs['cip4'] = programs['cipcode'].map(normalize_cip)
+
+        earnings = rng.integers(20000, 120000, n_rows).astype(object)
+        earnings[rng.random(n_rows) < 0.3] = 'PrivacySuppressed'
+        fos = pd.DataFrame({
+            'UNITID': rng.choice(unitids, n_rows),
+            'CIPCODE': rng.choice(cip_families, n_rows),
+            'CIPDESC': 'Synthetic field',
+            'CREDDESC': rng.choice(CREDENTIALS, n_rows),
+            'EARN_MDN_4YR': earnings,
+            'EARN_MDN_4YR_NAT': rng.integers(30000, 90000, n_rows),
+        })
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'fos.csv')
+            fos.to_csv(path, index=False)
+            self.stdout.write(f"Wrote {n_rows} rows ({os.path.getsize(path) / 1e6:.1f}MB) for "
+                              f"{n_schools} schools / {n_programs} programs")
+
+            def whole_file():
+                return match_field_of_study(programs, pd.read_csv(path, usecols=list(FOS_COLUMNS)))
+
+            def streamed():
+                chunks = iter_csv_chunks(path, FOS_COLUMNS, chunksize=options['chunk_size'], cache=False,
+                                         na_values=FOS_NA_VALUES)
+                return match_field_of_study_chunks(programs, chunks)
+
+            results = {}
+            for label, run in (('whole file', whole_file), ('streamed', streamed)):
+                start = time.perf_counter()
+                results[label] = run()
+                elapsed = time.perf_counter() - start
+                # Second pass under tracemalloc, which slows allocation-heavy code
+                tracemalloc.start()
+                run()
+                peak = tracemalloc.get_traced_memory()[1] / 1e6
+                tracemalloc.stop()
+                self.stdout.write(f"{label:<11} read + join {elapsed:.2f}s ({n_rows / elapsed:,.0f} rows/sec), "
+                                  f"peak {peak:.0f}MB, {len(results[label])} programs matched")
+
+            if not results['whole file'].sort_index().equals(results['streamed'].sort_index()):
+                self.stdout.write(self.style.ERROR("Streamed and whole-file matches differ"))
+            fos = pd.read_csv(path, usecols=list(FOS_COLUMNS))
+        join_s = elapsed
+
+        # The old loop is far too slow for the whole file; time a sample of schools and extrapolate
+        sample = rng.choice(unitids, min(options['legacy_schools'], n_schools), replace=False)
+        sample_fos = fos[fos['UNITID'].isin(sample)]
+        sample_programs = programs[programs['UNITID'].isin(sample.astype(str))]
+        start = time.perf_counter()
+        legacy = legacy_match(sample_programs, sample_fos)
+        legacy_s = time.perf_counter() - start
+        estimate = legacy_s * n_rows / max(len(sample_fos), 1)
+        self.stdout.write(f"legacy loop {legacy_s:.2f}s for {len(sample_fos)} rows "
+                          f"(~{estimate:.0f}s extrapolated to the full file, {estimate / join_s:.0f}x slower)")
+
+        expected = match_field_of_study(sample_programs, sample_fos)
+        got = {int(pk): tuple(None if np.isnan(v) else int(v) for v in row)
+               for pk, row in zip(expected.index, expected[EARNINGS_FIELDS].itertuples(index=False))}
+        if got == legacy:
+            self.stdout.write(self.style.SUCCESS(f"Hash join matched the legacy loop on all {len(legacy)} sampled programs"))
+        else:
+            diff = len(set(got.items()) ^ set(legacy.items()))
+            self.stdout.write(self.style.ERROR(f"{diff} sampled programs differ from the legacy loop"))
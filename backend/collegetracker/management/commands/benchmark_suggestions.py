@@ -0,0 +1,80 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from collegetracker.models import College
+from collegetracker.suggestions import SuggestionIndex, legacy_score, MIN_SUGGESTION_SCORE
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the trigram "did you mean" index against the old difflib scan over all college names.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=200, help='Number of misspelled queries to generate')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def _misspell(self, rng, name):
+        # Take a 1-3 word slice of a real name and apply a couple of typos
+        words = name.split()
+        start = rng.randrange(len(words))
+        query = list(' '.join(words[start:start + rng.randint(1, 3)]).lower())
+        for _ in range(rng.randint(1, 2)):
+            if not query:
+                break
+            pos = rng.randrange(len(query))
+            op = rng.choice(['drop', 'swap', 'replace'])
+            if op == 'drop':
+                del query[pos]
+            elif op == 'swap' and pos + 1 < len(query):
+                query[pos], query[pos + 1] = query[pos + 1], query[pos]
+            else:
+                query[pos] = rng.choice(string.ascii_lowercase)
+        return ''.join(query) or name.lower()
+
+    def handle(self, *args, **options):
+        names = list(College.objects.values_list('name', flat=True))
+        if not names:
+            self.stdout.write(self.style.ERROR("No colleges in the database."))
+            return
+
+        rng = random.Random(options['seed'])
+        queries = [self._misspell(rng, rng.choice(names)) for _ in range(options['queries'])]
+
+        start = time.perf_counter()
+        index = SuggestionIndex(names)
+        build_ms = (time.perf_counter() - start) * 1000
+        self.stdout.write(f"Built trigram index over {len(index.names)} names in {build_ms:.1f}ms")
+
+        legacy_times, index_times = [], []
+        agree = 0
+        for query in queries:
+            query_lower = query.lower()
+
+            start = time.perf_counter()
+            scored = sorted(((legacy_score(query_lower, n), n) for n in names), key=lambda x: x[0], reverse=True)
+            legacy_best = scored[0] if scored and scored[0][0] > MIN_SUGGESTION_SCORE else None
+            legacy_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            results = index.suggest(query, limit=5)
+            index_times.append(time.perf_counter() - start)
+
+            # Ties can legitimately pick a different name, so compare scores
+            index_best = results[0] if results else None
+            if legacy_best is None and index_best is None:
+                agree += 1
+            elif legacy_best and index_best and abs(legacy_best[0] - index_best[1]) < 1e-9:
+                agree += 1
+
+        def summary(label, samples):
+            ms = sorted(t * 1000 for t in samples)
+            p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+            self.stdout.write(f"{label:<14} mean {sum(ms) / len(ms):8.2f}ms   p95 {p95:8.2f}ms")
+            return sum(ms) / len(ms)
+
+        legacy_mean = summary("difflib scan", legacy_times)
+        index_mean = summary("trigram index", index_times)
+        self.stdout.write(f"Speedup: {legacy_mean / max(index_mean, 1e-9):.1f}x")
+        self.stdout.write(self.style.SUCCESS(
+            f"Top suggestion agreed with difflib on {agree}/{len(queries)} queries"))
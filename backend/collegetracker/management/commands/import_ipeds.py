@@ -1,56 +1,115 @@
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 from django.core.management.base import BaseCommand
-from collegetracker.models import College
+from django.db import transaction
+from collegetracker.models import College, SmartCollege
+from collegetracker.bulk_upsert import bulk_upsert, DEFAULT_BATCH_SIZE
+from collegetracker.data_version import batched_data_change, bump_data_version
+from collegetracker.source_data import IPEDS_DIR, read_csv_columns
+from collegetracker.text_search import rebuild_search_index
+
+# Source files as (name, columns with dtypes, read_csv options). hd2024 is the
+# base table; every other file is left-joined onto it by UNITID. Only the
+# merged columns are parsed, and re-runs load them from the source cache.
+SOURCES = [
+    ("hd2024.csv", {
+        'UNITID': 'str', 'INSTNM': None, 'ADDR': None, 'CITY': None, 'STABBR': None, 'WEBADDR': None,
+        'LATITUDE': None, 'LONGITUD': None, 'LOCALE': None, 'CONTROL': None, 'HBCU': None,
+        'C21BASIC': None, 'HLOFFER': None,
+    }, {'encoding': 'utf-8-sig'}),
+    # Derived Admissions
+    ("drvadm2024.csv", {'UNITID': 'str', 'DVADM01': None}, {}),
+    # Admissions (Scores)
+    ("adm2024.csv", {'UNITID': 'str', 'SATVR50': None, 'SATMT50': None, 'ACTCM50': None}, {}),
+    # Derived Cost
+    ("drvcost2024.csv", {'UNITID': 'str', 'COTSON': None, 'TUFEYR1': None, 'TUFEYR3': None}, {}),
+    # Derived Enrollment
+    ("drvef2024.csv", {'UNITID': 'str', 'DVEF01': None}, {}),
+    # Custom Data (Open Admission, Distance Ed, Carnegie)
+    ("Data_2-16-2026---799.csv", {
+        'UnitID': 'str',
+        'Open admission policy (IC2024)': None,
+        'All programs offered completely via distance education (IC2024)': None,
+    }, {}),
+]
+
+
+def _init_worker():
+    # Spawned (non-fork) workers start without Django, which the source cache reads settings from
+    import django
+    django.setup()
+
+
+def load_source(path, columns, read_kwargs, cache=True):
+    """One source file indexed by UNITID; module-level so worker processes can run it."""
+    df = read_csv_columns(path, columns, cache=cache, **read_kwargs)
+    return df.rename(columns={'UnitID': 'UNITID'}).set_index('UNITID')
+
+
+def load_sources(ipeds_dir, workers, cache=True):
+    """
+    Parse every SOURCES file, concurrently in a process pool when workers > 1
+    (CSV parsing holds the GIL, so threads would not overlap). Frames come
+    back in SOURCES order.
+    """
+    jobs = [(os.path.join(ipeds_dir, name), columns, read_kwargs) for name, columns, read_kwargs in SOURCES]
+    if workers <= 1:
+        return [load_source(*job, cache=cache) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=_init_worker) as pool:
+        futures = [pool.submit(load_source, *job, cache=cache) for job in jobs]
+        return [future.result() for future in futures]
+
+
+def join_sources(frames):
+    """Left-join every frame onto the first in one multi-way join on the UNITID index."""
+    base, *others = frames
+    # A repeated UNITID in a secondary file used to fan rows out before the
+    # last copy won; keeping only the last copy up front gives the same result
+    others = [df[~df.index.duplicated(keep='last')] for df in others]
+    return base.join(others, how='left').reset_index()
+
 
 class Command(BaseCommand):
     help = 'Import college data from IPEDS CSV files'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Rows per bulk_create / bulk_update statement')
+        parser.add_argument('--data-dir', default=IPEDS_DIR, help='Directory holding the IPEDS CSV files')
+        parser.add_argument('--workers', type=int, default=min(len(SOURCES), os.cpu_count() or 1),
+                            help='Processes parsing source files concurrently (1 reads them one after another)')
+        parser.add_argument('--compare-sequential', action='store_true',
+                            help='Also time an uncached sequential load and report it next to the parallel one')
+
     def handle(self, *args, **options):
-        ipeds_dir = "/Users/banupaksoy/Desktop/capstone/IPEDS_data"
-        
+        ipeds_dir = options['data_dir']
+        workers = options['workers']
+
         self.stdout.write("Loading IPEDS data files...")
-        
-        # Load files with appropriate encodings and UNITID as string
-        hd_df = pd.read_csv(os.path.join(ipeds_dir, "hd2024.csv"), encoding='utf-8-sig', low_memory=False)
-        hd_df['UNITID'] = hd_df['UNITID'].astype(str)
-        
-        # Derived Admissions
-        drvadm_path = os.path.join(ipeds_dir, "drvadm2024.csv")
-        drvadm_df = pd.read_csv(drvadm_path, low_memory=False)
-        drvadm_df['UNITID'] = drvadm_df['UNITID'].astype(str)
-        
-        # Admissions (Scores)
-        adm_path = os.path.join(ipeds_dir, "adm2024.csv")
-        adm_df = pd.read_csv(adm_path, low_memory=False)
-        adm_df['UNITID'] = adm_df['UNITID'].astype(str)
-        
-        # Derived Cost
-        drvcost_path = os.path.join(ipeds_dir, "drvcost2024.csv")
-        drvcost_df = pd.read_csv(drvcost_path, low_memory=False)
-        drvcost_df['UNITID'] = drvcost_df['UNITID'].astype(str)
-        
-        # Derived Enrollment
-        drvef_path = os.path.join(ipeds_dir, "drvef2024.csv")
-        drvef_df = pd.read_csv(drvef_path, low_memory=False)
-        drvef_df['UNITID'] = drvef_df['UNITID'].astype(str)
-
-        # Custom Data (Open Admission, Distance Ed, Carnegie)
-        custom_path = os.path.join(ipeds_dir, "Data_2-16-2026---799.csv")
-        custom_df = pd.read_csv(custom_path, low_memory=False)
-        custom_df['UnitID'] = custom_df['UnitID'].astype(str)
-        custom_df.rename(columns={'UnitID': 'UNITID'}, inplace=True)
+        if options['compare_sequential']:
+            # Bypass the source cache so both runs actually parse the files
+            timings = {}
+            if workers <= 1:
+                self.stdout.write("  --workers is 1, so both runs below are sequential")
+            for label, n in (('sequential', 1), (f'parallel ({workers} workers)', workers)):
+                start = time.perf_counter()
+                frames = load_sources(ipeds_dir, n, cache=False)
+                timings[label] = time.perf_counter() - start
+            baseline = timings['sequential']
+            for label, seconds in timings.items():
+                self.stdout.write(f"  {label:<24} {seconds:.2f}s ({baseline / seconds:.1f}x)")
+        else:
+            start = time.perf_counter()
+            frames = load_sources(ipeds_dir, workers)
+            self.stdout.write(f"Loaded {len(frames)} files in {time.perf_counter() - start:.2f}s "
+                              f"({'sequential' if workers <= 1 else f'{workers} workers'})")
 
         self.stdout.write("Merging data...")
-        
-        # Merge all data on UNITID
-        df = hd_df[['UNITID', 'INSTNM', 'ADDR', 'CITY', 'STABBR', 'WEBADDR', 'LATITUDE', 'LONGITUD', 'LOCALE', 'CONTROL', 'HBCU', 'C21BASIC', 'HLOFFER']]
-        
-        df = df.merge(drvadm_df[['UNITID', 'DVADM01']], on='UNITID', how='left')
-        df = df.merge(adm_df[['UNITID', 'SATVR50', 'SATMT50', 'ACTCM50']], on='UNITID', how='left')
-        df = df.merge(drvcost_df[['UNITID', 'COTSON', 'TUFEYR1', 'TUFEYR3']], on='UNITID', how='left')
-        df = df.merge(drvef_df[['UNITID', 'DVEF01']], on='UNITID', how='left')
-        
+        df = join_sources(frames)
+
         # Rename columns to match model
         df.rename(columns={
             'INSTNM': 'name',
@@ -65,83 +124,114 @@ class Command(BaseCommand):
             'C21BASIC': 'carnegie_classification'
         }, inplace=True)
 
-        # Merge custom data for Open Admission and distance ed
-        custom_cols = {
+        # Custom data for Open Admission and distance ed
+        df.rename(columns={
             'Open admission policy (IC2024)': 'open_ads_raw',
             'All programs offered completely via distance education (IC2024)': 'dist_ed_raw'
-        }
-        df = df.merge(custom_df[['UNITID'] + list(custom_cols.keys())], on='UNITID', how='left')
-        df.rename(columns=custom_cols, inplace=True)
+        }, inplace=True)
 
         self.stdout.write(f"Merged dataframe size: {len(df)}")
         if len(df) == 0:
             self.stdout.write("Warning: Merged dataframe is empty!")
             return
 
-        count = 0
-        created_count = 0
         self.stdout.write(f"Updating {len(df)} colleges...")
-        
-        for _, row in df.iterrows():
-            # Calculate SAT score as sum of Verbal and Math 50th percentiles
-            sat_score = None
-            try:
-                if pd.notnull(row.get('SATVR50')) and pd.notnull(row.get('SATMT50')):
-                    sat_score = int(row['SATVR50']) + int(row['SATMT50'])
-                elif pd.notnull(row.get('SATVR50')):
-                    sat_score = int(row['SATVR50']) * 2 # Fallback
-                elif pd.notnull(row.get('SATMT50')):
-                    sat_score = int(row['SATMT50']) * 2 # Fallback
-            except:
-                pass
-            
-            college, created = College.objects.update_or_create(
-                UNITID=row['UNITID'],
-                defaults={
-                    'name': row['name'],
-                    'city': row['city'],
-                    'state': row['state'],
-                    'website': str(row['website']) if pd.notnull(row['website']) else '',
-                    'admission_rate': float(row['admission_rate'])/100.0 if pd.notnull(row['admission_rate']) else None,
-                    'sat_score': sat_score,
-                    'cost_of_attendance': int(row['cost_of_attendance']) if pd.notnull(row['cost_of_attendance']) else None,
-                    'tuition_in_state': int(row['tuition_in_state']) if pd.notnull(row['tuition_in_state']) else None,
-                    'tuition_out_state': int(row['tuition_out_state']) if pd.notnull(row['tuition_out_state']) else None,
-                    'latitude': float(row['LATITUDE']) if pd.notnull(row['LATITUDE']) else None,
-                    'longitude': float(row['LONGITUD']) if pd.notnull(row['LONGITUD']) else None,
-                    'enrollment_all': int(row['enrollment_all']) if pd.notnull(row['enrollment_all']) else None,
-                    'carnegie_classification': int(row['carnegie_classification']) if pd.notnull(row['carnegie_classification']) else None,
-                    'locale': int(row['LOCALE']) if pd.notnull(row['LOCALE']) else None,
-                    'control': int(row['CONTROL']) if pd.notnull(row['CONTROL']) else None,
-                    'hbcu': row['HBCU'] == 1 if pd.notnull(row['HBCU']) else False,
-                    'is_open_admission': row['open_ads_raw'] == 1 if pd.notnull(row['open_ads_raw']) else False,
-                    'is_distance_education': row['dist_ed_raw'] == 1 if pd.notnull(row['dist_ed_raw']) else False,
-                }
-            )
-
-            # Also update SmartCollege
-            from collegetracker.models import SmartCollege
-            SmartCollege.objects.update_or_create(
-                name=row['name'],
-                city=row['city'],
-                state=row['state'],
-                defaults={
-                    'website': str(row['website']) if pd.notnull(row['website']) else '',
-                    'admission_rate': float(row['admission_rate'])/100.0 if pd.notnull(row['admission_rate']) else None,
-                    'sat_score': sat_score,
-                    'cost_of_attendance': int(row['cost_of_attendance']) if pd.notnull(row['cost_of_attendance']) else None,
-                    'tuition_in_state': int(row['tuition_in_state']) if pd.notnull(row['tuition_in_state']) else None,
-                    'tuition_out_state': int(row['tuition_out_state']) if pd.notnull(row['tuition_out_state']) else None,
-                    'latitude': float(row['LATITUDE']) if pd.notnull(row['LATITUDE']) else None,
-                    'longitude': float(row['LONGITUD']) if pd.notnull(row['LONGITUD']) else None,
-                    'enrollment_all': int(row['enrollment_all']) if pd.notnull(row['enrollment_all']) else None,
-                    'CCBASIC': str(row['carnegie_classification']) if pd.notnull(row['carnegie_classification']) else None,
-                    'HLOFFER': str(row['HLOFFER']) if pd.notnull(row['HLOFFER']) else None,
-                }
-            )
-
-            count += 1
-            if count % 100 == 0:
-                self.stdout.write(f"Processed {count} colleges...")
-
-        self.stdout.write(self.style.SUCCESS(f'Successfully imported {count} colleges'))
+        with batched_data_change():
+            self._update_rows(df, options['batch_size'])
+        rebuild_search_index()
+
+    def _update_rows(self, df, batch_size):
+        start = time.perf_counter()
+        df = df.drop_duplicates('UNITID', keep='last')
+
+        # Calculate SAT score as sum of Verbal and Math 50th percentiles,
+        # doubling whichever one is present when the other is missing
+        verbal = pd.to_numeric(df['SATVR50'], errors='coerce')
+        maths = pd.to_numeric(df['SATMT50'], errors='coerce')
+        sat_score = verbal.add(maths).fillna(verbal * 2).fillna(maths * 2)
+
+        website = df['website'].astype(object).where(df['website'].notna(), '').astype(str).tolist()
+        admission_rate = _float_column(pd.to_numeric(df['admission_rate'], errors='coerce') / 100.0)
+        cost = _int_column(df['cost_of_attendance'])
+        tuition_in = _int_column(df['tuition_in_state'])
+        tuition_out = _int_column(df['tuition_out_state'])
+        latitude = _float_column(df['LATITUDE'])
+        longitude = _float_column(df['LONGITUD'])
+        enrollment = _int_column(df['enrollment_all'])
+        carnegie = _int_column(df['carnegie_classification'])
+        sat = _int_column(sat_score)
+
+        colleges = pd.DataFrame({
+            'UNITID': df['UNITID'].tolist(),
+            'name': df['name'].tolist(),
+            'city': df['city'].tolist(),
+            'state': df['state'].tolist(),
+            'website': website,
+            'admission_rate': admission_rate,
+            'sat_score': sat,
+            'cost_of_attendance': cost,
+            'tuition_in_state': tuition_in,
+            'tuition_out_state': tuition_out,
+            'latitude': latitude,
+            'longitude': longitude,
+            'enrollment_all': enrollment,
+            'carnegie_classification': carnegie,
+            'locale': _int_column(df['LOCALE']),
+            'control': _int_column(df['CONTROL']),
+            'hbcu': _flag_column(df['HBCU']),
+            'is_open_admission': _flag_column(df['open_ads_raw']),
+            'is_distance_education': _flag_column(df['dist_ed_raw']),
+        }, dtype=object)
+
+        smart_colleges = pd.DataFrame({
+            'name': df['name'].tolist(),
+            'city': df['city'].tolist(),
+            'state': df['state'].tolist(),
+            'website': website,
+            'admission_rate': admission_rate,
+            'sat_score': sat,
+            'cost_of_attendance': cost,
+            'tuition_in_state': tuition_in,
+            'tuition_out_state': tuition_out,
+            'latitude': latitude,
+            'longitude': longitude,
+            'enrollment_all': enrollment,
+            'CCBASIC': [None if v is None else str(v) for v in carnegie],
+            'HLOFFER': [None if v is None else str(v) for v in _int_column(df['HLOFFER'])],
+        }, dtype=object)
+        convert_seconds = time.perf_counter() - start
+
+        with transaction.atomic():
+            colleges_result = bulk_upsert(
+                College, colleges.to_dict('records'), ['UNITID'],
+                [c for c in colleges.columns if c != 'UNITID'], batch_size=batch_size)
+            smart_result = bulk_upsert(
+                SmartCollege, smart_colleges.to_dict('records'), ['name', 'city', 'state'],
+                [c for c in smart_colleges.columns if c not in ('name', 'city', 'state')],
+                batch_size=batch_size)
+            # Bulk writes skip the College post_save receiver
+            bump_data_version()
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"Converted {len(colleges)} rows in {convert_seconds:.2f}s")
+        for label, result in (('College', colleges_result), ('SmartCollege', smart_result)):
+            self.stdout.write(f"{label}: {result.created} created, {result.updated} updated, "
+                              f"{result.unchanged} unchanged")
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully imported {len(colleges)} colleges in {elapsed:.2f}s '
+            f'({len(colleges) / max(elapsed, 1e-9):.0f} rows/sec)'))
+
+
+def _float_column(series):
+    values = pd.to_numeric(series, errors='coerce')
+    return values.astype(object).where(values.notna(), None).tolist()
+
+
+def _int_column(series):
+    # Truncate like int() did on the float columns pandas reads
+    values = pd.to_numeric(series, errors='coerce')
+    return np.trunc(values).astype('Int64').astype(object).where(values.notna(), None).tolist()
+
+
+def _flag_column(series):
+    return (pd.to_numeric(series, errors='coerce') == 1).tolist()
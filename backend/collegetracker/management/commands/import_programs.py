@@ -1,13 +1,39 @@
 import os
-import pandas as pd
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from collegetracker.models import College, CollegeProgram
+from collegetracker.bulk_upsert import DEFAULT_BATCH_SIZE, IncrementalSync
+from collegetracker.data_version import batched_data_change, bump_data_version
+from collegetracker.source_data import CSV_CHUNK_ROWS, IPEDS_DIR, iter_csv_chunks, read_excel_sheet
+from collegetracker.text_search import rebuild_search_index
+
+# Completions columns the import reads; the file has ~60 more per-demographic counts
+COMPLETIONS_COLUMNS = {
+    'UNITID': 'str',
+    'CIPCODE': None,
+    'MAJORNUM': 'int8',
+    'AWLEVEL': 'int16',
+}
+
+# A program is one (college, CIP code, award) record; its content hash covers every imported column
+PROGRAM_KEY_FIELDS = ['college_id', 'cipcode', 'creddesc']
+PROGRAM_FIELDS = ['college_id', 'cipcode', 'cipdesc', 'creddesc', 'UNITID']
+
 
 class Command(BaseCommand):
     help = 'Import college programs/majors from IPEDS completions file'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CSV_CHUNK_ROWS,
+                            help='CSV rows read into memory at a time')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Rows per bulk_create / bulk_update statement')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would change without writing anything')
+        parser.add_argument('--data-dir', default=IPEDS_DIR, help='Directory holding c2024_a.csv / c2024_a.xlsx')
+
     def handle(self, *args, **options):
-        ipeds_dir = "/Users/banupaksoy/Desktop/capstone/IPEDS_data"
+        ipeds_dir = options['data_dir']
         csv_path = os.path.join(ipeds_dir, "c2024_a.csv")
         xlsx_path = os.path.join(ipeds_dir, "c2024_a.xlsx")
 
@@ -18,7 +44,7 @@ class Command(BaseCommand):
         self.stdout.write("Loading CIP and Award dictionaries from Excel...")
         # Load CIP titles
         try:
-            dict_df = pd.read_excel(xlsx_path, sheet_name='Frequencies')
+            dict_df = read_excel_sheet(xlsx_path, 'Frequencies')
             
             # Filter for CIPCODE and AWLEVEL
             cip_entries = dict_df[dict_df['VarName'] == 'CIPCODE']
@@ -46,66 +72,72 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR(f"Error loading dictionaries: {e}"))
             return
 
-        self.stdout.write("Reading completions CSV (this may take a minute due to size)...")
-        # Read completions data
-        df = pd.read_csv(csv_path, low_memory=False)
-        df['UNITID'] = df['UNITID'].astype(str)
-        
-        # Filter for primary majors (MAJORNUM=1) and skip 'Total' records (CIPCODE=99 or similar if applicable)
-        # Actually CIPCODE 99 is usually 'Grand Total'. 
-        df = df[df['MAJORNUM'] == 1]
-        
-        colleges = {c.UNITID: c for c in College.objects.all()}
+        colleges = dict(College.objects.exclude(UNITID__isnull=True).values_list('UNITID', 'id'))
         self.stdout.write(f"Loaded {len(colleges)} colleges from database.")
 
-        self.stdout.write(f"Processing {len(df)} program records...")
-        
-        # Optional: Clear existing programs if you want a clean sync
-        CollegeProgram.objects.all().delete()
-        self.stdout.write("Cleared existing programs.")
-
-        program_objects = []
-        count = 0
-        total_records = len(df)
-
-        for _, row in df.iterrows():
-            unitid = str(row['UNITID'])
-            if unitid in colleges:
-                # Handle CIPCODE matching
-                cip_val = row['CIPCODE']
-                try:
-                    # Match as float
-                    cip_key = float(cip_val)
-                    if cip_key == 99.0: # Skip total rows
-                        continue
-                    cip_desc = cip_map.get(cip_key, f"Program {cip_val}")
-                except:
-                    cip_desc = cip_map.get(str(cip_val), f"Program {cip_val}")
+        # Incremental sync instead of clearing the table: programs are matched on
+        # (college, CIP code, award level) and only new, changed and vanished
+        # records are written, all in one transaction so none go missing mid-run.
+        # Batched so the per-row signals of stale deletes defer to the rebuild below.
+        self.stdout.write("Streaming completions CSV...")
+        with batched_data_change(), transaction.atomic():
+            sync = IncrementalSync(CollegeProgram, PROGRAM_KEY_FIELDS, PROGRAM_FIELDS,
+                                   batch_size=options['batch_size'], dry_run=options['dry_run'])
+            count = 0
+            program_rows = []
+            for _, row in self._primary_majors(csv_path, options['chunk_size']):
+                unitid = str(row['UNITID'])
+                if unitid in colleges:
+                    # Handle CIPCODE matching
+                    cip_val = row['CIPCODE']
+                    try:
+                        # Match as float
+                        cip_key = float(cip_val)
+                        if cip_key == 99.0: # Skip total rows
+                            continue
+                        cip_desc = cip_map.get(cip_key, f"Program {cip_val}")
+                    except:
+                        cip_desc = cip_map.get(str(cip_val), f"Program {cip_val}")
 
-                # Handle Award Level matching
-                aw_val = row['AWLEVEL']
-                try:
-                    aw_key = float(aw_val)
-                    cred_desc = award_map.get(aw_key, f"Award Level {aw_val}")
-                except:
-                    cred_desc = award_map.get(str(aw_val), f"Award Level {aw_val}")
-                
-                program_objects.append(CollegeProgram(
-                    college=colleges[unitid],
-                    cipcode=str(cip_val),
-                    cipdesc=cip_desc,
-                    creddesc=cred_desc,
-                    UNITID=unitid
-                ))
-                count += 1
-                
-            if len(program_objects) >= 5000:
-                CollegeProgram.objects.bulk_create(program_objects, ignore_conflicts=True)
-                program_objects = []
-                self.stdout.write(f"Imported {count} / {total_records} records...")
-
-        if program_objects:
-            CollegeProgram.objects.bulk_create(program_objects, ignore_conflicts=True)
-            self.stdout.write(f"Imported {count} total program records.")
+                    # Handle Award Level matching
+                    aw_val = row['AWLEVEL']
+                    try:
+                        aw_key = float(aw_val)
+                        cred_desc = award_map.get(aw_key, f"Award Level {aw_val}")
+                    except:
+                        cred_desc = award_map.get(str(aw_val), f"Award Level {aw_val}")
+
+                    program_rows.append({
+                        'college_id': colleges[unitid],
+                        'cipcode': str(cip_val),
+                        'cipdesc': cip_desc,
+                        'creddesc': cred_desc,
+                        'UNITID': unitid,
+                    })
+                    count += 1
+
+                if len(program_rows) >= 5000:
+                    sync.add(program_rows)
+                    program_rows = []
+                    self.stdout.write(f"Compared {count} records...")
+
+            sync.add(program_rows)
+            result = sync.finish()
 
+        self.stdout.write(f"Compared {count} total program records: {result.summary()}")
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING("Dry run: no changes were written."))
+            return
+
+        if result.created or result.updated or result.deleted:
+            bump_data_version()
+            # Program names are part of the full-text document of their college
+            rebuild_search_index({college_id for college_id, *_ in sync.changed_keys})
         self.stdout.write(self.style.SUCCESS(f'Successfully completed program import.'))
+
+    def _primary_majors(self, csv_path, chunk_size):
+        """(index, row) pairs for primary-major (MAJORNUM=1) records, read one chunk at a time."""
+        for chunk in iter_csv_chunks(csv_path, COMPLETIONS_COLUMNS, chunk_size):
+            # CIPCODE 99 is usually 'Grand Total'; the row loop skips it
+            chunk = chunk[chunk['MAJORNUM'] == 1]
+            yield from chunk.iterrows()
@@ -1,19 +1,27 @@
 import csv
 import os
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from collegetracker.models import College
+from collegetracker.bulk_upsert import DEFAULT_BATCH_SIZE
+from collegetracker.data_version import bump_data_version
+from collegetracker.source_data import IPEDS_DIR
+
+# The only College columns this file sets
+FIELDS = ['carnegie_classification', 'is_open_admission', 'is_distance_education']
+
 
 class Command(BaseCommand):
     help = 'Update College data from IPEDS CSV'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Rows per bulk_update statement')
+        parser.add_argument('--data-dir', default=IPEDS_DIR, help='Directory holding the IPEDS Data Center export')
+
     def handle(self, *args, **options):
-        # Define the relative path to the IPEDS file
-        # The file is in IPEDS_data at the project root.
-        # This script runs from inside backend (usually), so we navigate up.
-        # The user's metadata says the file is at /Users/banupaksoy/Desktop/capstone/IPEDS_data/Data_2-16-2026---799.csv
-        # We can use the absolute path for safety as it was confirmed by list_dir.
-        
-        csv_file_path = '/Users/banupaksoy/Desktop/capstone/IPEDS_data/Data_2-16-2026---799.csv'
+        # The Data Center export lives in IPEDS_DIR unless --data-dir points elsewhere (e.g. benchmark fixtures)
+        csv_file_path = os.path.join(options['data_dir'], 'Data_2-16-2026---799.csv')
 
         if not os.path.exists(csv_file_path):
             self.stdout.write(self.style.ERROR(f'File not found at {csv_file_path}'))
@@ -21,58 +29,64 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS(f'Reading IPEDS data from {csv_file_path}...'))
 
-        updated_count = 0
+        # One query for every college's current values instead of a get() per row
+        current = {
+            unitid: (pk, tuple(values))
+            for pk, unitid, *values in College.objects.exclude(UNITID__isnull=True).values_list('pk', 'UNITID', *FIELDS)
+        }
+
+        changes = {}
+        matched_count = 0
         not_found_count = 0
-        
+
         with open(csv_file_path, mode='r', encoding='utf-8-sig') as file:
             reader = csv.DictReader(file)
-            
+
             for row in reader:
                 unitid = row.get('UnitID')
                 if not unitid:
                     continue
-                
-                # Fetch college by UNITID
+                if unitid not in current:
+                    not_found_count += 1
+                    continue
+
+                pk, stored = current[unitid]
+                # A repeated UNITID builds on the values its earlier rows left pending
+                carnegie = changes.get(pk, stored)[0]
+                # Map fields
+                # "Carnegie Classification 2025..." -> carnegie_classification
+                cc_basic = row.get('Carnegie Classification 2025: Institutional Classification (HD2024)')
                 try:
-                    # Our College model has UNITID field (case insensitive match might be safer but UNITID is usually clean)
-                    college = College.objects.get(UNITID=unitid)
-                    
-                    # Map fields
-                    # "Carnegie Classification 2025..." -> carnegie_classification
-                    cc_basic = row.get('Carnegie Classification 2025: Institutional Classification (HD2024)')
-                    
-                    # "Open admission policy (IC2024)" -> 1=Yes, 2=No
-                    open_admit = row.get('Open admission policy (IC2024)')
-                    
-                    # "All programs offered completely via distance education (IC2024)" -> 1=Yes, 2=No
-                    dist_ed = row.get('All programs offered completely via distance education (IC2024)')
+                    # Keep the stored value when the file has none; -2 is Not applicable/Not classified
+                    if cc_basic and cc_basic != '-2':
+                        carnegie = int(cc_basic)
+                except ValueError as e:
+                    self.stdout.write(self.style.ERROR(f'Error updating {unitid}: {str(e)}'))
+                    continue
 
-                    # Update fields if data exists
-                    if cc_basic and cc_basic != '-2': # -2 is Not applicable/Not classified
-                         college.carnegie_classification = int(cc_basic)
-                    
-                    if open_admit == '1':
-                        college.is_open_admission = True
-                    else:
-                        college.is_open_admission = False
-                        
-                    if dist_ed == '1':
-                        college.is_distance_education = True
-                    else:
-                        college.is_distance_education = False
-                        
-                    college.save()
-                    updated_count += 1
-                    
-                    if updated_count % 100 == 0:
-                         self.stdout.write(f'Updated {updated_count} colleges...')
+                # "Open admission policy (IC2024)" -> 1=Yes, 2=No
+                # "All programs offered completely via distance education (IC2024)" -> 1=Yes, 2=No
+                values = (
+                    carnegie,
+                    row.get('Open admission policy (IC2024)') == '1',
+                    row.get('All programs offered completely via distance education (IC2024)') == '1',
+                )
+                matched_count += 1
+                # Later rows for the same college win, as repeated saves did: one
+                # that restores the stored values drops an earlier row's change
+                if values != stored:
+                    changes[pk] = values
+                else:
+                    changes.pop(pk, None)
 
-                except College.DoesNotExist:
-                    not_found_count += 1
-                    # self.stdout.write(self.style.WARNING(f'College with UNITID {unitid} not found.'))
-                    pass
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f'Error updating {unitid}: {str(e)}'))
+        if changes:
+            with transaction.atomic():
+                College.objects.bulk_update([College(pk=pk, **dict(zip(FIELDS, values))) for pk, values in changes.items()],
+                                            FIELDS, batch_size=options['batch_size'])
+            # bulk_update skips the College post_save receiver
+            bump_data_version()
 
-        self.stdout.write(self.style.SUCCESS(f'Successfully updated {updated_count} colleges.'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully matched {matched_count} colleges: {len(changes)} updated, '
+            f'{matched_count - len(changes)} already up to date.'))
         self.stdout.write(self.style.WARNING(f'Skipped {not_found_count} colleges (not found in DB).'))
@@ -1,196 +1,255 @@
 import os
+import time
+from contextlib import contextmanager
+import numpy as np
 import pandas as pd
 from django.core.management.base import BaseCommand
+from django.db import connection, transaction
 from collegetracker.models import College, SmartCollege
+from collegetracker.bulk_upsert import DEFAULT_BATCH_SIZE
+from collegetracker.data_version import batched_data_change, bump_data_version
+from collegetracker.source_data import IPEDS_DIR, read_csv_columns, read_excel_sheet
+from collegetracker.text_search import rebuild_search_index
+
+# The five columns this command owns on College and mirrors onto SmartCollege
+METRIC_FIELDS = ['grad_rate', 'retention_rate', 'student_faculty_ratio', 'top_major', 'avg_net_price']
+NUMERIC_FIELDS = ['grad_rate', 'retention_rate', 'student_faculty_ratio', 'avg_net_price']
+INT_FIELDS = {'student_faculty_ratio', 'avg_net_price'}
 
 class Command(BaseCommand):
     help = 'Ingest graduation rate, retention rate, student-faculty ratio, top major, and net price from IPEDS files'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Rows per bulk_update statement')
+        parser.add_argument('--data-dir', default=IPEDS_DIR, help='Directory holding the IPEDS CSV files')
+
     def handle(self, *args, **options):
-        ipeds_dir = "/Users/banupaksoy/Desktop/capstone/IPEDS_data"
+        ipeds_dir = options['data_dir']
         
         # 1. Graduation Rates (GR2024)
-        gr_path = os.path.join(ipeds_dir, "gr2024.csv")
-        gr_map = {}
-        if os.path.exists(gr_path):
-            self.stdout.write("Processing Graduation Rates...")
-            gr_df = pd.read_csv(gr_path, low_memory=False)
-            gr_df['UNITID'] = gr_df['UNITID'].astype(str)
-            denom = gr_df[gr_df['GRTYPE'] == 2].set_index('UNITID')['GRTOTLT']
-            num = gr_df[gr_df['GRTYPE'] == 3].set_index('UNITID')['GRTOTLT']
-            gr_raw = (num / denom).dropna()
-            gr_map = gr_raw.to_dict()
-            self.stdout.write(f"Calculated {len(gr_map)} graduation rates.")
+        with self._phase("Graduation rates"):
+            gr_path = os.path.join(ipeds_dir, "gr2024.csv")
+            gr_map = {}
+            if os.path.exists(gr_path):
+                self.stdout.write("Processing Graduation Rates...")
+                gr_df = read_csv_columns(gr_path, {'UNITID': 'str', 'GRTYPE': None, 'GRTOTLT': None})
+                denom = gr_df[gr_df['GRTYPE'] == 2].set_index('UNITID')['GRTOTLT']
+                num = gr_df[gr_df['GRTYPE'] == 3].set_index('UNITID')['GRTOTLT']
+                gr_raw = (num / denom).dropna()
+                gr_map = gr_raw.to_dict()
+                self.stdout.write(f"Calculated {len(gr_map)} graduation rates.")
 
         # 2. Retention & Ratio (EF2024D)
-        efd_path = os.path.join(ipeds_dir, "ef2024d.csv")
-        retention_map = {}
-        ratio_map = {}
-        if os.path.exists(efd_path):
-            self.stdout.write("Processing Retention & Ratio...")
-            efd_df = pd.read_csv(efd_path, low_memory=False)
-            efd_df['UNITID'] = efd_df['UNITID'].astype(str)
-            retention_map = efd_df.set_index('UNITID')['RET_PCF'].to_dict()
-            ratio_map = efd_df.set_index('UNITID')['STUFACR'].to_dict()
-            self.stdout.write(f"Loaded {len(retention_map)} retention rates and {len(ratio_map)} ratios.")
+        with self._phase("Retention & ratio"):
+            efd_path = os.path.join(ipeds_dir, "ef2024d.csv")
+            retention_map = {}
+            ratio_map = {}
+            if os.path.exists(efd_path):
+                self.stdout.write("Processing Retention & Ratio...")
+                efd_df = read_csv_columns(efd_path, {'UNITID': 'str', 'RET_PCF': None, 'STUFACR': None})
+                retention_map = efd_df.set_index('UNITID')['RET_PCF'].to_dict()
+                ratio_map = efd_df.set_index('UNITID')['STUFACR'].to_dict()
+                self.stdout.write(f"Loaded {len(retention_map)} retention rates and {len(ratio_map)} ratios.")
 
         # 3. Top Major (c2024_a)
-        c_path = os.path.join(ipeds_dir, "c2024_a.csv")
-        cip_xlsx_path = os.path.join(ipeds_dir, "c2024_a.xlsx")
-        top_major_map = {}
-        if os.path.exists(c_path) and os.path.exists(cip_xlsx_path):
-            self.stdout.write("Calculating Top Majors from completions...")
-            c_df = pd.read_csv(c_path, low_memory=False)
-            c_df['UNITID'] = c_df['UNITID'].astype(str)
-            
-            # Convert CIPCODE to numeric for filtering if possible, but keep original for lookup
-            c_df['CIP_NUM'] = pd.to_numeric(c_df['CIPCODE'], errors='coerce')
-            
-            # Filter: 
-            # - MAJORNUM=1 (Primary major)
-            # - CIPCODE != 99 (Grand total)
-            # - AWLEVEL in [3, 5, 7, 9, 17, 18, 19] (Degrees, not just certificates)
-            degrees = [3, 5, 7, 9, 17, 18, 19]
-            u_majors = c_df[(c_df['MAJORNUM'] == 1) & (c_df['AWLEVEL'].isin(degrees))].copy()
-            
-            # Prioritize Bachelor's (5), then Master's (7), then Associate's (3)
-            # We add a temporary sort order for AWLEVEL
-            # 5 -> 1, 7 -> 2, 3 -> 3, others -> 4
-            def degree_prio(lvl):
-                if lvl == 5: return 1
-                if lvl == 7: return 2
-                if lvl == 3: return 3
-                return 4
-            
-            u_majors['prio'] = u_majors['AWLEVEL'].apply(degree_prio)
-            u_majors = u_majors[u_majors['CIP_NUM'] < 99.0]  # Filter total
-            
-            # Find max CTOTALT per UNITID, prioritizing Bachelor's in case of ties or close numbers
-            if not u_majors.empty:
-                # Sort by UNITID (asc), degree priority (asc), then total (desc)
-                top_mj_idx = u_majors.sort_values(['UNITID', 'prio', 'CTOTALT'], ascending=[True, True, False]).drop_duplicates('UNITID').index
-                top_mj_data = u_majors.loc[top_mj_idx]
-                
-                # Load titles
-                cip_dict_df = pd.read_excel(cip_xlsx_path, sheet_name='Frequencies')
-                cip_titles = cip_dict_df[cip_dict_df['VarName'] == 'CIPCODE'].copy()
-                title_lookup = {str(row['CodeValue']).strip(): row['ValueLabel'] for _, row in cip_titles.iterrows()}
-                
-                # Expand lookup with numeric formatting permutations
-                for _, row in cip_titles.iterrows():
-                    try:
-                        f_val = float(row['CodeValue'])
-                        # Don't overwrite exact string matches, only fill gaps
-                        for fmt in [f"{f_val:.4g}", f"{f_val:.1f}", f"{f_val:.2f}", f"{f_val:.4f}", f"{f_val:g}"]:
-                            if fmt not in title_lookup:
-                                title_lookup[fmt] = row['ValueLabel']
-                    except: pass
-
-                for _, row in top_mj_data.iterrows():
-                    unitid = str(row['UNITID'])
-                    cip = str(row['CIPCODE']).strip()
-                    title = None  # CRITICAL: Reset title for each college
-                    
-                    # 1. Exact string lookup
-                    title = title_lookup.get(cip)
-                    
-                    # 2. Numeric variation lookup
-                    if not title:
+        with self._phase("Top majors"):
+            c_path = os.path.join(ipeds_dir, "c2024_a.csv")
+            cip_xlsx_path = os.path.join(ipeds_dir, "c2024_a.xlsx")
+            top_major_map = {}
+            if os.path.exists(c_path) and os.path.exists(cip_xlsx_path):
+                self.stdout.write("Calculating Top Majors from completions...")
+                # Only primary-major degree rows are kept, chunk by chunk, from the large completions file
+                c_df = read_csv_columns(
+                    c_path, {'UNITID': 'str', 'CIPCODE': None, 'MAJORNUM': None, 'AWLEVEL': None, 'CTOTALT': None},
+                    keep=lambda chunk: (chunk['MAJORNUM'] == 1) & chunk['AWLEVEL'].isin([3, 5, 7, 9, 17, 18, 19]))
+
+                # Convert CIPCODE to numeric for filtering if possible, but keep original for lookup
+                c_df['CIP_NUM'] = pd.to_numeric(c_df['CIPCODE'], errors='coerce')
+
+                # Filter: 
+                # - MAJORNUM=1 (Primary major)
+                # - CIPCODE != 99 (Grand total)
+                # - AWLEVEL in [3, 5, 7, 9, 17, 18, 19] (Degrees, not just certificates)
+                degrees = [3, 5, 7, 9, 17, 18, 19]
+                u_majors = c_df[(c_df['MAJORNUM'] == 1) & (c_df['AWLEVEL'].isin(degrees))].copy()
+
+                # Prioritize Bachelor's (5), then Master's (7), then Associate's (3)
+                # We add a temporary sort order for AWLEVEL
+                # 5 -> 1, 7 -> 2, 3 -> 3, others -> 4
+                def degree_prio(lvl):
+                    if lvl == 5: return 1
+                    if lvl == 7: return 2
+                    if lvl == 3: return 3
+                    return 4
+
+                u_majors['prio'] = u_majors['AWLEVEL'].apply(degree_prio)
+                u_majors = u_majors[u_majors['CIP_NUM'] < 99.0]  # Filter total
+
+                # Find max CTOTALT per UNITID, prioritizing Bachelor's in case of ties or close numbers
+                if not u_majors.empty:
+                    # Sort by UNITID (asc), degree priority (asc), then total (desc)
+                    top_mj_idx = u_majors.sort_values(['UNITID', 'prio', 'CTOTALT'], ascending=[True, True, False]).drop_duplicates('UNITID').index
+                    top_mj_data = u_majors.loc[top_mj_idx]
+
+                    # Load titles
+                    cip_dict_df = read_excel_sheet(cip_xlsx_path, 'Frequencies')
+                    cip_titles = cip_dict_df[cip_dict_df['VarName'] == 'CIPCODE'].copy()
+                    title_lookup = {str(row['CodeValue']).strip(): row['ValueLabel'] for _, row in cip_titles.iterrows()}
+
+                    # Expand lookup with numeric formatting permutations
+                    for _, row in cip_titles.iterrows():
                         try:
-                            f_cip = float(cip)
-                            for fmt in [f"{f_cip:.4g}", f"{f_cip:.1f}", f"{f_cip:.2f}", f"{f_cip:.4f}", f"{f_cip:g}"]:
-                                if fmt in title_lookup:
-                                    title = title_lookup[fmt]
-                                    break
+                            f_val = float(row['CodeValue'])
+                            # Don't overwrite exact string matches, only fill gaps
+                            for fmt in [f"{f_val:.4g}", f"{f_val:.1f}", f"{f_val:.2f}", f"{f_val:.4f}", f"{f_val:g}"]:
+                                if fmt not in title_lookup:
+                                    title_lookup[fmt] = row['ValueLabel']
                         except: pass
-                    
-                    top_major_map[unitid] = title or f"Program {cip}"
-            
-            self.stdout.write(f"Identified {len(top_major_map)} top majors.")
+
+                    for _, row in top_mj_data.iterrows():
+                        unitid = str(row['UNITID'])
+                        cip = str(row['CIPCODE']).strip()
+                        title = None  # CRITICAL: Reset title for each college
+
+                        # 1. Exact string lookup
+                        title = title_lookup.get(cip)
+
+                        # 2. Numeric variation lookup
+                        if not title:
+                            try:
+                                f_cip = float(cip)
+                                for fmt in [f"{f_cip:.4g}", f"{f_cip:.1f}", f"{f_cip:.2f}", f"{f_cip:.4f}", f"{f_cip:g}"]:
+                                    if fmt in title_lookup:
+                                        title = title_lookup[fmt]
+                                        break
+                            except: pass
+
+                        top_major_map[unitid] = title or f"Program {cip}"
+
+                self.stdout.write(f"Identified {len(top_major_map)} top majors.")
 
         # 4. Net Price Estimation (drvcost2024 + sfa2324)
-        cost_path = os.path.join(ipeds_dir, "drvcost2024.csv")
-        sfa_path = os.path.join(ipeds_dir, "sfa2324.csv")
-        net_price_map = {}
-        if os.path.exists(cost_path) and os.path.exists(sfa_path):
-            self.stdout.write("Estimating Average Net Price...")
-            cost_df = pd.read_csv(cost_path, low_memory=False)
-            sfa_df = pd.read_csv(sfa_path, low_memory=False)
-            
-            cost_df['UNITID'] = cost_df['UNITID'].astype(str)
-            sfa_df['UNITID'] = sfa_df['UNITID'].astype(str)
-            
-            # Sticker price (In-state living on campus)
-            sticker = cost_df.set_index('UNITID')['CINSON']
-            # Average grant aid
-            avg_grant = sfa_df.set_index('UNITID')['AGRNT_A']
-            
-            # Net Price = Sticker - Grant
-            net_price = sticker - avg_grant
-            net_price_map = net_price.dropna().to_dict()
-            self.stdout.write(f"Estimated {len(net_price_map)} net prices.")
-
-        # Update Colleges
-        colleges = College.objects.all()
-        count = 0
-        self.stdout.write(f"Updating {colleges.count()} colleges...")
-        
-        for college in colleges:
-            unitid = str(college.UNITID)
-            updated = False
-            
-            # Grad Rate
-            if unitid in gr_map:
-                val = gr_map[unitid]
-                if pd.notnull(val) and val >= 0:
-                    college.grad_rate = float(val)
-                    updated = True
-            
-            # Retention
-            if unitid in retention_map:
-                val = retention_map[unitid]
-                if pd.notnull(val) and val >= 0:
-                    college.retention_rate = float(val) / 100.0
-                    updated = True
-            
-            # Ratio
-            if unitid in ratio_map:
-                val = ratio_map[unitid]
-                if pd.notnull(val) and val >= 0:
-                    college.student_faculty_ratio = int(val)
-                    updated = True
-            
-            # Top Major
-            if unitid in top_major_map:
-                college.top_major = top_major_map[unitid]
-                updated = True
-
-            # Net Price
-            if unitid in net_price_map:
-                val = net_price_map[unitid]
-                if pd.notnull(val) and val > 0:
-                    college.avg_net_price = int(val)
-                    updated = True
-            
-            if updated:
-                college.save()
-                
-                # Also update SmartCollege
-                SmartCollege.objects.filter(
-                    name=college.name, 
-                    city=college.city, 
-                    state=college.state
-                ).update(
-                    grad_rate=college.grad_rate,
-                    retention_rate=college.retention_rate,
-                    student_faculty_ratio=college.student_faculty_ratio,
-                    top_major=college.top_major,
-                    avg_net_price=college.avg_net_price
-                )
-                
-                count += 1
-            
-            if count % 1000 == 0 and count > 0:
-                self.stdout.write(f"Processed {count} updates...")
-
-        self.stdout.write(self.style.SUCCESS(f'Successfully updated {count} colleges with summary metrics.'))
+        with self._phase("Net price"):
+            cost_path = os.path.join(ipeds_dir, "drvcost2024.csv")
+            sfa_path = os.path.join(ipeds_dir, "sfa2324.csv")
+            net_price_map = {}
+            if os.path.exists(cost_path) and os.path.exists(sfa_path):
+                self.stdout.write("Estimating Average Net Price...")
+                cost_df = read_csv_columns(cost_path, {'UNITID': 'str', 'CINSON': None})
+                sfa_df = read_csv_columns(sfa_path, {'UNITID': 'str', 'AGRNT_A': None})
+
+                # Sticker price (In-state living on campus)
+                sticker = cost_df.set_index('UNITID')['CINSON']
+                # Average grant aid
+                avg_grant = sfa_df.set_index('UNITID')['AGRNT_A']
+
+                # Net Price = Sticker - Grant
+                net_price = sticker - avg_grant
+                net_price_map = net_price.dropna().to_dict()
+                self.stdout.write(f"Estimated {len(net_price_map)} net prices.")
+
+        # Join the metrics against the College table and keep only the rows that change
+        with self._phase("Join & diff"):
+            changed, touched_ids = self._diff(
+                College.objects.values('id', 'UNITID', 'name', 'city', 'state', *METRIC_FIELDS),
+                grad_rate=gr_map, retention_rate=retention_map, student_faculty_ratio=ratio_map,
+                top_major=top_major_map, avg_net_price=net_price_map)
+        self.stdout.write(f"{len(changed)} colleges have changed metrics.")
+
+        with batched_data_change():
+            with transaction.atomic():
+                with self._phase("College bulk_update"):
+                    College.objects.bulk_update(changed, METRIC_FIELDS, batch_size=options['batch_size'])
+                with self._phase("SmartCollege sync"):
+                    synced = self._sync_smart_colleges(touched_ids)
+                if changed:
+                    # bulk_update skips the College post_save receiver
+                    bump_data_version()
+
+        # top_major is part of the full-text document
+        with self._phase("Search index rebuild"):
+            rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully updated {len(changed)} colleges ({synced} SmartCollege rows synced) with summary metrics.'))
+
+    @contextmanager
+    def _phase(self, label):
+        start = time.perf_counter()
+        yield
+        self.stdout.write(f"[{label}] {time.perf_counter() - start:.2f}s")
+
+    def _diff(self, rows, **maps):
+        """
+        Left-join the per-UNITID metric maps onto the current College values.
+        Invalid or missing metrics keep the current value, as before. Returns
+        the College objects whose metrics changed and the ids of the colleges
+        that received at least one metric, one per (name, city, state) so the
+        SmartCollege sync has a single source row (the highest id, which the
+        old per-row loop wrote last).
+        """
+        current = pd.DataFrame.from_records(list(rows), columns=['id', 'UNITID', 'name', 'city', 'state', *METRIC_FIELDS])
+        current = current.set_index('id')
+
+        incoming = pd.DataFrame({field: pd.Series(maps[field], dtype=object) for field in METRIC_FIELDS})
+        for field in ('grad_rate', 'retention_rate', 'student_faculty_ratio', 'avg_net_price'):
+            values = pd.to_numeric(incoming[field], errors='coerce')
+            valid = values > 0 if field == 'avg_net_price' else values >= 0
+            incoming[field] = values.where(valid)
+        incoming['retention_rate'] = incoming['retention_rate'] / 100.0
+        for field in ('student_faculty_ratio', 'avg_net_price'):
+            incoming[field] = np.trunc(incoming[field])
+
+        incoming = incoming.reindex(current['UNITID'].astype(str)).set_axis(current.index)
+        present = incoming.notna()
+        merged = incoming.where(present, current[METRIC_FIELDS])
+
+        before, after = current[METRIC_FIELDS], merged
+        same = (before == after) | (before.isna() & after.isna())
+        # Compare numbers numerically so 12 (int from the DB) equals 12.0 (float from pandas)
+        for field in NUMERIC_FIELDS:
+            a = pd.to_numeric(before[field], errors='coerce')
+            b = pd.to_numeric(after[field], errors='coerce')
+            same[field] = (a == b) | (a.isna() & b.isna())
+        changed_rows = merged[~same.all(axis=1)]
+
+        changed = [
+            College(pk=int(college_id), **{
+                field: _to_python(value, int if field in INT_FIELDS else None)
+                for field, value in zip(METRIC_FIELDS, values)
+            })
+            for college_id, values in zip(changed_rows.index, changed_rows.itertuples(index=False))
+        ]
+        touched = current[present.any(axis=1)].sort_index()
+        touched = touched[~touched.duplicated(['name', 'city', 'state'], keep='last')]
+        touched_ids = [int(i) for i in touched.index]
+        return changed, touched_ids
+
+    def _sync_smart_colleges(self, college_ids):
+        """Copy the five metrics onto the matching SmartCollege rows in one UPDATE ... FROM."""
+        if not college_ids:
+            return 0
+        qn = connection.ops.quote_name
+        smart, college = qn(SmartCollege._meta.db_table), qn(College._meta.db_table)
+        assignments = ', '.join(
+            f"{qn(SmartCollege._meta.get_field(f).column)} = {college}.{qn(College._meta.get_field(f).column)}"
+            for f in METRIC_FIELDS)
+        placeholders = ', '.join(['%s'] * len(college_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE {smart} SET {assignments}
+                FROM {college}
+                WHERE {smart}.name = {college}.name
+                  AND {smart}.city = {college}.city
+                  AND {smart}.state = {college}.state
+                  AND {college}.id IN ({placeholders})
+            """, college_ids)
+            return cursor.rowcount
+
+
+def _to_python(value, cast=None):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if cast is not None:
+        return cast(value)
+    return value.item() if isinstance(value, np.generic) else value
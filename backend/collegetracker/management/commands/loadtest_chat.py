@@ -0,0 +1,213 @@
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# gunicorn invocations mirroring the Dockerfile, sync (WSGI) and uvicorn-worker (ASGI)
+SERVERS = {
+    'wsgi': ['collegetracker.wsgi:application', '--threads', '4'],
+    'asgi': ['collegetracker.asgi:application', '--worker-class', 'uvicorn_worker.UvicornWorker'],
+}
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    """Answers streamGenerateContent with a slow SSE stream, standing in for the model."""
+    chunks = 10
+    seconds = 5.0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        for i in range(self.chunks):
+            time.sleep(self.seconds / self.chunks)
+            candidate = {'content': {'role': 'model', 'parts': [{'text': f"token{i} "}]}}
+            if i == self.chunks - 1:
+                candidate['finishReason'] = 'STOP'
+            self.wfile.write(f"data: {json.dumps({'candidates': [candidate]})}\r\n\r\n".encode())
+            self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values, pct):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+class Command(BaseCommand):
+    help = ('Load-tests /api/ai/chat/ under the sync (WSGI) and async (ASGI) deployments: opens many '
+            'concurrent chats against a local fake Gemini endpoint and measures how responsive a non-chat '
+            'endpoint stays meanwhile.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=list(SERVERS), default=list(SERVERS))
+        parser.add_argument('--chats', type=int, default=32, help='Concurrent chat requests')
+        parser.add_argument('--llm-seconds', type=float, default=5.0,
+                            help='How long the fake model takes to stream each reply')
+        parser.add_argument('--workers', type=int, default=2, help='gunicorn workers (Dockerfile uses 2)')
+        parser.add_argument('--probe-path', default='/api/colleges/scroll/',
+                            help='Non-chat endpoint polled while the chats are open')
+        parser.add_argument('--probe-clients', type=int, default=8,
+                            help='Parallel clients polling the probe endpoint (8 = the WSGI threads of 2 workers)')
+        parser.add_argument('--probe-interval', type=float, default=0.25,
+                            help='Pause between one probe client\'s requests')
+        parser.add_argument('--probe-seconds', type=float, default=5.0,
+                            help='How long the probe clients run without chats, for the baseline')
+        parser.add_argument('--timeout', type=float, default=60.0, help='Per-request timeout in seconds')
+
+    def handle(self, *args, **options):
+        FakeGeminiHandler.seconds = options['llm_seconds']
+        fake = ThreadingHTTPServer(('127.0.0.1', _free_port()), FakeGeminiHandler)
+        fake.daemon_threads = True
+        threading.Thread(target=fake.serve_forever, daemon=True).start()
+
+        try:
+            for server in options['servers']:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{server.upper()}: {options['chats']} concurrent chats"))
+                self._run(server, f"http://127.0.0.1:{fake.server_port}", options)
+        finally:
+            fake.shutdown()
+
+    def _run(self, server, gemini_url, options):
+        port = _free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        env = {
+            **os.environ,
+            'GEMINI_API_KEY': 'loadtest',
+            'GOOGLE_GEMINI_BASE_URL': gemini_url,
+            'ASYNC_CHAT_VIEW': str(server == 'asgi'),
+        }
+        command = [sys.executable, '-m', 'gunicorn', *SERVERS[server], '--bind', f"127.0.0.1:{port}",
+                   '--workers', str(options['workers']), '--timeout', '120', '--log-level', 'warning']
+        log = tempfile.TemporaryFile('w+')
+        process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            self._wait_until_up(base_url + options['probe_path'], process, log)
+            probe_url = base_url + options['probe_path']
+            idle = [self._probe(probe_url, options['timeout']) for _ in range(10)]
+            idle = [p for p in idle if p is not None]
+            if not idle:
+                raise CommandError(f"{options['probe_path']} fails even without load")
+
+            # Concurrent probes alone show how many non-chat requests a deployment serves at once
+            with self._probing(probe_url, options) as parallel:
+                time.sleep(options['probe_seconds'])
+
+            with self._probing(probe_url, options) as loaded:
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=options['chats']) as pool:
+                    chats = list(pool.map(lambda i: self._chat(base_url, i, options['timeout']),
+                                          range(options['chats'])))
+                elapsed = time.perf_counter() - start
+        finally:
+            process.terminate()
+            process.wait()
+            log.close()
+
+        ok = [c for c in chats if c['ok']]
+        self.stdout.write(f"  chats: {len(ok)}/{len(chats)} completed in {elapsed:.1f}s, "
+                          f"TTFB p50 {_percentile([c['ttfb'] for c in ok], 50) * 1000:.0f}ms, "
+                          f"total p50 {_percentile([c['total'] for c in ok], 50) * 1000:.0f}ms "
+                          f"p95 {_percentile([c['total'] for c in ok], 95) * 1000:.0f}ms")
+        self.stdout.write(f"  {options['probe_path']} idle, 1 client: p50 {statistics.median(idle) * 1000:.0f}ms")
+        clients = f"{options['probe_clients']} clients"
+        # With parallel clients the probe should stay within a small multiple of its idle latency
+        for label, probes in ((f"idle, {clients}", parallel), (f"during chats, {clients}", loaded)):
+            line = f"  {options['probe_path']} {label}: {self._probe_summary(probes)}"
+            passed = [p['seconds'] for p in probes['results'] if p['seconds'] is not None]
+            responsive = (passed and len(passed) == len(probes['results'])
+                          and _percentile(passed, 95) < 3 * statistics.median(idle))
+            self.stdout.write(self.style.SUCCESS(line) if responsive else self.style.WARNING(line))
+
+    @contextmanager
+    def _probing(self, url, options):
+        """Run --probe-clients threads polling `url` for the duration of the block."""
+        done = threading.Event()
+        probes = {'results': [], 'elapsed': 0.0}
+
+        def probe_loop():
+            while not done.is_set():
+                probes['results'].append({'seconds': self._probe(url, options['timeout'])})
+                done.wait(options['probe_interval'])
+
+        clients = [threading.Thread(target=probe_loop) for _ in range(options['probe_clients'])]
+        start = time.perf_counter()
+        for client in clients:
+            client.start()
+        try:
+            yield probes
+        finally:
+            done.set()
+            for client in clients:
+                client.join()
+            probes['elapsed'] = time.perf_counter() - start
+
+    @staticmethod
+    def _probe_summary(probes):
+        passed = [p['seconds'] for p in probes['results'] if p['seconds'] is not None]
+        failed = len(probes['results']) - len(passed)
+        return (f"p50 {_percentile(passed, 50) * 1000:.0f}ms p95 {_percentile(passed, 95) * 1000:.0f}ms "
+                f"max {max(passed, default=float('nan')) * 1000:.0f}ms, "
+                f"{len(passed) / max(probes['elapsed'], 1e-9):.1f} req/s "
+                f"({failed} of {len(probes['results'])} probes failed)")
+
+    def _wait_until_up(self, url, process, log, seconds=60):
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                log.seek(0)
+                raise CommandError(f"Server exited with {process.returncode}:\n{log.read()[-2000:]}")
+            try:
+                requests.get(url, timeout=2)
+                return
+            except requests.RequestException:
+                time.sleep(0.5)
+        raise CommandError(f"Server did not answer {url} within {seconds}s")
+
+    def _probe(self, url, timeout):
+        start = time.perf_counter()
+        try:
+            requests.get(url, timeout=timeout).raise_for_status()
+        except requests.RequestException:
+            return None
+        return time.perf_counter() - start
+
+    def _chat(self, base_url, i, timeout):
+        start = time.perf_counter()
+        ttfb = None
+        try:
+            with requests.post(f"{base_url}/api/ai/chat/", json={'message': f"Load test question {i}", 'history': []},
+                               stream=True, timeout=timeout) as response:
+                response.raise_for_status()
+                body = ''
+                for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+                    if ttfb is None:
+                        ttfb = time.perf_counter() - start
+                    body += chunk
+            ok = 'token' in body and 'Agent Notification' not in body
+        except requests.RequestException:
+            ok = False
+        return {'ok': ok, 'ttfb': ttfb, 'total': time.perf_counter() - start}
@@ -0,0 +1,61 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from collegetracker.bulk_upsert import DEFAULT_BATCH_SIZE
+from collegetracker.import_jobs import claim_next_job, run_job
+
+
+class HealthHandler(BaseHTTPRequestHandler):
+    """Answers any GET with 200 so Cloud Run's startup and liveness probes see the worker as up."""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Worker for the upload endpoints: applies queued ImportJob files with bulk upserts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Process the jobs already queued, then exit')
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='Seconds to wait between checks of an empty queue')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='CSV rows applied (and progress saved) per transaction')
+        parser.add_argument('--health-port', type=int,
+                            help='Also answer HTTP health checks on this port (the worker runs as a Cloud Run service)')
+
+    def handle(self, *args, **options):
+        if options['health_port']:
+            server = ThreadingHTTPServer(('0.0.0.0', options['health_port']), HealthHandler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.stdout.write(f"Health checks on port {options['health_port']}")
+
+        self.stdout.write("Waiting for import jobs..." if not options['once'] else "Processing queued import jobs...")
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f"Running {job} ({job.original_name})")
+            start = time.perf_counter()
+            job = run_job(job, batch_size=options['batch_size'])
+            elapsed = time.perf_counter() - start
+            summary = (f"{job} in {elapsed:.1f}s: {job.created_count} created, {job.updated_count} updated, "
+                       f"{job.unchanged_count} unchanged, {job.error_count} row errors")
+            if job.status == 'succeeded':
+                self.stdout.write(self.style.SUCCESS(summary))
+            else:
+                self.stdout.write(self.style.ERROR(f"{summary} - {job.error_message}"))
@@ -1,6 +1,16 @@
-import pandas as pd
+import time
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from collegetracker.models import College, CollegeProgram
+from collegetracker.bulk_upsert import DEFAULT_BATCH_SIZE
+from collegetracker.data_version import bump_data_version
+from collegetracker.source_data import CSV_CHUNK_ROWS, iter_csv_chunks
+from collegetracker.scorecard_sync import (
+    EARNINGS_FIELDS, FOS_COLUMNS, FOS_NA_VALUES, INSTITUTION_FIELDS, program_frame, match_field_of_study_chunks,
+    changed_programs, institution_values_chunks, changed_colleges,
+)
+
+INST_COLUMNS = {'UNITID': 'str', 'INSTNM': None, 'MD_EARN_WNE_4YR': None, 'GT_THRESHOLD_4YR': None}
 
 class Command(BaseCommand):
     help = 'Updates college data using the latest 2026 Scorecard files (Institution and Field of Study).'
@@ -8,95 +18,49 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('inst_csv', type=str, help='Path to Most-Recent-Cohorts-Institution.csv')
         parser.add_argument('fos_csv', type=str, help='Path to Most-Recent-Cohorts-Field-of-Study.csv')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Rows per bulk_update statement')
+        parser.add_argument('--chunk-size', type=int, default=CSV_CHUNK_ROWS,
+                            help='CSV rows read into memory at a time')
 
     def handle(self, *args, **kwargs):
         inst_csv = kwargs['inst_csv']
         fos_csv = kwargs['fos_csv']
 
-        def normalize_cip(x):
-            s = "".join(c for c in str(x) if c.isdigit())
-            if len(s) % 2 != 0: s = '0' + s
-            return s[:4]
-
         # 1. Update Institution level data
         self.stdout.write("Processing Institution data...")
-        df_inst = pd.read_csv(inst_csv, usecols=['UNITID', 'INSTNM', 'MD_EARN_WNE_4YR', 'GT_THRESHOLD_4YR'])
-        
-        colleges_to_update = []
-        all_colleges = {c.UNITID: c for c in College.objects.exclude(UNITID__isnull=True)}
+        chunk_size = kwargs['chunk_size']
 
-        for _, row in df_inst.iterrows():
-            unitid = str(row['UNITID'])
-            if unitid in all_colleges:
-                college = all_colleges[unitid]
-                changed = False
-                
-                # Earnings
-                val = row['MD_EARN_WNE_4YR']
-                if pd.notna(val) and str(val) not in ['PrivacySuppressed', 'PS', 'None', 'NULL']:
-                    try:
-                        college.median_earnings_4yr = int(float(val))
-                        changed = True
-                    except (ValueError, TypeError):
-                        pass
-                
-                # Threshold Indicator (Lower Earnings)
-                thresh = row['GT_THRESHOLD_4YR']
-                if pd.notna(thresh) and thresh != 'PrivacySuppressed':
-                    college.lower_earnings_indicator = float(thresh) < 0.5
-                    changed = True
-                
-                if changed:
-                    colleges_to_update.append(college)
+        # Vectorized per chunk, then one comparison against the stored values,
+        # so only colleges whose earnings actually changed are written
+        matched = institution_values_chunks(iter_csv_chunks(inst_csv, INST_COLUMNS, chunk_size))
+        colleges_to_update = changed_colleges(matched)
 
         if colleges_to_update:
-            College.objects.bulk_update(colleges_to_update, ['median_earnings_4yr', 'lower_earnings_indicator'])
+            College.objects.bulk_update(colleges_to_update, INSTITUTION_FIELDS, batch_size=kwargs['batch_size'])
             self.stdout.write(self.style.SUCCESS(f"Updated {len(colleges_to_update)} institutions."))
 
         # 2. Update Field of Study data
         self.stdout.write("Processing Field of Study data (Bulk Mode)...")
-        df_fos = pd.read_csv(fos_csv, usecols=['UNITID', 'CIPCODE', 'CIPDESC', 'CREDDESC', 'EARN_MDN_4YR', 'EARN_MDN_4YR_NAT'])
-        
-        # We process school by school to manage memory
-        for unitid, school_df in df_fos.groupby('UNITID'):
-            unitid_str = str(unitid)
-            programs = list(CollegeProgram.objects.filter(college__UNITID=unitid_str))
-            
-            if not programs:
-                continue
-                
-            progs_to_update = []
-            for _, row in school_df.iterrows():
-                csv_cip_4 = normalize_cip(row['CIPCODE'])
-                csv_cred = str(row['CREDDESC']).lower().strip()
-                
-                for prog in programs:
-                    db_cip_4 = normalize_cip(prog.cipcode)
-                    db_cred = str(prog.creddesc).lower().strip()
-                    
-                    if db_cip_4 == csv_cip_4 and (csv_cred in db_cred or db_cred in csv_cred):
-                        changed = False
-                        
-                        earn = row['EARN_MDN_4YR']
-                        if pd.notna(earn) and str(earn) not in ['PrivacySuppressed', 'PS', 'None', 'NULL']:
-                            try:
-                                prog.median_earnings = int(float(earn))
-                                changed = True
-                            except (ValueError, TypeError):
-                                pass
-                            
-                        nat = row['EARN_MDN_4YR_NAT']
-                        if pd.notna(nat) and str(nat) not in ['PrivacySuppressed', 'PS', 'None', 'NULL']:
-                            try:
-                                prog.national_median = int(float(nat))
-                                changed = True
-                            except (ValueError, TypeError):
-                                pass
-                        
-                        if changed:
-                            progs_to_update.append(prog)
+        start = time.perf_counter()
+        programs = program_frame()
+        self.stdout.write(f"Loaded {len(programs)} programs in {time.perf_counter() - start:.2f}s")
+
+        # Stream the file through one hash join on (UNITID, 4-digit CIP) per chunk
+        # instead of a query and nested loop per school
+        start = time.perf_counter()
+        chunks = iter_csv_chunks(fos_csv, FOS_COLUMNS, chunk_size, na_values=FOS_NA_VALUES)
+        matched = match_field_of_study_chunks(programs, chunks)
+        progs_to_update = changed_programs(programs, matched)
+        self.stdout.write(f"Matched {len(matched)} programs ({len(progs_to_update)} changed) "
+                          f"in {time.perf_counter() - start:.2f}s")
 
-            if progs_to_update:
-                CollegeProgram.objects.bulk_update(progs_to_update, ['median_earnings', 'national_median'])
+        start = time.perf_counter()
+        batch_size = kwargs['batch_size']
+        with transaction.atomic():
+            for i in range(0, len(progs_to_update), batch_size):
+                CollegeProgram.objects.bulk_update(progs_to_update[i:i + batch_size], EARNINGS_FIELDS)
+        self.stdout.write(f"Updated {len(progs_to_update)} programs in {time.perf_counter() - start:.2f}s")
 
+        bump_data_version()
         self.stdout.write(self.style.SUCCESS(f"Finished processing program-level data."))
@@ -0,0 +1,97 @@
+from django.db import migrations
+
+# Self-contained on purpose: the DDL and the document layout are frozen here
+# rather than imported from collegetracker.text_search, so later changes to the
+# app code can't change what this migration does.
+
+FTS_TABLE = 'collegetracker_college_fts'
+
+SQLITE_CREATE = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, top_major, programs,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+"""
+
+POSTGRES_CREATE = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {FTS_TABLE} (
+        college_id bigint PRIMARY KEY,
+        document tsvector NOT NULL
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS {FTS_TABLE}_gin ON {FTS_TABLE} USING GIN (document)",
+]
+
+DROP = f"DROP TABLE IF EXISTS {FTS_TABLE}"
+
+SQLITE_INSERT = f"INSERT INTO {FTS_TABLE} (rowid, name, top_major, programs) VALUES (%s, %s, %s, %s)"
+
+POSTGRES_INSERT = f"""
+    INSERT INTO {FTS_TABLE} (college_id, document) VALUES (
+        %s,
+        setweight(to_tsvector('simple', %s), 'A') ||
+        setweight(to_tsvector('simple', %s), 'B') ||
+        setweight(to_tsvector('simple', %s), 'C')
+    )
+"""
+
+
+class VendorRunSQL(migrations.RunSQL):
+    """RunSQL that only runs on one database vendor (FTS5 and tsvector DDL differ)."""
+
+    def __init__(self, vendor, *args, **kwargs):
+        self.vendor = vendor
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, args, kwargs = super().deconstruct()
+        return name, [self.vendor, *args], kwargs
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+def populate_fts(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return
+
+    College = apps.get_model('collegetracker', 'College')
+    CollegeProgram = apps.get_model('collegetracker', 'CollegeProgram')
+
+    programs = {}
+    for college_id, cipdesc in CollegeProgram.objects.exclude(cipdesc__isnull=True).values_list('college_id', 'cipdesc'):
+        programs.setdefault(college_id, []).append(cipdesc)
+
+    rows = []
+    for pk, name, top_major in College.objects.values_list('id', 'name', 'top_major').iterator():
+        descriptions = programs.get(pk, [])
+        if connection.vendor == 'postgresql':
+            # Same as string_agg(DISTINCT ...): each description once
+            descriptions = sorted(set(descriptions))
+        rows.append((pk, name or '', top_major or '', ' '.join(descriptions)))
+
+    insert = SQLITE_INSERT if connection.vendor == 'sqlite' else POSTGRES_INSERT
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), 1000):
+            cursor.executemany(insert, rows[i:i + 1000])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collegetracker', '0040_dataversion'),
+    ]
+
+    operations = [
+        VendorRunSQL('sqlite', SQLITE_CREATE, DROP),
+        VendorRunSQL('postgresql', POSTGRES_CREATE, DROP),
+        migrations.RunPython(populate_fts, migrations.RunPython.noop),
+    ]
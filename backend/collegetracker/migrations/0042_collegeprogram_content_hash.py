@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collegetracker', '0041_college_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collegeprogram',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='Hash of the imported columns, used to skip unchanged rows', max_length=40, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 19:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collegetracker', '0043_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aicalllog',
+            name='ttfb_ms',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
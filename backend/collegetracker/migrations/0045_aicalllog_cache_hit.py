@@ -0,0 +1,23 @@
+# Generated by Django 5.1 on 2026-10-18 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collegetracker', '0044_aicalllog_ttfb_ms'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aicalllog',
+            name='cache_hit',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='aicalllog',
+            name='latency_saved_ms',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-18 20:20
+
+import collegetracker.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collegetracker', '0045_aicalllog_cache_hit'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importjob',
+            name='file',
+            field=models.FileField(storage=collegetracker.models.import_job_storage, upload_to='import_jobs/'),
+        ),
+    ]
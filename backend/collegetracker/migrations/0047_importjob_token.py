@@ -0,0 +1,33 @@
+# Generated by Django 5.1 on 2026-10-18 20:37
+
+import uuid
+from django.db import migrations, models
+
+
+def gen_tokens(apps, schema_editor):
+    # A callable default is evaluated once for AddField, so existing jobs get their own token here
+    ImportJob = apps.get_model('collegetracker', 'ImportJob')
+    for job in ImportJob.objects.only('id'):
+        job.token = uuid.uuid4()
+        job.save(update_fields=['token'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collegetracker', '0046_importjob_file_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='token',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, null=True),
+        ),
+        migrations.RunPython(gen_tokens, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='importjob',
+            name='token',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+    ]
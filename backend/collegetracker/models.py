@@ -1,4 +1,8 @@
+import uuid
+
 from django.db import models
+from django.core.files.storage import default_storage, storages
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractUser
 from django.utils.functional import cached_property
@@ -70,6 +74,20 @@ class Friendship(models.Model):
         return f"{self.user1} - {self.user2} ({self.status})"
 
 
+class CollegeQuerySet(models.QuerySet):
+    def with_programs_count(self):
+        """
+        Annotate programs_count with a correlated subquery so listing views
+        serialize a page in one query instead of one COUNT per college. A
+        subquery (rather than Count('programs')) stays correct when the
+        queryset also joins programs for filtering or uses distinct().
+        """
+        counts = (CollegeProgram.objects.filter(college=models.OuterRef('pk'))
+                  .order_by().values('college')
+                  .annotate(total=models.Count('id')).values('total'))
+        return self.annotate(programs_count=Coalesce(models.Subquery(counts), 0))
+
+
 class College(models.Model):
     name = models.CharField(max_length=100)
     city = models.CharField(max_length=50)
@@ -119,6 +137,8 @@ class College(models.Model):
     is_open_admission = models.BooleanField(default=False)
     is_distance_education = models.BooleanField(default=False)
 
+    objects = CollegeQuerySet.as_manager()
+
     def get_carnegie_classification_display(self):
         labels = {
             -2: "Not classified",
@@ -198,6 +218,9 @@ class CollegeProgram(models.Model):
     median_earnings = models.IntegerField(null=True, blank=True, help_text="Median earnings for this program 4 years after graduation")
     national_median = models.IntegerField(null=True, blank=True, help_text="National median earnings for this field of study")
 
+    # --- Incremental import sync ---
+    content_hash = models.CharField(max_length=40, null=True, blank=True, help_text="Hash of the imported columns, used to skip unchanged rows")
+
     def __str__(self):
         return f"{self.college.name} - {self.cipdesc}"
 
@@ -484,6 +507,12 @@ class AICallLog(models.Model):
     prompt_summary = models.TextField(blank=True, null=True)
     response_summary = models.TextField(blank=True, null=True)
     latency_ms = models.IntegerField(default=0)
+    # Time until the first streamed token; null when nothing was streamed
+    ttfb_ms = models.IntegerField(null=True, blank=True)
+    # Served from the semantic answer cache; latency_saved_ms is what generating
+    # the cached answer took minus what serving it did
+    cache_hit = models.BooleanField(default=False)
+    latency_saved_ms = models.IntegerField(null=True, blank=True)
     success = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -539,3 +568,80 @@ class Advertisement(models.Model):
 
 
 
+
+
+class DataVersion(models.Model):
+    """
+    Monotonic counter per shared dataset (e.g. 'college'). Bumped whenever the
+    underlying rows change so in-process indexes in every worker can notice
+    imports made by another process and rebuild themselves.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+def import_job_storage():
+    """
+    Where queued uploads wait for the worker: the 'import_jobs' storage when
+    configured (production keeps them in a private bucket the web and worker
+    services share), else the default storage.
+    """
+    return storages['import_jobs'] if 'import_jobs' in storages.backends else default_storage
+
+
+class ImportJob(models.Model):
+    """
+    An uploaded CSV queued for the process_import_jobs worker, which applies
+    it with bulk upserts and records progress here for the status endpoint.
+    """
+    KIND_CHOICES = [
+        ('colleges', 'New colleges'),
+        ('smart_colleges', 'Smart colleges'),
+        ('college_updates', 'College updates'),
+        ('programs', 'College programs'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    # Unguessable handle for the status endpoint; pks are sequential
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+    file = models.FileField(upload_to='import_jobs/', storage=import_job_storage)
+    original_name = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='import_jobs')
+
+    # --- Progress ---
+    total_rows = models.IntegerField(default=0)
+    processed_rows = models.IntegerField(default=0)
+    created_count = models.IntegerField(default=0)
+    updated_count = models.IntegerField(default=0)
+    unchanged_count = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True, help_text="First row-level errors, e.g. 'Row 12: missing UNITID'")
+    error_message = models.TextField(blank=True, help_text="Why the job failed, if it did")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    @property
+    def progress(self):
+        if self.status == 'succeeded':
+            return 1.0
+        return self.processed_rows / self.total_rows if self.total_rows else 0.0
+
+    def __str__(self):
+        return f"{self.get_kind_display()} import #{self.pk} ({self.status})"
@@ -0,0 +1,191 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import List, Optional, Sequence, Tuple
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+# Query parameter that switches a listing into keyset (cursor) mode. An empty
+# value asks for the first page; `page=` keeps the old Paginator behaviour.
+CURSOR_PARAM = 'cursor'
+
+# Ordering tag for id lists in an order no column holds (full-text rank,
+# distance). Its cursors carry the list position instead of column values, so
+# the ORM listings reject them rather than resume from the wrong row.
+RANK_ORDERING = ('rank', 'id')
+
+
+class InvalidCursor(ValidationError):
+    default_detail = "Invalid pagination cursor."
+
+
+class CursorPage:
+    """One keyset page. Quacks like the Paginator page the list views expect."""
+
+    def __init__(self, object_list, next_cursor: Optional[str]):
+        self.object_list = list(object_list)
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def wants_cursor(request) -> bool:
+    return CURSOR_PARAM in request.query_params
+
+
+def _jsonable(value):
+    # isoformat keeps microseconds, which DjangoJSONEncoder would truncate and
+    # so break the equality step of the keyset comparison.
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _sort_tag(ordering: Sequence[str]) -> str:
+    return ','.join(ordering)
+
+
+def encode_cursor(values: Sequence, offset: Optional[int] = None, ordering: Optional[Sequence[str]] = None) -> str:
+    payload = {'v': [_jsonable(v) for v in values]}
+    if offset is not None:
+        payload['o'] = offset
+    if ordering is not None:
+        payload['s'] = _sort_tag(ordering)
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, dict) or not isinstance(payload.get('v'), list):
+            raise ValueError
+        if not all(v is None or isinstance(v, (str, int, float)) for v in payload['v']):
+            raise ValueError
+        return payload
+    except ValueError:
+        raise InvalidCursor()
+
+
+def decode_cursor_values(cursor: str, ordering: Sequence[str]) -> list:
+    """
+    The cursor's values, checked against the listing's ordering: one value
+    per column, and the same sort tag when the cursor carries one (cursors
+    from before the tag only get the arity check).
+    """
+    payload = decode_cursor(cursor)
+    if len(payload['v']) != len(ordering) or payload.get('s', _sort_tag(ordering)) != _sort_tag(ordering):
+        raise InvalidCursor("Cursor does not match this listing's sort order.")
+    return payload
+
+
+def _parse_ordering(ordering: Sequence[str]) -> List[Tuple[str, bool]]:
+    return [(f[1:], True) if f.startswith('-') else (f, False) for f in ordering]
+
+
+def _after(field: str, descending: bool, value) -> Q:
+    """Rows strictly after `value` in this column's sort order, NULLs placed as the database places them."""
+    nulls_largest = connection.features.nulls_order_largest
+    if value is None:
+        # NULL sorts last when it is the largest value ascending (or the smallest descending)
+        if nulls_largest != descending:
+            return Q(pk__in=[])
+        return Q(**{f'{field}__isnull': False})
+
+    lookup = 'lt' if descending else 'gt'
+    q = Q(**{f'{field}__{lookup}': value})
+    if nulls_largest != descending:
+        q |= Q(**{f'{field}__isnull': True})
+    return q
+
+
+def _equal(field: str, value) -> Q:
+    if value is None:
+        return Q(**{f'{field}__isnull': True})
+    return Q(**{field: value})
+
+
+def keyset_filter(ordering: Sequence[str], values: Sequence) -> Q:
+    """
+    Build the "comes after this row" predicate for a multi-column ordering:
+    (a > x) OR (a = x AND b > y) OR ... The last ordering column must be unique
+    (the id tiebreak) so no two rows compare equal.
+    """
+    columns = _parse_ordering(ordering)
+    if len(values) != len(columns):
+        raise InvalidCursor("Cursor does not match this listing's sort order.")
+
+    condition = Q(pk__in=[])
+    prefix = Q()
+    for (field, descending), value in zip(columns, values):
+        condition |= prefix & _after(field, descending, value)
+        prefix &= _equal(field, value)
+    return condition
+
+
+def encode_row_cursor(obj, ordering: Sequence[str], offset: Optional[int] = None) -> str:
+    """Cursor pointing just past `obj` in `ordering`."""
+    if tuple(ordering) == RANK_ORDERING:
+        return encode_cursor([offset, obj.pk], offset=offset, ordering=ordering)
+    return encode_cursor([getattr(obj, field) for field, _ in _parse_ordering(ordering)], offset=offset,
+                         ordering=ordering)
+
+
+def keyset_page(queryset, ordering: Sequence[str], cursor: Optional[str], page_size: int) -> CursorPage:
+    """
+    One page of `queryset` in `ordering`, starting after `cursor`. Only
+    page_size + 1 rows are read and there is no COUNT or OFFSET, so every
+    page costs the same no matter how deep the client has scrolled.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        try:
+            queryset = queryset.filter(keyset_filter(ordering, decode_cursor_values(cursor, ordering)['v']))
+        except (DjangoValidationError, TypeError, ValueError):
+            # e.g. a value that does not parse as the column's type
+            raise InvalidCursor()
+
+    rows = list(queryset[:page_size + 1])
+    if len(rows) <= page_size:
+        return CursorPage(rows, None)
+    rows = rows[:page_size]
+    return CursorPage(rows, encode_row_cursor(rows[-1], ordering))
+
+
+def id_list_page(ids: Sequence[int], cursor: Optional[str], page_size: int,
+                 ordering: Sequence[str] = ('id',)) -> Tuple[list, int, bool]:
+    """
+    Cursor pagination over an already-ranked id list (college index, full-text
+    rank) sorted by `ordering`, RANK_ORDERING when no column gives the order. Returns (page_ids, start, has_more). The
+    cursor's last value is the last id served and its offset is used when that
+    id has dropped out of the list since the previous page.
+    """
+    start = 0
+    if cursor:
+        payload = decode_cursor_values(cursor, ordering)
+        try:
+            last_id = int(payload['v'][-1])
+            offset = int(payload.get('o', 0))
+        except (IndexError, TypeError, ValueError):
+            raise InvalidCursor()
+        if 0 <= offset < len(ids) and ids[offset] == last_id:
+            start = offset + 1
+        else:
+            try:
+                start = list(ids).index(last_id) + 1
+            except ValueError:
+                start = max(offset, 0) + 1
+
+    page_ids = list(ids[start:start + page_size])
+    return page_ids, start, start + page_size < len(ids)
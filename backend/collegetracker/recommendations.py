@@ -0,0 +1,138 @@
+import hashlib
+from typing import List, Optional, Sequence
+
+import numpy as np
+from django.core.cache import cache
+
+from collegetracker.models import College
+from collegetracker.data_version import versioned_cache
+
+# Weight of each feature in the distance to the bookmark centroid. SAT,
+# admission rate and cost keep the 0.4 / 0.4 / 0.2 balance of the old scorer.
+NUMERIC_WEIGHTS = {
+    'sat_score': 0.2,
+    'admission_rate': 0.2,
+    'cost_of_attendance': 0.1,
+    'grad_rate': 0.1,
+    'median_earnings_4yr': 0.1,
+}
+CATEGORICAL_WEIGHTS = {
+    'control': 0.05,
+    'locale': 0.05,
+}
+# Penalty for colleges outside every bookmarked state; the old view only
+# considered those states at all.
+STATE_WEIGHT = 0.2
+
+CONTROL_VALUES = (1, 2, 3)
+LOCALE_BUCKETS = (1, 2, 3, 4)  # city, suburb, town, rural (locale // 10)
+
+RECOMMENDATION_COUNT = 10
+RECOMMENDATION_CACHE_TIMEOUT = 60 * 60
+
+
+def _scaled_column(values) -> np.ndarray:
+    """Impute missing values with the median and scale the 5th-95th percentile range to 0-1."""
+    col = np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+    if np.isnan(col).all():
+        return np.zeros(len(col))
+    col = np.where(np.isnan(col), np.nanmedian(col), col)
+    lo, hi = np.percentile(col, [5, 95])
+    if hi <= lo:
+        return np.zeros(len(col))
+    return np.clip((col - lo) / (hi - lo), 0.0, 1.0)
+
+
+def _one_hot(values, categories) -> np.ndarray:
+    # Unknown categories stay all-zero, i.e. equally far from everything
+    col = np.array([-1 if v is None else v for v in values])
+    return (col[:, None] == np.array(categories)[None, :]).astype(np.float64)
+
+
+class RecommendationEngine:
+    """
+    Normalized feature matrix over the whole College table. A user's
+    bookmarks are averaged into a centroid and every college is scored by
+    its weighted L1 distance to it in one vectorized pass.
+    """
+
+    def __init__(self, version: int = 0):
+        self.version = version
+        fields = list(NUMERIC_WEIGHTS) + list(CATEGORICAL_WEIGHTS)
+        rows = list(College.objects.values_list('id', 'state', *fields).order_by('id'))
+        cols = list(zip(*rows)) if rows else [()] * (len(fields) + 2)
+
+        self.ids = np.array(cols[0], dtype=np.int64)
+        self.states = np.array([(s or '').upper() for s in cols[1]], dtype=object)
+
+        blocks, weights = [], []
+        for i, field in enumerate(NUMERIC_WEIGHTS, start=2):
+            blocks.append(_scaled_column(cols[i])[:, None])
+            weights.append([NUMERIC_WEIGHTS[field]])
+
+        control = cols[2 + len(NUMERIC_WEIGHTS)]
+        locale = [None if v is None else v // 10 for v in cols[3 + len(NUMERIC_WEIGHTS)]]
+        for values, categories, field in ((control, CONTROL_VALUES, 'control'),
+                                          (locale, LOCALE_BUCKETS, 'locale')):
+            blocks.append(_one_hot(values, categories))
+            # A full mismatch moves two one-hot entries, so halve the per-column weight
+            weights.append([CATEGORICAL_WEIGHTS[field] / 2] * len(categories))
+
+        self.matrix = np.hstack(blocks) if len(self.ids) else np.zeros((0, sum(len(w) for w in weights)))
+        self.weights = np.concatenate([np.array(w, dtype=np.float64) for w in weights])
+
+    def positions(self, ids) -> np.ndarray:
+        ids = np.asarray(list(ids), dtype=np.int64)
+        if not len(ids) or not len(self.ids):
+            return np.empty(0, dtype=np.int64)
+        pos = np.clip(np.searchsorted(self.ids, ids), 0, len(self.ids) - 1)
+        return pos[self.ids[pos] == ids]
+
+    def recommend(self, bookmarked_ids: Sequence[int], k: int = RECOMMENDATION_COUNT) -> List[int]:
+        """Ids of the k colleges closest to the bookmark centroid, best first, bookmarks excluded."""
+        pos = self.positions(bookmarked_ids)
+        if not len(pos):
+            return []
+
+        centroid = self.matrix[pos].mean(axis=0)
+        scores = np.abs(self.matrix - centroid) @ self.weights
+        scores += STATE_WEIGHT * ~np.isin(self.states, np.unique(self.states[pos]))
+        scores[pos] = np.inf
+
+        k = min(k, len(scores) - len(pos))
+        if k <= 0:
+            return []
+        top = np.argpartition(scores, k - 1)[:k]
+        # Stable sort on (score, id) so equal scores come back in a fixed order
+        top = top[np.lexsort((self.ids[top], scores[top]))]
+        return self.ids[top].tolist()
+
+
+_ENGINE = versioned_cache(lambda version: RecommendationEngine(version=version), label='recommendation engine')
+
+
+def get_recommendation_engine() -> Optional[RecommendationEngine]:
+    """Per-worker engine, rebuilt when the college data version moves (e.g. after imports)."""
+    return _ENGINE.get()
+
+
+def _cache_key(user_id: int, bookmarked_ids: Sequence[int], version: int, k: int) -> str:
+    # The key covers the exact bookmark set and catalog version, so any
+    # bookmark change (from any worker, the toggle view or the agent tool)
+    # lands on a fresh key and stale entries simply expire.
+    digest = hashlib.sha1(','.join(str(i) for i in sorted(bookmarked_ids)).encode()).hexdigest()[:16]
+    return f"college_recommendations:{user_id}:{version}:{k}:{digest}"
+
+
+def recommend_college_ids(user_id: int, bookmarked_ids: Sequence[int], k: int = RECOMMENDATION_COUNT) -> Optional[List[int]]:
+    """Cached top-k recommendations for a user, or None when the engine is unavailable."""
+    engine = get_recommendation_engine()
+    if engine is None:
+        return None
+
+    key = _cache_key(user_id, bookmarked_ids, engine.version, k)
+    ids = cache.get(key)
+    if ids is None:
+        ids = engine.recommend(bookmarked_ids, k=k)
+        cache.set(key, ids, RECOMMENDATION_CACHE_TIMEOUT)
+    return ids
@@ -0,0 +1,188 @@
+import logging
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from collegetracker.models import College, CollegeProgram
+
+logger = logging.getLogger(__name__)
+
+# Scorecard placeholders for values withheld or missing
+SUPPRESSED_VALUES = ['PrivacySuppressed', 'PS', 'None', 'NULL']
+
+EARNINGS_FIELDS = ['median_earnings', 'national_median']
+INSTITUTION_FIELDS = ['median_earnings_4yr', 'lower_earnings_indicator']
+
+# Columns (and dtypes) the field-of-study sync reads from the Scorecard file.
+# Numbers are left to the C parser, with the suppression markers read as NaN;
+# a column that still holds unexpected text comes back as strings and is
+# parsed by parse_earnings instead of failing the read.
+FOS_COLUMNS = {
+    'UNITID': None,
+    'CIPCODE': None,
+    'CREDDESC': 'category',
+    'EARN_MDN_4YR': None,
+    'EARN_MDN_4YR_NAT': None,
+}
+FOS_NA_VALUES = SUPPRESSED_VALUES
+
+
+def normalize_cip(x) -> str:
+    """4-digit CIP family, e.g. 52.0201 / 520201 / 5202 -> '5202' and 101 -> '0101'."""
+    s = "".join(c for c in str(x) if c.isdigit())
+    if len(s) % 2 != 0:
+        s = '0' + s
+    return s[:4]
+
+
+def _map_distinct(values: pd.Series, func) -> np.ndarray:
+    # CIP codes and credential names repeat heavily, so transform each distinct value once
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return np.array([func(v) for v in uniques], dtype=object)[codes]
+
+
+def normalize_cip_series(values: pd.Series) -> np.ndarray:
+    """normalize_cip over a column."""
+    return _map_distinct(values, normalize_cip)
+
+
+def parse_earnings(values: pd.Series) -> pd.Series:
+    """Earnings as floats, NaN where the Scorecard suppressed or omitted the value."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    return pd.to_numeric(values.where(~values.astype(str).isin(SUPPRESSED_VALUES)), errors='coerce')
+
+
+def _credential(values: pd.Series) -> np.ndarray:
+    return _map_distinct(values, lambda v: str(v).lower().strip())
+
+
+def program_frame(queryset=None) -> pd.DataFrame:
+    """Every CollegeProgram with its college's UNITID and join key, loaded in one query."""
+    queryset = CollegeProgram.objects.all() if queryset is None else queryset
+    rows = queryset.values_list('id', 'college__UNITID', 'cipcode', 'creddesc', *EARNINGS_FIELDS)
+    programs = pd.DataFrame.from_records(
+        list(rows.iterator(chunk_size=10000)),
+        columns=['id', 'UNITID', 'cipcode', 'creddesc', *EARNINGS_FIELDS])
+    programs['cip4'] = normalize_cip_series(programs['cipcode'])
+    return programs
+
+
+def _as_number(values) -> np.ndarray:
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=float)
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return pd.to_numeric(pd.Series(uniques, dtype=object).astype(str), errors='coerce').to_numpy(dtype=float)[codes]
+
+
+def _join_key(unitids, cip4) -> pd.Series:
+    # (UNITID, 4-digit CIP) packed into one number so the join hashes a single column
+    return pd.Series(_as_number(unitids) * 10000 + _as_number(cip4))
+
+
+def program_join_keys(programs: pd.DataFrame) -> pd.DataFrame:
+    """Join key, id and normalized credential per program; build once per sync."""
+    keys = pd.DataFrame({
+        'key': _join_key(programs['UNITID'], programs['cip4']),
+        'id': programs['id'].to_numpy(),
+        'db_cred': _credential(programs['creddesc']),
+    })
+    return keys[keys['key'].notna()]
+
+
+def match_field_of_study(programs: pd.DataFrame, fos: pd.DataFrame, keys: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Hash-join Field-of-Study rows (UNITID, CIPCODE, CREDDESC, EARN_MDN_4YR,
+    EARN_MDN_4YR_NAT) onto programs (id, UNITID, cip4, creddesc) by
+    (UNITID, 4-digit CIP), keeping pairs whose credential descriptions
+    contain one another. Each earnings column takes the value of the last
+    matching CSV row that has one, as the old row-by-row loop did. Returns
+    median_earnings / national_median indexed by program id.
+    """
+    fos = pd.DataFrame({
+        'key': _join_key(fos['UNITID'], normalize_cip_series(fos['CIPCODE'])),
+        'csv_cred': _credential(fos['CREDDESC']),
+        'median_earnings': np.trunc(parse_earnings(fos['EARN_MDN_4YR'])).to_numpy(),
+        'national_median': np.trunc(parse_earnings(fos['EARN_MDN_4YR_NAT'])).to_numpy(),
+    })
+    fos['row'] = np.arange(len(fos))
+    fos = fos[fos['key'].notna() & fos[EARNINGS_FIELDS].notna().any(axis=1)]
+
+    keys = program_join_keys(programs) if keys is None else keys
+    pairs = fos.merge(keys, on='key', how='inner')
+
+    same_credential = [a in b or b in a for a, b in zip(pairs['csv_cred'], pairs['db_cred'])]
+    pairs = pairs[np.array(same_credential, dtype=bool)].sort_values('row', kind='stable')
+    # GroupBy.last() skips NaN, so each column keeps its own last valid value
+    return pairs.groupby('id')[EARNINGS_FIELDS].last()
+
+
+def match_field_of_study_chunks(programs: pd.DataFrame, chunks: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """match_field_of_study over a streamed file; later chunks win, as later rows do within one."""
+    keys = program_join_keys(programs)
+    matched = pd.DataFrame(columns=EARNINGS_FIELDS, dtype=float)
+    for chunk in chunks:
+        matched = match_field_of_study(programs, chunk, keys).combine_first(matched)
+    return matched
+
+
+def changed_programs(programs: pd.DataFrame, matched: pd.DataFrame) -> List[CollegeProgram]:
+    """CollegeProgram instances (pk + earnings only) whose matched earnings differ from the stored ones."""
+    current = programs.set_index('id').loc[matched.index, EARNINGS_FIELDS]
+    current = current.apply(pd.to_numeric, errors='coerce')
+    merged = matched.where(matched.notna(), current)
+    same = (merged == current) | (merged.isna() & current.isna())
+    changed = merged[~same.all(axis=1)]
+    return [
+        CollegeProgram(pk=int(pk), **{
+            field: None if np.isnan(value) else int(value)
+            for field, value in zip(EARNINGS_FIELDS, values)
+        })
+        for pk, values in zip(changed.index, changed.itertuples(index=False))
+    ]
+
+
+def institution_values(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    median_earnings_4yr and lower_earnings_indicator (GT_THRESHOLD_4YR below
+    0.5, as 1.0 / 0.0) per UNITID from a chunk of the Scorecard institution
+    file, NaN where suppressed. Each column keeps the last valid value of a
+    repeated UNITID, as the old row loop did.
+    """
+    threshold = parse_earnings(chunk['GT_THRESHOLD_4YR'])
+    values = pd.DataFrame({
+        'median_earnings_4yr': np.trunc(parse_earnings(chunk['MD_EARN_WNE_4YR'])).to_numpy(),
+        'lower_earnings_indicator': (threshold < 0.5).astype(float).where(threshold.notna()).to_numpy(),
+    }, index=chunk['UNITID'].astype(str).to_numpy())
+    return values.groupby(level=0).last()
+
+
+def institution_values_chunks(chunks: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """institution_values over a streamed file; later chunks win."""
+    matched = pd.DataFrame(columns=INSTITUTION_FIELDS, dtype=float)
+    for chunk in chunks:
+        matched = institution_values(chunk).combine_first(matched)
+    return matched
+
+
+def changed_colleges(matched: pd.DataFrame, queryset=None) -> List[College]:
+    """College instances (pk + institution fields only) whose Scorecard values differ from the stored ones."""
+    queryset = College.objects.exclude(UNITID__isnull=True) if queryset is None else queryset
+    colleges = pd.DataFrame.from_records(
+        list(queryset.values_list('UNITID', 'id', *INSTITUTION_FIELDS)),
+        columns=['UNITID', 'id', *INSTITUTION_FIELDS]).set_index('UNITID')
+    matched = matched[matched.index.isin(colleges.index)]
+    current = colleges.loc[matched.index, INSTITUTION_FIELDS].astype(float)
+
+    merged = matched.where(matched.notna(), current)
+    same = (merged == current) | (merged.isna() & current.isna())
+    changed = merged[~same.all(axis=1)]
+    records = pd.DataFrame({
+        'pk': colleges.loc[changed.index, 'id'].to_numpy(),
+        'median_earnings_4yr': changed['median_earnings_4yr'].astype('Int64').astype(object)
+                                   .where(changed['median_earnings_4yr'].notna(), None).to_numpy(),
+        'lower_earnings_indicator': changed['lower_earnings_indicator'].astype(bool).to_numpy(),
+    }).to_dict('records')
+    return [College(**record) for record in records]
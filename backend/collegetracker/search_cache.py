@@ -0,0 +1,106 @@
+import hashlib
+import json
+import logging
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+from collegetracker.data_version import get_data_version, COLLEGE_DATA
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_ALIAS = 'search'
+
+# Filters the views already match case-insensitively, so "CA" and "ca" share an entry
+CASE_INSENSITIVE_PARAMS = {'state', 'city', 'name', 'program', 'search'}
+
+HITS_KEY = 'search_cache:hits'
+MISSES_KEY = 'search_cache:misses'
+
+
+def _cache():
+    return caches[SEARCH_CACHE_ALIAS]
+
+
+def canonical_params(params, defaults: Optional[Dict[str, str]] = None, extra: Optional[Dict[str, str]] = None) -> list:
+    """
+    Normalize a query string so equivalent requests share a key: keys sorted,
+    values stripped, blanks dropped, case folded where the filter ignores
+    case, and omitted parameters filled in with the view's defaults.
+    """
+    values = {}
+    for key in params:
+        cleaned = [v.strip() for v in params.getlist(key)]
+        cleaned = [v for v in cleaned if v]
+        if cleaned:
+            values[key] = cleaned
+    for key, value in (extra or {}).items():
+        values[key] = [value.strip()]
+    for key, value in (defaults or {}).items():
+        values.setdefault(key, [value])
+
+    return [
+        (key, [v.lower() for v in vals] if key in CASE_INSENSITIVE_PARAMS else vals)
+        for key, vals in sorted(values.items())
+    ]
+
+
+def search_cache_key(scope: str, request, defaults=None, extra=None) -> str:
+    # Serialized image URLs are absolute, so the host is part of the response.
+    # The data version is the generation: imports and College edits bump it,
+    # which orphans every earlier entry at once.
+    canonical = [scope, request.get_host(), canonical_params(request.GET, defaults, extra)]
+    digest = hashlib.sha1(json.dumps(canonical, separators=(',', ':')).encode()).hexdigest()
+    return f"search:{get_data_version(COLLEGE_DATA)}:{scope}:{digest}"
+
+
+def _count(key: str):
+    cache = _cache()
+    try:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr(); losing one count is fine
+        pass
+
+
+def cached_search(scope: str, request, build: Callable[[], dict], defaults=None, extra=None):
+    """
+    Return the cached payload for this request's canonical parameters, or
+    build, store and return it. Exceptions from `build` are not cached.
+    """
+    if not getattr(settings, 'SEARCH_CACHE_ENABLED', False):
+        return build()
+
+    try:
+        key = search_cache_key(scope, request, defaults, extra)
+        data = _cache().get(key)
+    except Exception as e:
+        logger.error(f"Search cache lookup failed: {e}")
+        return build()
+
+    if data is not None:
+        _count(HITS_KEY)
+        return data
+
+    _count(MISSES_KEY)
+    data = build()
+    try:
+        _cache().set(key, data)
+    except Exception as e:
+        logger.error(f"Search cache store failed: {e}")
+    return data
+
+
+def search_cache_stats() -> dict:
+    cache = _cache()
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    return {
+        'backend': getattr(settings, 'SEARCH_CACHE_BACKEND', 'locmem'),
+        'generation': get_data_version(COLLEGE_DATA),
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / max(1, hits + misses),
+    }
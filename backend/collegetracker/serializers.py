@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from .models import College
 from django.contrib.auth import authenticate
-from .models import Comment, Post, Bookmark, Reply, User, Like, Friendship, SmartCollege, CollegeProgram, Article, Notification, ChatMessage, LeadStatus, Review, Service, Meeting
+from .models import Comment, Post, Bookmark, Reply, User, Like, Friendship, SmartCollege, CollegeProgram, Article, Notification, ChatMessage, LeadStatus, Review, Service, Meeting, ImportJob
 from django.contrib.contenttypes.models import ContentType
 from rest_framework.validators import UniqueTogetherValidator
 
@@ -21,7 +21,11 @@ class CollegeSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
     def get_programs_count(self, obj):
-        return obj.programs.count()
+        # Listing views annotate this via College.objects.with_programs_count()
+        count = getattr(obj, 'programs_count', None)
+        if count is None:
+            count = obj.programs.count()
+        return count
 
 
 class SmartCollegeSerializer(serializers.ModelSerializer):
@@ -119,6 +123,14 @@ class UploadFileSerializer(serializers.Serializer):
     file = serializers.FileField()
 
 
+class ImportJobSerializer(serializers.ModelSerializer):
+    progress = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = ImportJob
+        exclude = ['id', 'file', 'created_by']
+
+
 class PostSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     comments_count = serializers.SerializerMethodField()
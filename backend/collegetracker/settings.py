@@ -11,9 +11,12 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -180,3 +183,65 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Answer DetailedSearchListView's structured filters from an in-memory NumPy
+# index (rebuilt per worker whenever college data changes) instead of SQL.
+COLLEGE_INDEX_ENABLED = os.environ.get('COLLEGE_INDEX_ENABLED', 'True') == 'True'
+
+# Response cache for the college search endpoints (collegetracker.search_cache).
+# SEARCH_CACHE_BACKEND is 'locmem' (per worker, LRU-culled at MAX_ENTRIES),
+# 'file' (shared by the workers of one host) or 'redis' (shared by every host;
+# needs the redis package, LRU comes from the server's maxmemory-policy).
+SEARCH_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'college-search'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache',
+             os.path.join(tempfile.gettempdir(), 'collegetracker-search-cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+SEARCH_CACHE_ENABLED = os.environ.get('SEARCH_CACHE_ENABLED', 'True') == 'True'
+SEARCH_CACHE_BACKEND = os.environ.get('SEARCH_CACHE_BACKEND', 'locmem')
+if SEARCH_CACHE_BACKEND not in SEARCH_CACHE_BACKENDS:
+    raise ImproperlyConfigured(
+        f"Unknown SEARCH_CACHE_BACKEND {SEARCH_CACHE_BACKEND!r}; choose from {', '.join(SEARCH_CACHE_BACKENDS)}")
+_search_backend, _search_location = SEARCH_CACHE_BACKENDS[SEARCH_CACHE_BACKEND]
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'search': {
+        'BACKEND': _search_backend,
+        'LOCATION': os.environ.get('SEARCH_CACHE_LOCATION', _search_location),
+        'TIMEOUT': int(os.environ.get('SEARCH_CACHE_TIMEOUT', 300)),
+    },
+}
+if SEARCH_CACHE_BACKEND != 'redis':
+    CACHES['search']['OPTIONS'] = {'MAX_ENTRIES': int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', 2000))}
+
+# Parsed copies of the raw IPEDS / Scorecard files used by the import commands
+# (collegetracker.source_data), keyed by file hash. Feather when pyarrow is
+# installed, pickle otherwise. Safe to delete at any time.
+SOURCE_CACHE_ENABLED = os.environ.get('SOURCE_CACHE_ENABLED', 'True') == 'True'
+SOURCE_CACHE_DIR = os.environ.get('SOURCE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'collegetracker-source-cache'))
+
+# Semantic cache of Wormie answers to general (non-personal) questions, per
+# worker process (collegetracker.answer_cache). Prompts whose embeddings are at
+# least WORMIE_CACHE_THRESHOLD cosine-similar share an answer.
+WORMIE_CACHE_ENABLED = os.environ.get('WORMIE_CACHE_ENABLED', 'True') == 'True'
+WORMIE_CACHE_THRESHOLD = float(os.environ.get('WORMIE_CACHE_THRESHOLD', 0.92))
+WORMIE_CACHE_TTL = int(os.environ.get('WORMIE_CACHE_TTL', 6 * 3600))
+WORMIE_CACHE_MAX_ENTRIES = int(os.environ.get('WORMIE_CACHE_MAX_ENTRIES', 500))
+
+# Embedding backend for the FAISS college index and the Wormie answer cache
+# (collegetracker.embeddings): gemini, local (sentence-transformers on CPU),
+# hashing (offline feature hashing / TF-IDF), or auto = gemini when
+# GEMINI_API_KEY is set, hashing otherwise. An index always answers queries
+# with the backend it was built with.
+EMBEDDING_BACKEND = os.environ.get('EMBEDDING_BACKEND', 'auto')
+EMBEDDING_LOCAL_MODEL = os.environ.get('EMBEDDING_LOCAL_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get('QUERY_EMBEDDING_CACHE_SIZE', 1000))
+
+# Serve /api/ai/chat/ from the async AsyncAIChatView. Only set this when
+# running under ASGI (collegetracker.asgi with uvicorn workers); under WSGI
+# Django would have to buffer the async stream.
+ASYNC_CHAT_VIEW = os.environ.get('ASYNC_CHAT_VIEW', 'False') == 'True'
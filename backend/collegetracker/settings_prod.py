@@ -74,6 +74,16 @@ if GCS_BUCKET:
         "staticfiles": {
             "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
         },
+        # CSV uploads queued for the import worker service: shared through the
+        # bucket (the worker has no access to the web container's disk) and
+        # private, unlike the public-read media files
+        "import_jobs": {
+            "BACKEND": "storages.backends.gcloud.GoogleCloudStorage",
+            "OPTIONS": {
+                "bucket_name": os.environ.get('IMPORT_JOBS_BUCKET_NAME', GCS_BUCKET),
+                "default_acl": "projectPrivate",
+            },
+        },
     }
 else:
     MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
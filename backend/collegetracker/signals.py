@@ -0,0 +1,38 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from collegetracker.data_version import bump_data_version, is_batched, COLLEGE_DATA
+from collegetracker.models import College, CollegeProgram
+from collegetracker.text_search import rebuild_search_index, remove_from_search_index, search_index_available
+
+
+# bulk_create / bulk_update / queryset.update() bypass signals, so the import
+# commands bump the version and rebuild the search index themselves. Code that
+# deletes or saves programs row by row (import_programs' stale deletes) runs
+# inside batched_data_change() so these receivers defer to one bump.
+
+@receiver(post_save, sender=College)
+def college_saved(sender, instance, **kwargs):
+    bump_data_version(COLLEGE_DATA)
+    if not is_batched(COLLEGE_DATA) and search_index_available():
+        rebuild_search_index([instance.pk])
+
+
+@receiver(post_delete, sender=College)
+def college_deleted(sender, instance, **kwargs):
+    bump_data_version(COLLEGE_DATA)
+    if not is_batched(COLLEGE_DATA) and search_index_available():
+        remove_from_search_index([instance.pk])
+
+
+@receiver(post_save, sender=CollegeProgram)
+@receiver(post_delete, sender=CollegeProgram)
+def college_program_changed(sender, instance, **kwargs):
+    # Deleting a College cascades over its programs; college_deleted covers
+    # those with one bump, and the college's document is going away anyway
+    if isinstance(kwargs.get('origin'), College):
+        return
+    # Program names are part of their college's full-text document
+    bump_data_version(COLLEGE_DATA)
+    if not is_batched(COLLEGE_DATA) and search_index_available():
+        rebuild_search_index({instance.college_id})
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+from django.conf import settings
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+logger = logging.getLogger(__name__)
+
+# Where the raw IPEDS downloads live; every import command takes --data-dir to override it
+IPEDS_DIR = "/Users/banupaksoy/Desktop/capstone/IPEDS_data"
+
+# Rows per chunk when streaming the raw IPEDS / Scorecard CSVs. The Scorecard
+# files are a few thousand columns wide, so memory is set by this times the
+# selected columns rather than by the file size.
+CSV_CHUNK_ROWS = 50_000
+
+# Bump when the cache layout or parsing changes so old entries are ignored
+CACHE_FORMAT_VERSION = 1
+DIGESTS_FILE = 'digests.json'
+
+
+def _cache_root() -> Optional[str]:
+    if not getattr(settings, 'SOURCE_CACHE_ENABLED', False):
+        return None
+    return getattr(settings, 'SOURCE_CACHE_DIR', None)
+
+
+def _sha1_file(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_digest(path: str, root: Optional[str] = None) -> str:
+    """
+    Content hash of a source file. Hashes are remembered by (size, mtime) in
+    the cache directory so unchanged multi-hundred-MB files are not re-read
+    just to find their cache entry.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    if root is None:
+        return _sha1_file(path)
+
+    index_path = os.path.join(root, DIGESTS_FILE)
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    known = index.get(path)
+    if known and known[:2] == stamp:
+        return known[2]
+
+    digest = _sha1_file(path)
+    index[path] = stamp + [digest]
+    try:
+        fd, tmp = tempfile.mkstemp(dir=root, suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp, index_path)
+    except OSError as e:
+        logger.warning(f"Could not record digest for {path}: {e}")
+    return digest
+
+
+class CacheEntry:
+    """
+    One parsed source file: a directory of numbered parts (one per chunk),
+    Feather when pyarrow is installed and pickle otherwise. Feather parts
+    are uncompressed and memory-mapped on read.
+    """
+
+    def __init__(self, root: str, name: str, params_key: str, digest: str):
+        self.root = root
+        self.prefix = f"{name}.{params_key}."
+        self.path = os.path.join(root, self.prefix + digest)
+
+    def exists(self) -> bool:
+        return os.path.isdir(self.path)
+
+    def parts(self) -> List[str]:
+        return sorted(os.path.join(self.path, p) for p in os.listdir(self.path))
+
+    def read(self) -> Iterator[pd.DataFrame]:
+        for part in self.parts():
+            yield _read_part(part)
+
+    def write_through(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Yield `chunks` unchanged while saving them; the entry only appears once every chunk is written."""
+        os.makedirs(self.root, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=self.root, prefix='.tmp-')
+        caching = True
+        try:
+            for i, chunk in enumerate(chunks):
+                if caching:
+                    try:
+                        _write_part(chunk, os.path.join(tmp, f"{i:05d}"))
+                    except Exception as e:
+                        logger.warning(f"Not caching {self.path}: {e}")
+                        caching = False
+                yield chunk
+            if caching:
+                self._prune()
+                os.replace(tmp, self.path)
+                tmp = None
+        finally:
+            if tmp is not None:
+                shutil.rmtree(tmp, ignore_errors=True)
+
+    def _prune(self):
+        # Earlier versions of the same source file read with the same parameters
+        for name in os.listdir(self.root):
+            if name.startswith(self.prefix):
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+
+def _write_part(df: pd.DataFrame, base: str):
+    df = df.reset_index(drop=True)
+    if feather is not None:
+        try:
+            df.to_feather(base + '.feather', compression='uncompressed')
+            return
+        except Exception:
+            # Mixed-type object columns (e.g. the XLSX dictionaries) have no Arrow type
+            if os.path.exists(base + '.feather'):
+                os.remove(base + '.feather')
+    df.to_pickle(base + '.pkl')
+
+
+def _read_part(path: str) -> pd.DataFrame:
+    if path.endswith('.feather'):
+        return feather.read_table(path, memory_map=True).to_pandas()
+    return pd.read_pickle(path)
+
+
+def _cache_entry(path: str, kind: str, params: dict) -> Optional[CacheEntry]:
+    root = _cache_root()
+    if root is None:
+        return None
+    try:
+        os.makedirs(root, exist_ok=True)
+        params = {'kind': kind, 'format': CACHE_FORMAT_VERSION, **params}
+        params_key = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:12]
+        return CacheEntry(root, os.path.basename(path), params_key, file_digest(path, root))
+    except OSError as e:
+        logger.warning(f"Source cache unavailable for {path}: {e}")
+        return None
+
+
+def _cached(entry: Optional[CacheEntry], parse: Callable[[], Iterable[pd.DataFrame]]) -> Iterator[pd.DataFrame]:
+    if entry is None:
+        yield from parse()
+    elif entry.exists():
+        logger.info(f"Reading {entry.path} from the source cache")
+        yield from entry.read()
+    else:
+        yield from entry.write_through(parse())
+
+
+def iter_csv_chunks(path: str, columns: Dict[str, Optional[str]], chunksize: int = CSV_CHUNK_ROWS,
+                    cache: bool = True, **read_kwargs) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV as DataFrame chunks holding only `columns`, a mapping of
+    column name to dtype (None leaves that column to pandas inference).
+    The first read of a file caches the parsed chunks (keyed by the file's
+    hash and these arguments); later reads load them instead of parsing.
+    Cached chunks keep the chunk size of the run that wrote them. Pass
+    cache=False to always parse.
+    """
+    dtype = {name: kind for name, kind in columns.items() if kind is not None}
+
+    def parse():
+        with pd.read_csv(path, usecols=list(columns), dtype=dtype or None, chunksize=chunksize,
+                         **read_kwargs) as reader:
+            yield from reader
+
+    entry = _cache_entry(path, 'csv', {'columns': columns, 'read_kwargs': read_kwargs}) if cache else None
+    yield from _cached(entry, parse)
+
+
+def read_csv_columns(path: str, columns: Dict[str, Optional[str]], keep: Optional[Callable] = None,
+                     chunksize: int = CSV_CHUNK_ROWS, cache: bool = True, **read_kwargs) -> pd.DataFrame:
+    """
+    Read the selected columns of a CSV chunk by chunk. `keep(chunk)` returns
+    a row mask applied before chunks are concatenated, so peak memory tracks
+    the rows kept rather than the whole file.
+    """
+    parts = []
+    for chunk in iter_csv_chunks(path, columns, chunksize=chunksize, cache=cache, **read_kwargs):
+        parts.append(chunk[keep(chunk)] if keep is not None else chunk)
+    if not parts:
+        return pd.DataFrame(columns=list(columns))
+    return pd.concat(parts, ignore_index=True)
+
+
+def read_excel_sheet(path: str, sheet_name, **read_kwargs) -> pd.DataFrame:
+    """pd.read_excel for one sheet, cached like the CSVs (openpyxl parsing is slow even for small files)."""
+    entry = _cache_entry(path, 'excel', {'sheet_name': sheet_name, 'read_kwargs': read_kwargs})
+    parts = list(_cached(entry, lambda: [pd.read_excel(path, sheet_name=sheet_name, **read_kwargs)]))
+    return parts[0]
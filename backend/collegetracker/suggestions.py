@@ -0,0 +1,125 @@
+import difflib
+from collections import defaultdict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from collegetracker.models import College
+from collegetracker.data_version import versioned_cache
+
+# Same acceptance threshold the old difflib scan used
+MIN_SUGGESTION_SCORE = 0.4
+PREFIX_BONUS = 0.4
+
+# How many trigram-ranked candidates get the exact difflib rerank
+SHORTLIST_SIZE = 100
+
+
+def legacy_score(query_lower: str, name: str) -> float:
+    """The original "did you mean" score: difflib ratio plus a word-prefix bonus."""
+    n_lower = name.lower()
+    ratio = difflib.SequenceMatcher(None, query_lower, n_lower).ratio()
+    if any(word.startswith(query_lower[:3]) for word in n_lower.split()):
+        ratio += PREFIX_BONUS
+    return ratio
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SuggestionIndex:
+    """
+    Trigram inverted index over college names. A query only touches the
+    postings of its own trigrams, shortlists the closest names by Dice
+    similarity and reranks that shortlist with the legacy difflib score, so
+    suggestions match the old full scan without comparing against every name.
+    """
+
+    def __init__(self, names: List[str], version: int = 0):
+        self.version = version
+        self.names = sorted(set(n for n in names if n))
+        postings = defaultdict(list)
+        prefixes = defaultdict(list)
+        sizes = []
+        for pos, name in enumerate(self.names):
+            grams = _trigrams(name)
+            sizes.append(len(grams))
+            for gram in grams:
+                postings[gram].append(pos)
+            for word in set(name.lower().split()):
+                if len(word) >= 3:
+                    prefixes[word[:3]].append(pos)
+                else:
+                    prefixes[word].append(pos)
+
+        self.sizes = np.array(sizes, dtype=np.float64)
+        self.postings = {g: np.array(p, dtype=np.int32) for g, p in postings.items()}
+        self.prefixes = {w: np.unique(np.array(p, dtype=np.int32)) for w, p in prefixes.items()}
+
+    @classmethod
+    def from_database(cls, version: int = 0):
+        return cls(list(College.objects.values_list('name', flat=True)), version=version)
+
+    def _prefix_candidates(self, query_lower: str) -> np.ndarray:
+        # Names that earn the prefix bonus: some word starts with query[:3]
+        head = query_lower[:3]
+        if len(head) == 3:
+            return self.prefixes.get(head, np.empty(0, dtype=np.int32))
+        keys = [k for k in self.prefixes if k.startswith(head)]
+        if not keys:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate([self.prefixes[k] for k in keys]))
+
+    def _top_by_similarity(self, similarity: np.ndarray, candidates: Optional[np.ndarray] = None) -> np.ndarray:
+        if candidates is not None:
+            if not len(candidates):
+                return candidates
+            scores = similarity[candidates]
+        else:
+            candidates = np.arange(len(similarity))
+            scores = similarity
+        if len(candidates) > SHORTLIST_SIZE:
+            keep = np.argpartition(-scores, SHORTLIST_SIZE)[:SHORTLIST_SIZE]
+            candidates = candidates[keep]
+        return candidates
+
+    def suggest(self, query: str, limit: int = 5, min_score: float = MIN_SUGGESTION_SCORE) -> List[Tuple[str, float]]:
+        """Return up to `limit` (name, score) pairs, best first, scoring above `min_score`."""
+        query_lower = (query or '').lower()
+        if not query_lower or not self.names:
+            return []
+
+        grams = _trigrams(query_lower)
+        hits = [self.postings[g] for g in grams if g in self.postings]
+        if hits:
+            overlap = np.bincount(np.concatenate(hits), minlength=len(self.names))
+        else:
+            overlap = np.zeros(len(self.names))
+        similarity = 2.0 * overlap / (self.sizes + len(grams))
+
+        shortlist = np.union1d(
+            self._top_by_similarity(similarity),
+            self._top_by_similarity(similarity, self._prefix_candidates(query_lower)),
+        )
+
+        scored = [(legacy_score(query_lower, self.names[i]), self.names[i]) for i in shortlist]
+        scored.sort(key=lambda x: x[0], reverse=True)
+        return [(name, score) for score, name in scored[:limit] if score > min_score]
+
+
+_INDEX = versioned_cache(lambda version: SuggestionIndex.from_database(version=version), label='suggestion index')
+
+
+def get_suggestion_index() -> Optional[SuggestionIndex]:
+    """Per-worker suggestion index, rebuilt when the college data version moves (e.g. after imports)."""
+    return _INDEX.get()
+
+
+def suggest_college_names(query: str, limit: int = 5) -> List[str]:
+    """Top "did you mean" college names for a query that returned nothing."""
+    index = get_suggestion_index()
+    if index is None:
+        return []
+    return [name for name, _ in index.suggest(query, limit=limit)]
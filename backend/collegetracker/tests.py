@@ -0,0 +1,448 @@
+import asyncio
+import json
+import random
+import tempfile
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+
+from collegetracker import answer_cache, streaming
+from collegetracker.agent_engine import WormieManagedAgent
+from collegetracker.answer_cache import SemanticAnswerCache, is_cacheable_prompt, prompt_guard
+from collegetracker.college_index import SORT_ORDERINGS, CollegeIndex
+from collegetracker.models import Bookmark, College, CollegeProgram, ImportJob, User
+from collegetracker.pagination import InvalidCursor, encode_cursor, id_list_page
+from collegetracker.text_search import ranked_college_ids, rebuild_search_index
+from collegetracker.views import CollegeListView, DetailedSearchListView
+
+
+def create_colleges(count, programs_each=2):
+    colleges = College.objects.bulk_create([
+        College(name=f"Test College {i}", city="Albany", state="NY", website="https://example.edu")
+        for i in range(count)
+    ])
+    CollegeProgram.objects.bulk_create([
+        CollegeProgram(college=college, cipcode=f"{j}.0101", cipdesc=f"Program {j}")
+        for college in colleges for j in range(programs_each)
+    ])
+    return colleges
+
+
+class CollegeIndexTests(TestCase):
+    """The in-memory college index must answer the structured filters exactly as the ORM does."""
+    QUERIES = [
+        {},
+        {'sort': 'admission_rate'},
+        {'sort': 'cost'},
+        {'sort': 'grad_rate'},
+        {'state': 'ny'},
+        {'state': 'CA', 'sort': 'grad_rate'},
+        {'city': 'New York City'},
+        {'city': 'albany', 'sort': 'cost'},
+        {'name': 'california'},
+        {'name': 'hbcu', 'sort': 'admission_rate'},
+        {'name': 'ivy'},
+        {'control': '2', 'locale_category': 'suburb'},
+        {'locale_category': 'rural', 'hsi': 'true'},
+        {'hbcu': 'true', 'hsi': 'true'},
+        {'min_cost': '20000', 'max_cost': '50000', 'sort': 'cost'},
+        {'min_admission': '0.1', 'max_admission': '0.6', 'sort': 'admission_rate'},
+        {'min_sat': '1100', 'max_sat': 'abc', 'sort': 'grad_rate'},
+        {'state': 'NY', 'min_sat': '1000', 'max_admission': '0.8', 'control': '1'},
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(0)
+        cities = [('New York', 'NY'), ('new york city', 'NY'), ('Albany', 'NY'), ('Los Angeles', 'CA'),
+                  ('Boston', 'MA'), ('Austin', 'TX')]
+
+        def maybe(value):
+            return None if rng.random() < 0.15 else value
+
+        colleges = []
+        for i in range(120):
+            city, state = rng.choice(cities)
+            colleges.append(College(
+                # Repeated and differently cased names exercise the id tiebreak and collation
+                name=rng.choice(["Harvard University", "Yale University", f"college {i % 7}", f"College {i}"]),
+                city=city, state=rng.choice([state, state.lower()]), website="https://example.edu",
+                admission_rate=maybe(round(rng.random(), 2)),
+                sat_score=maybe(rng.randrange(800, 1600, 10)),
+                cost_of_attendance=maybe(rng.randrange(10000, 80000, 1000)),
+                grad_rate=maybe(round(rng.random(), 2)),
+                locale=maybe(rng.choice([11, 12, 13, 21, 22, 23, 31, 32, 33, 41, 42, 43])),
+                control=maybe(rng.choice([1, 2, 3])),
+                hbcu=rng.random() < 0.2, hsi=rng.random() < 0.3,
+            ))
+        College.objects.bulk_create(colleges)
+
+    def _view(self, params):
+        view = DetailedSearchListView()
+        view.request = Request(APIRequestFactory().get('/api/colleges/detailed/', params))
+        return view
+
+    def test_index_matches_orm(self):
+        index = CollegeIndex()
+        for params in self.QUERIES:
+            with self.subTest(params=params):
+                view = self._view(params)
+                with mock.patch('collegetracker.views.get_college_index', return_value=index):
+                    ids = view._college_index_ids()
+                ordering = SORT_ORDERINGS[params.get('sort', 'name')]
+                expected = list(view.filter_colleges(College.objects.all()).order_by(*ordering)
+                                .values_list('id', flat=True))
+                self.assertIsNotNone(ids)
+                self.assertEqual(ids.tolist(), expected)
+                if not params:
+                    self.assertEqual(len(expected), 120)
+
+
+class CollegeListingQueryCountTests(TestCase):
+    """
+    Listing endpoints serialize programs_count from the with_programs_count()
+    annotation; a per-row COUNT would make the query count grow with the page.
+    """
+    LISTINGS = [
+        '/api/colleges/scroll/',
+        '/api/colleges/?page_size=50',
+        '/api/colleges/?page_size=50&cursor=',
+        '/api/colleges/filtered/?states=NY',
+    ]
+
+    def _queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            # Streamed responses query the database while the body is consumed
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+        return len(context), body
+
+    def test_query_count_does_not_grow_with_colleges(self):
+        create_colleges(3)
+        small = {url: self._queries(url)[0] for url in self.LISTINGS}
+        create_colleges(20)
+        for url in self.LISTINGS:
+            with self.subTest(url=url):
+                queries, body = self._queries(url)
+                self.assertEqual(queries, small[url])
+                self.assertIn(b'"programs_count":2', body.replace(b' ', b''))
+
+
+class CollegeDeleteQueryCountTests(TestCase):
+    """Programs removed by a College delete cascade must not each bump the data version and rebuild the index."""
+
+    def _delete_queries(self, programs_each):
+        college = create_colleges(1, programs_each=programs_each)[0]
+        with CaptureQueriesContext(connection) as context:
+            college.delete()
+        self.assertFalse(CollegeProgram.objects.filter(college_id=college.pk).exists())
+        return len(context)
+
+    def test_query_count_does_not_grow_with_programs(self):
+        self._delete_queries(1)  # Creates the DataVersion row
+        self.assertEqual(self._delete_queries(20), self._delete_queries(2))
+
+    def test_deleting_a_program_still_bumps_the_version(self):
+        college = create_colleges(1)[0]
+        with mock.patch('collegetracker.signals.bump_data_version') as bump:
+            college.programs.first().delete()
+        bump.assert_called_once()
+
+
+class CollegeRecommendationTests(TestCase):
+
+    def test_falls_back_to_query_ranking_without_engine(self):
+        colleges = create_colleges(4, programs_each=0)
+        for college, sat in zip(colleges, [1200, 1500, 1210, 900]):
+            college.sat_score = sat
+        College.objects.bulk_update(colleges, ['sat_score'])
+        user = User.objects.create_user(username='student', password='pw')
+        Bookmark.objects.create(user=user, college=colleges[0])
+        client = APIClient()
+        client.force_authenticate(user)
+
+        with mock.patch('collegetracker.views.recommend_college_ids', return_value=None):
+            response = client.get('/api/colleges/recommendations/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()['colleges']],
+                         [colleges[2].pk, colleges[1].pk, colleges[3].pk])
+
+
+class ImportJobStatusTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_status_is_looked_up_by_token(self):
+        upload = SimpleUploadedFile('programs.csv', b'UNITID,CIPCODE\n', content_type='text/csv')
+        response = self.client.post('/upload4/', {'file': upload})
+        self.assertEqual(response.status_code, 202)
+        job = ImportJob.objects.get()
+        self.assertEqual(response.json()['job_id'], str(job.token))
+
+        status_response = self.client.get(response.json()['status_url'])
+        self.assertEqual(status_response.status_code, 200)
+        self.assertEqual(status_response.json()['status'], 'queued')
+        self.assertNotIn('id', status_response.json())
+        # Sequential pks no longer reach a job
+        self.assertEqual(self.client.get(f'/api/import-jobs/{job.pk}/').status_code, 404)
+
+
+class IdListPageTests(SimpleTestCase):
+    IDS = [5, 3, 9, 1, 7]
+
+    def test_resumes_after_last_id(self):
+        cursor = encode_cursor(['Beta', 3], offset=1, ordering=('name', 'id'))
+        self.assertEqual(id_list_page(self.IDS, cursor, 2, ordering=('name', 'id')), ([9, 1], 2, True))
+
+    def test_rejects_cursor_from_another_sort(self):
+        cursor = encode_cursor([0.25, 3], offset=1, ordering=('admission_rate', 'id'))
+        with self.assertRaises(InvalidCursor):
+            id_list_page(self.IDS, cursor, 2, ordering=('name', 'id'))
+
+    def test_rejects_cursor_with_wrong_arity(self):
+        # Untagged cursors (issued before the sort tag) still get the arity check
+        with self.assertRaises(InvalidCursor):
+            id_list_page(self.IDS, encode_cursor([3], offset=1), 2, ordering=('name', 'id'))
+        self.assertEqual(id_list_page(self.IDS, encode_cursor(['Beta', 3], offset=1), 2, ordering=('name', 'id'))[0],
+                         [9, 1])
+
+
+@override_settings(SEARCH_CACHE_ENABLED=False)
+class RankedCursorTests(TestCase):
+    """Full-text results are paged in rank order, which the ORM's (name, id) keyset can't resume."""
+    URL = '/api/colleges/programs/'
+
+    def _page(self, **params):
+        response = self.client.get(self.URL, {'search': 'nursing', 'page_size': 2, **params})
+        return response.status_code, response.json()
+
+    def test_pages_follow_rank_and_orm_rejects_rank_cursor(self):
+        colleges = create_colleges(5, programs_each=1)
+        # Names sort in the opposite order to the (tied) rank, which falls back to id
+        for i, college in enumerate(colleges):
+            college.name = f"Test College {9 - i}"
+        College.objects.bulk_update(colleges, ['name'])
+        CollegeProgram.objects.update(cipdesc="Nursing")
+        rebuild_search_index()
+        ranked = ranked_college_ids('nursing', fields=('programs',))
+        self.assertEqual(ranked, [college.pk for college in colleges])
+
+        ids, cursors, cursor = [], [], ''
+        while cursor is not None:
+            status_code, data = self._page(cursor=cursor)
+            self.assertEqual(status_code, 200)
+            ids += [row['id'] for row in data['colleges']]
+            cursor = data['next_cursor']
+            cursors.append(cursor)
+        self.assertEqual(ids, ranked)
+
+        with mock.patch('collegetracker.views.ranked_college_ids', return_value=None):
+            self.assertEqual(self._page(cursor=cursors[0])[0], 400)
+
+
+def asgi_scope(path):
+    return {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'headers': [],
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 1234)}
+
+
+class AsgiConcurrencyTests(SimpleTestCase):
+    """
+    The web service runs every endpoint under ASGI. Django gives each ASGI
+    request its own thread for sync views, so blocking non-chat endpoints
+    still overlap rather than queueing behind one thread per worker.
+    """
+
+    async def _get(self, path):
+        status_codes = []
+        requested = []
+
+        async def receive():
+            if requested:
+                # Never disconnects; Django cancels this wait once the response is sent
+                await asyncio.Event().wait()
+            requested.append(True)
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status_codes.append(message['status'])
+
+        await ASGIHandler()(asgi_scope(path), receive, send)
+        return status_codes[0]
+
+    def test_sync_views_run_concurrently(self):
+        # Every request waits for the others; serialized requests would break the barrier
+        barrier = threading.Barrier(4, timeout=5)
+        threads = set()
+
+        def blocking_get(view, request, format=None):
+            threads.add(threading.get_ident())
+            barrier.wait()
+            return Response({})
+
+        async def requests():
+            return await asyncio.gather(*[self._get('/api/colleges/') for _ in range(4)])
+
+        # A plain event loop like the server's: an async test method would run
+        # under async_to_sync, which pins every sync call to the test's thread
+        with mock.patch.object(CollegeListView, 'get', blocking_get):
+            statuses = asyncio.run(requests())
+        self.assertEqual(statuses, [200] * 4)
+        self.assertEqual(len(threads), 4)
+
+
+class AsgiStreamingTests(TestCase):
+    """
+    Under ASGI a sync streaming iterator is collected with sync_to_async(list)
+    before anything is sent; stream_queryset must hand Django an async
+    iterator so the catalog goes out chunk by chunk.
+    """
+
+    async def _get(self, path):
+        """Run `path` through Django's ASGI handler; returns the body messages and the chunks serialized before each."""
+        serialized = []
+        original = streaming._serialized_chunks
+
+        def counting_chunks(queryset, serializer_class, context, chunk_size):
+            for rows in original(queryset, serializer_class, context, chunk_size=5):
+                serialized.append(len(rows))
+                yield rows
+
+        disconnected = asyncio.Event()
+        messages = []
+
+        async def receive():
+            if not messages:
+                messages.append(None)
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.body':
+                messages.append((len(serialized), message))
+
+        with mock.patch.object(streaming, '_serialized_chunks', counting_chunks):
+            await ASGIHandler()(asgi_scope(path), receive, send)
+        disconnected.set()
+        return [m for m in messages if m is not None], len(serialized)
+
+    async def test_catalog_is_sent_while_it_is_serialized(self):
+        await College.objects.abulk_create([
+            College(name=f"Streamed College {i}", city="Albany", state="NY", website="https://example.edu")
+            for i in range(23)
+        ])
+        bodies, total_chunks = await self._get('/api/colleges/scroll/')
+
+        self.assertEqual(total_chunks, 5)
+        # The opening bracket goes out before any rows are serialized, and
+        # each later write follows one more chunk
+        self.assertEqual(bodies[0][0], 0)
+        self.assertEqual([seen for seen, _ in bodies[1:6]], [1, 2, 3, 4, 5])
+        self.assertTrue(all(m['more_body'] for _, m in bodies[:-1]))
+        body = b''.join(m.get('body', b'') for _, m in bodies)
+        self.assertEqual(len(json.loads(body)['colleges']), 23)
+
+
+class IsCacheablePromptTests(SimpleTestCase):
+
+    def test_general_questions_are_cacheable(self):
+        for prompt in ["What is Harvard known for?", "List nursing schools in Ohio",
+                       "Is there a good nursing school in Ohio?", "What is the average SAT score at MIT?",
+                       "Which of these schools has the lowest tuition?"]:
+            with self.subTest(prompt=prompt):
+                self.assertTrue(is_cacheable_prompt(prompt))
+
+    def test_questions_about_the_asker_are_not(self):
+        for prompt in ["What are my chances at MIT?", "I want to study nursing", "Should I apply early?",
+                       "Bookmark Yale", "Save Cornell to our list", "Connect me with a recruiter",
+                       "What are the odds I get into Duke?", "what is a good school for me",
+                       "Which colleges match me?", "Tell me about Harvard", ""]:
+            with self.subTest(prompt=prompt):
+                self.assertFalse(is_cacheable_prompt(prompt))
+
+
+class PromptGuardTests(TestCase):
+    """Prompts naming different colleges never share an answer, however they are cased."""
+
+    def setUp(self):
+        College.objects.bulk_create([
+            College(name=name, city="Boston", state="MA", website="https://example.edu")
+            for name in ["Harvard University", "Yale University", "Boston College", "Boston University"]
+        ])
+        answer_cache._NAME_INDEX.clear()
+        self.addCleanup(answer_cache._NAME_INDEX.clear)
+
+    def test_lowercase_college_names_are_in_the_guard(self):
+        harvard = prompt_guard("what is the acceptance rate at harvard")
+        yale = prompt_guard("what is the acceptance rate at yale")
+        self.assertTrue(harvard)
+        self.assertNotEqual(harvard, yale)
+        self.assertEqual(harvard, prompt_guard("what's the acceptance rate at harvard?"))
+        self.assertNotEqual(prompt_guard("tuition at boston college"), prompt_guard("tuition at boston university"))
+        self.assertEqual(prompt_guard("What is the average SAT score?"), frozenset({'sat'}))
+
+    def test_similar_prompt_about_another_college_misses(self):
+        cache = SemanticAnswerCache(threshold=0.9, ttl=60, max_entries=10)
+        vector = np.ones(4, dtype=np.float32)
+        cache.store("what is the acceptance rate at harvard", vector, "About 3%.", 900)
+        self.assertIsNone(cache.lookup("what is the acceptance rate at yale", vector))
+        self.assertEqual(cache.lookup("what's the acceptance rate at harvard?", vector).answer, "About 3%.")
+
+
+class AnswerCacheHistoryTests(TestCase):
+    """A prompt with conversation before it may refer to it, so it neither reads nor fills the cache."""
+    PROMPT = "What is the average SAT score?"
+    HISTORY = [{'role': 'user', 'parts': ["Tell me about MIT"]}, {'role': 'model', 'parts': ["MIT is..."]}]
+
+    def setUp(self):
+        self.cache = SemanticAnswerCache(threshold=0.9, ttl=60, max_entries=10)
+        patcher = mock.patch('collegetracker.agent_engine.get_answer_cache', return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.agent = WormieManagedAgent()
+        self.agent.api_key = 'test'
+        self.agent.client = mock.Mock()
+        self.agent._embed = mock.Mock(return_value=np.ones(4, dtype=np.float32))
+
+    def _reply(self, text):
+        part = SimpleNamespace(text=text, thought=False)
+        chunk = SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+        self.agent.client.chats.create.return_value.send_message_stream.return_value = [chunk]
+
+    def test_follow_up_skips_lookup(self):
+        self.cache.store(self.PROMPT, np.ones(4, dtype=np.float32), "About 1200 nationally.", 900)
+        self.assertEqual(self.agent._cached_answer(self.PROMPT, self.HISTORY), (None, None))
+        self.assertEqual(self.agent._cached_answer(self.PROMPT)[0].answer, "About 1200 nationally.")
+
+        self._reply("MIT's average is 1550.")
+        self.assertEqual("".join(self.agent.stream_chat(self.PROMPT, chat_history=self.HISTORY)),
+                         "MIT's average is 1550.")
+
+    def test_follow_up_answer_is_not_stored(self):
+        self._reply("MIT's average is 1550.")
+        "".join(self.agent.stream_chat(self.PROMPT, chat_history=self.HISTORY))
+        self.assertIsNone(self.cache.get_exact(self.PROMPT))
+
+        self._reply("About 1200 nationally.")
+        "".join(self.agent.stream_chat(self.PROMPT))
+        self.assertEqual(self.cache.get_exact(self.PROMPT).answer, "About 1200 nationally.")
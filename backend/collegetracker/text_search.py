@@ -0,0 +1,207 @@
+import re
+import logging
+from typing import Iterable, List, Optional, Sequence
+
+from django.db import connection as default_connection, DatabaseError
+from django.db.models import Q, Case, When
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'collegetracker_college_fts'
+
+# Searchable columns -> Postgres tsvector weight. Name hits rank above the
+# top major, which ranks above a match somewhere in the program list.
+FIELD_WEIGHTS = {
+    'name': 'A',
+    'top_major': 'B',
+    'programs': 'C',
+}
+ALL_FIELDS = tuple(FIELD_WEIGHTS)
+
+# bm25 column weights for SQLite, in FIELD_WEIGHTS order
+SQLITE_BM25_WEIGHTS = (10.0, 4.0, 1.0)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_SQLITE_DOCUMENTS_SQL = """
+    SELECT c.id, c.name, COALESCE(c.top_major, ''), COALESCE(GROUP_CONCAT(p.cipdesc, ' '), '')
+    FROM collegetracker_college c
+    LEFT JOIN collegetracker_collegeprogram p ON p.college_id = c.id
+    {where}
+    GROUP BY c.id
+"""
+
+_POSTGRES_DOCUMENTS_SQL = """
+    SELECT c.id,
+        setweight(to_tsvector('simple', c.name), 'A') ||
+        setweight(to_tsvector('simple', COALESCE(c.top_major, '')), 'B') ||
+        setweight(to_tsvector('simple', COALESCE(string_agg(DISTINCT p.cipdesc, ' '), '')), 'C')
+    FROM collegetracker_college c
+    LEFT JOIN collegetracker_collegeprogram p ON p.college_id = c.id
+    {where}
+    GROUP BY c.id
+"""
+
+
+def create_search_index(connection=default_connection):
+    """Create the vendor-specific full-text table (FTS5 on SQLite, tsvector + GIN on Postgres)."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {FTS_TABLE} (
+                    college_id bigint PRIMARY KEY,
+                    document tsvector NOT NULL
+                )
+            """)
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {FTS_TABLE}_gin ON {FTS_TABLE} USING GIN (document)")
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                    name, top_major, programs,
+                    tokenize = 'unicode61 remove_diacritics 2',
+                    prefix = '2 3'
+                )
+            """)
+
+
+def drop_search_index(connection=default_connection):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def rebuild_search_index(college_ids: Optional[Iterable[int]] = None, connection=default_connection):
+    """
+    (Re)index colleges from College.name, College.top_major and their
+    CollegeProgram.cipdesc rows. With no ids the whole table is rebuilt, which
+    is what the import commands do once they finish writing.
+    """
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return
+
+    ids = None if college_ids is None else [int(i) for i in college_ids]
+    if ids is not None and not ids:
+        return
+
+    if ids is None:
+        where, params = '', []
+    else:
+        where, params = f"WHERE c.id IN ({', '.join(['%s'] * len(ids))})", ids
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            key = 'rowid'
+            select_sql = _SQLITE_DOCUMENTS_SQL.format(where=where)
+            insert_cols = 'rowid, name, top_major, programs'
+        else:
+            key = 'college_id'
+            select_sql = _POSTGRES_DOCUMENTS_SQL.format(where=where)
+            insert_cols = 'college_id, document'
+
+        if ids is None:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        else:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE {key} IN ({', '.join(['%s'] * len(ids))})", ids)
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({insert_cols}) {select_sql}", params)
+
+
+def remove_from_search_index(college_ids: Iterable[int], connection=default_connection):
+    ids = [int(i) for i in college_ids]
+    if not ids or connection.vendor not in ('sqlite', 'postgresql'):
+        return
+    key = 'rowid' if connection.vendor == 'sqlite' else 'college_id'
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE {key} IN ({', '.join(['%s'] * len(ids))})", ids)
+
+
+def _tokens(query: str) -> List[str]:
+    return [t.lower() for t in _TOKEN_RE.findall(query or '')]
+
+
+def _match_expression(query: str, fields: Sequence[str]):
+    """Build the vendor query string: every token must match as a prefix."""
+    tokens = _tokens(query)
+    if not tokens:
+        return None
+
+    if default_connection.vendor == 'sqlite':
+        expr = ' '.join(f'"{t}"*' for t in tokens)
+        if tuple(fields) != ALL_FIELDS:
+            expr = '{' + ' '.join(fields) + '} : (' + expr + ')'
+        return expr
+
+    weights = ''.join(FIELD_WEIGHTS[f] for f in fields)
+    suffix = '' if tuple(fields) == ALL_FIELDS else weights
+    return ' & '.join(f"{t}:*{suffix}" for t in tokens)
+
+
+_INDEX_AVAILABLE = False
+
+
+def search_index_available() -> bool:
+    """True when the FTS table exists for this database (it is created by migration 0041)."""
+    global _INDEX_AVAILABLE
+    if _INDEX_AVAILABLE:
+        return True
+    if default_connection.vendor not in ('sqlite', 'postgresql'):
+        return False
+    try:
+        _INDEX_AVAILABLE = FTS_TABLE in default_connection.introspection.table_names()
+    except DatabaseError:
+        return False
+    return _INDEX_AVAILABLE
+
+
+def match_filter(query: str, fields: Sequence[str] = ALL_FIELDS) -> Optional[Q]:
+    """
+    Return a Q restricting College rows to full-text matches, or None when the
+    index is unavailable so callers can fall back to icontains.
+    """
+    if not search_index_available():
+        return None
+    expr = _match_expression(query, fields)
+    if expr is None:
+        return None
+
+    if default_connection.vendor == 'sqlite':
+        sql = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+    else:
+        sql = f"SELECT college_id FROM {FTS_TABLE} WHERE document @@ to_tsquery('simple', %s)"
+    return Q(id__in=RawSQL(sql, [expr]))
+
+
+def ranked_college_ids(query: str, fields: Sequence[str] = ALL_FIELDS, limit: Optional[int] = None) -> Optional[List[int]]:
+    """Return matching College ids, best match first, or None if the index is unavailable."""
+    if not search_index_available():
+        return None
+    expr = _match_expression(query, fields)
+    if expr is None:
+        return None
+
+    if default_connection.vendor == 'sqlite':
+        weights = ', '.join(str(w) for w in SQLITE_BM25_WEIGHTS)
+        sql = (f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+               f"ORDER BY bm25({FTS_TABLE}, {weights}), rowid")
+    else:
+        sql = (f"SELECT college_id FROM {FTS_TABLE}, to_tsquery('simple', %s) query "
+               f"WHERE document @@ query ORDER BY ts_rank_cd(document, query) DESC, college_id")
+    params = [expr]
+    if limit:
+        sql += " LIMIT %s"
+        params.append(int(limit))
+
+    try:
+        with default_connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+    except DatabaseError as e:
+        logger.error(f"Full-text search failed for {query!r}: {e}")
+        return None
+
+
+def preserve_order(queryset, ids: List[int]):
+    """Order a queryset by the position of each id in `ids` (rank order)."""
+    if not ids:
+        return queryset.none()
+    ordering = Case(*[When(id=pk, then=pos) for pos, pk in enumerate(ids)])
+    return queryset.filter(id__in=ids).order_by(ordering)
@@ -105,6 +105,8 @@ urlpatterns = [
     path('api/search/<str:name>/', views.search, name='search'),
     path('api/colleges/detailed/', views.DetailedSearchListView.as_view(),
          name="detailed-college-search"),
+    path('api/colleges/nearby/', views.NearbyCollegeListView.as_view(),
+         name="nearby-college-search"),
     path('api/posts/<int:post_pk>/comments/', CommentListView.as_view()),
     path('api/comments/<int:pk>/', CommentDetailView.as_view()),
     path('api/comments/<int:pk>/edit/',
@@ -149,7 +151,7 @@ urlpatterns = [
     path('api/cities/autocomplete/', views.CityAutoCompleteView.as_view(), name='city-autocomplete'),
     path('api/programs/autocomplete/', views.ProgramAutoCompleteView.as_view(), name='program-autocomplete'),
     path('api/colleges/autocomplete/', views.CollegeAutoCompleteView.as_view(), name='college-autocomplete'),
-    path('api/ai/chat/', views.AIChatView.as_view(), name='ai-chat'),
+    path('api/ai/chat/', (views.AsyncAIChatView if settings.ASYNC_CHAT_VIEW else views.AIChatView).as_view(), name='ai-chat'),
     path('api/ai/history/', views.ChatHistoryView.as_view(), name='ai-history'),
     path('api/colleges/recommendations/', views.CollegeRecommendationView.as_view(), name='college-recommendations'),
     path('api/advisors/', views.AdvisorListView.as_view(), name='advisor-list'),
@@ -161,6 +163,7 @@ urlpatterns = [
     path('api/payments/verify/', views.VerifyStripePaymentView.as_view(), name='payments-verify'),
     path('api/payments/webhook/', csrf_exempt(views.StripeWebhookView.as_view()), name='payments-webhook'),
     path('api/admin/ai-telemetry/', views.AITelemetryView.as_view(), name='admin-ai-telemetry'),
+    path('api/admin/search-cache/', views.SearchCacheStatsView.as_view(), name='admin-search-cache'),
     path('api/admin/revenue/', views.RevenueAnalyticsView.as_view(), name='admin-revenue'),
     path('api/meetings/', views.UserMeetingsView.as_view(), name='user-meetings'),
     path('api/advisors/<int:advisor_id>/availability/', views.AdvisorAvailabilityView.as_view(), name='advisor-availability-public'),
@@ -172,6 +175,7 @@ urlpatterns = [
     path('api/admin/advertisements/', views.AdminAdvertisementView.as_view(), name='admin-ad-list-create'),
     path('api/admin/advertisements/<int:pk>/', views.AdminAdvertisementDetailView.as_view(), name='admin-ad-detail'),
     path('upload4/', views.UploadApiView4.as_view(), name='upload_file4'),
+    path('api/import-jobs/<uuid:token>/', views.ImportJobStatusView.as_view(), name='import-job-status'),
 
 ]
 
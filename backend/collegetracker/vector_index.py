@@ -0,0 +1,185 @@
+import glob
+import json
+import logging
+import os
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from collegetracker.bulk_upsert import content_hash
+from collegetracker.embeddings import HashingEmbeddings, embed_in_batches, load_index_embeddings
+
+logger = logging.getLogger(__name__)
+
+# Names the live version's files; replacing it is what publishes an update
+MANIFEST_FILE = "manifest.json"
+# Versions kept on disk, so a worker that read the previous manifest can still load its files
+KEEP_VERSIONS = 2
+LEGACY_FILES = ["index.faiss", "index.pkl", "embedding.json", "hashing_idf.npy"]
+
+
+class IndexUpdate(NamedTuple):
+    version: int
+    added: int
+    updated: int
+    removed: int
+    unchanged: int
+    rebuilt: bool
+
+
+def read_manifest(index_path: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(index_path, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def index_file_version(index_path: str) -> Optional[Tuple[int, int]]:
+    """
+    Cheap change check for running workers: the manifest's inode and mtime
+    (os.replace gives it a new inode). None when there is no index; indexes
+    from before the manifest report (0, 0).
+    """
+    try:
+        stat = os.stat(os.path.join(index_path, MANIFEST_FILE))
+        return stat.st_ino, stat.st_mtime_ns
+    except FileNotFoundError:
+        return (0, 0) if os.path.exists(os.path.join(index_path, "index.faiss")) else None
+
+
+def manifest_embeddings(index_path: str, manifest: Optional[dict]) -> Embeddings:
+    if manifest is None:
+        return load_index_embeddings(index_path)
+    return load_index_embeddings(index_path, spec=manifest['embedding'], idf_file=manifest.get('idf_file'))
+
+
+def load_vector_store(index_path: str, embeddings: Optional[Embeddings] = None,
+                      manifest: Optional[dict] = None) -> Tuple[FAISS, Optional[dict]]:
+    """Load the live version of the index (or a pre-manifest index) with its manifest."""
+    manifest = manifest or read_manifest(index_path)
+    if embeddings is None:
+        embeddings = manifest_embeddings(index_path, manifest)
+    index_name = manifest['index_name'] if manifest else "index"
+    store = FAISS.load_local(index_path, embeddings, index_name=index_name, allow_dangerous_deserialization=True)
+    return store, manifest
+
+
+def _empty_store(embeddings: Embeddings, dim: int) -> FAISS:
+    # IndexIDMap: vectors are labelled with the college id, so one college's
+    # vector can be replaced or removed without renumbering the rest
+    index = faiss.IndexIDMap(faiss.IndexFlatL2(dim))
+    return FAISS(embeddings, index, InMemoryDocstore(), {})
+
+
+def update_vector_index(index_path: str, documents: List[Document], embeddings: Embeddings,
+                        batch_size: int = 100, workers: int = 4, full: bool = False,
+                        on_batch: Optional[Callable[[int, int], None]] = None) -> IndexUpdate:
+    """
+    Bring the index at `index_path` in line with `documents` (one per
+    college, keyed by metadata['id']). Only documents whose content hash
+    differs from the manifest are embedded; colleges no longer present are
+    removed. The result is written as a new version and published by
+    replacing the manifest. A full rebuild happens when asked, when there is
+    no manifest yet, or when the embedding backend changed.
+    """
+    manifest = read_manifest(index_path)
+    rebuilt = full or manifest is None or manifest['embedding'] != embeddings.spec()
+    hashes = {str(doc.metadata['id']): content_hash([doc.page_content, doc.metadata]) for doc in documents}
+
+    if rebuilt:
+        previous = {}
+        store = None
+        idf_file = None
+        if isinstance(embeddings, HashingEmbeddings):
+            embeddings.fit([doc.page_content for doc in documents])
+    else:
+        previous = manifest['documents']
+        # The saved embeddings, not a fresh instance: hashing IDF weights stay those the index was built with
+        store, _ = load_vector_store(index_path)
+        embeddings = store.embeddings
+        idf_file = manifest.get('idf_file')
+
+    changed = [doc for doc in documents if previous.get(str(doc.metadata['id'])) != hashes[str(doc.metadata['id'])]]
+    removed = sum(1 for key in previous if key not in hashes)
+    version = (manifest['version'] if manifest else 0) + 1
+    result = IndexUpdate(
+        version=version,
+        added=sum(1 for doc in changed if str(doc.metadata['id']) not in previous),
+        updated=sum(1 for doc in changed if str(doc.metadata['id']) in previous),
+        removed=removed,
+        unchanged=len(documents) - len(changed),
+        rebuilt=rebuilt,
+    )
+    if not rebuilt and not changed and not removed:
+        return result._replace(version=manifest['version'])
+
+    vectors = embed_in_batches(embeddings, [doc.page_content for doc in changed],
+                               batch_size=batch_size, workers=workers, on_batch=on_batch)
+    if store is None:
+        store = _empty_store(embeddings, len(vectors[0]) if vectors else _embedding_dim(embeddings))
+
+    changed_ids = {str(doc.metadata['id']) for doc in changed}
+    stale = [key for key in previous if key in changed_ids or key not in hashes]
+    if stale:
+        store.index.remove_ids(np.array([int(key) for key in stale], dtype=np.int64))
+        store.docstore.delete(stale)
+        for key in stale:
+            store.index_to_docstore_id.pop(int(key), None)
+    if changed:
+        ids = np.array([int(doc.metadata['id']) for doc in changed], dtype=np.int64)
+        store.index.add_with_ids(np.array(vectors, dtype=np.float32), ids)
+        store.docstore.add({str(doc.metadata['id']): doc for doc in changed})
+        store.index_to_docstore_id.update({int(doc.metadata['id']): str(doc.metadata['id']) for doc in changed})
+
+    os.makedirs(index_path, exist_ok=True)
+    index_name = f"index.v{version}"
+    store.save_local(index_path, index_name=index_name)
+    if rebuilt and isinstance(embeddings, HashingEmbeddings):
+        idf_file = f"hashing_idf.v{version}.npy"
+        np.save(os.path.join(index_path, idf_file), embeddings.idf)
+
+    new_manifest = {
+        'version': version,
+        'index_name': index_name,
+        'embedding': embeddings.spec(),
+        'idf_file': idf_file,
+        'documents': hashes,
+    }
+    tmp_path = os.path.join(index_path, f"{MANIFEST_FILE}.tmp-{os.getpid()}")
+    with open(tmp_path, 'w') as f:
+        json.dump(new_manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(index_path, MANIFEST_FILE))
+
+    _prune(index_path, new_manifest, manifest)
+    return result
+
+
+def _embedding_dim(embeddings: Embeddings) -> int:
+    return len(embeddings.embed_query("dimension probe"))
+
+
+def _prune(index_path: str, manifest: dict, previous: Optional[dict]):
+    """Delete versions older than KEEP_VERSIONS and the pre-manifest files."""
+    oldest = manifest['version'] - KEEP_VERSIONS + 1
+    # IDF weights outlive their version while later incremental versions still use them
+    live_idf = {m.get('idf_file') for m in (manifest, previous) if m}
+    for path in glob.glob(os.path.join(index_path, "index.v*.*")) + glob.glob(os.path.join(index_path, "hashing_idf.v*.npy")):
+        name = os.path.basename(path)
+        try:
+            version = int(name.split('.v', 1)[1].split('.', 1)[0])
+        except ValueError:
+            continue
+        if version < oldest and name not in live_idf:
+            os.remove(path)
+    for name in LEGACY_FILES:
+        path = os.path.join(index_path, name)
+        if os.path.exists(path):
+            os.remove(path)
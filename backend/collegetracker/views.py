@@ -1,15 +1,14 @@
 import re
 import json
 import jwt
-import difflib
 from goose3 import Goose
 import stripe
 import time
-from .models import User, College, Comment, Post, Bookmark, Reply, Like, Friendship, SmartCollege, CollegeProgram, Article, Notification, ChatMessage, DirectMessage, LeadStatus, Review, Service, Meeting, Transaction, AICallLog, AdvisorAvailability, Advertisement
+from .models import User, College, Comment, Post, Bookmark, Reply, Like, Friendship, SmartCollege, CollegeProgram, Article, Notification, ChatMessage, DirectMessage, LeadStatus, Review, Service, Meeting, Transaction, AICallLog, AdvisorAvailability, Advertisement, ImportJob
 
 from django.http import JsonResponse, Http404
 from django.db import IntegrityError
-from .serializers import CollegeSerializer, UserSerializer, UploadFileSerializer, LoginSerializer, CommentSerializer, PostSerializer, BookmarkSerializer, ReplySerializer, LikeSerializer, FriendshipSerializer, SmartCollegeSerializer, CollegeProgramSerializer, ArticleSerializer, NotificationSerializer, ChatMessageSerializer, LeadStatusSerializer, ReviewSerializer, ServiceSerializer, MeetingSerializer
+from .serializers import CollegeSerializer, UserSerializer, UploadFileSerializer, LoginSerializer, CommentSerializer, PostSerializer, BookmarkSerializer, ReplySerializer, LikeSerializer, FriendshipSerializer, SmartCollegeSerializer, CollegeProgramSerializer, ArticleSerializer, NotificationSerializer, ChatMessageSerializer, LeadStatusSerializer, ReviewSerializer, ServiceSerializer, MeetingSerializer, ImportJobSerializer
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -19,6 +18,7 @@ from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework_simplejwt.tokens import RefreshToken
 import pandas as pd
 from django.shortcuts import render, redirect,  get_object_or_404
+from django.urls import reverse
 from django.contrib import messages
 from .forms import UploadFileForm
 from datetime import datetime
@@ -34,8 +34,6 @@ from django.contrib.contenttypes.models import ContentType
 import time
 from django.db.models import Q
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-import chardet
-from io import StringIO
 import feedparser
 import requests
 import os
@@ -43,9 +41,46 @@ from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 from django.conf import settings
 from django.core.cache import cache
+from collegetracker.college_index import get_college_index, SORT_ORDERINGS
+from collegetracker.text_search import match_filter, ranked_college_ids, preserve_order, rebuild_search_index
+from collegetracker.data_version import bump_data_version
+from collegetracker.suggestions import suggest_college_names
+from collegetracker.autocomplete import autocomplete
+from collegetracker.recommendations import recommend_college_ids
+from collegetracker.geo_index import get_geo_index, MAX_DISTANCE_KM
+from collegetracker.search_cache import cached_search, search_cache_stats
+from collegetracker.streaming import stream_queryset
+from collegetracker.import_jobs import enqueue_import
+from collegetracker.pagination import wants_cursor, keyset_page, id_list_page, encode_row_cursor, CursorPage, InvalidCursor, RANK_ORDERING
 from datetime import datetime, timedelta
 load_dotenv()
 
+# Free-text search shortcuts shared by search() and DetailedSearchListView
+STATE_NAME_TO_ABBR = {
+    'alabama': 'AL', 'alaska': 'AK', 'arizona': 'AZ', 'arkansas': 'AR', 'california': 'CA',
+    'colorado': 'CO', 'connecticut': 'CT', 'delaware': 'DE', 'florida': 'FL', 'georgia': 'GA',
+    'hawaii': 'HI', 'idaho': 'ID', 'illinois': 'IL', 'indiana': 'IN', 'iowa': 'IA',
+    'kansas': 'KS', 'kentucky': 'KY', 'louisiana': 'LA', 'maine': 'ME', 'maryland': 'MD',
+    'massachusetts': 'MA', 'michigan': 'MI', 'minnesota': 'MN', 'mississippi': 'MS',
+    'missouri': 'MO', 'montana': 'MT', 'nebraska': 'NE', 'nevada': 'NV', 'new hampshire': 'NH',
+    'new jersey': 'NJ', 'new mexico': 'NM', 'new york': 'NY', 'north carolina': 'NC',
+    'north dakota': 'ND', 'ohio': 'OH', 'oklahoma': 'OK', 'oregon': 'OR', 'pennsylvania': 'PA',
+    'rhode island': 'RI', 'south carolina': 'SC', 'south dakota': 'SD', 'tennessee': 'TN',
+    'texas': 'TX', 'utah': 'UT', 'vermont': 'VT', 'virginia': 'VA', 'washington': 'WA',
+    'west virginia': 'WV', 'wisconsin': 'WI', 'wyoming': 'WY', 'washington dc': 'DC', 'district of columbia': 'DC'
+}
+
+IVY_LEAGUE = [
+    'Brown University',
+    'Columbia University in the City of New York',
+    'Cornell University',
+    'Dartmouth College',
+    'Harvard University',
+    'Princeton University',
+    'University of Pennsylvania',
+    'Yale University'
+]
+
 # Removed dangling decorator
 
 
@@ -385,9 +420,8 @@ class OnlinePingView(APIView):
 api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticatedOrReadOnly])
 def colleges(request):
-    data = College.objects.all()
-    serializer = CollegeSerializer(data, many=True)
-    return JsonResponse({"colleges": serializer.data})
+    data = College.objects.with_programs_count().order_by('id')
+    return stream_queryset(request, data, CollegeSerializer, key='colleges')
 
 
 class FeaturedCollegesView(generics.ListAPIView):
@@ -395,12 +429,17 @@ class FeaturedCollegesView(generics.ListAPIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_queryset(self):
-        return College.objects.filter(
+        return College.objects.with_programs_count().filter(
             state__in=['MA', 'NY', 'CA'],
             admission_rate__isnull=False,
             admission_rate__gt=0.0
         ).order_by('admission_rate')[:9]
 
+    def list(self, request, *args, **kwargs):
+        data = cached_search('featured', request,
+                             lambda: self.get_serializer(self.get_queryset(), many=True).data)
+        return Response(data)
+
 
 class CollegeListView(APIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
@@ -409,8 +448,18 @@ class CollegeListView(APIView):
         page = int(request.query_params.get('page', 1))
         page_size = int(request.query_params.get('page_size', 9))
 
+        if wants_cursor(request):
+            colleges = keyset_page(College.objects.with_programs_count(), ('id',),
+                                   request.query_params.get('cursor'), page_size)
+            serializer = CollegeSerializer(colleges, many=True)
+            return Response({
+                'colleges': serializer.data,
+                'has_more': colleges.has_next(),
+                'next_cursor': colleges.next_cursor
+            })
+
         # Order the queryset!  Choose an appropriate field for ordering.
-        paginator = Paginator(College.objects.all().order_by('id'), page_size)
+        paginator = Paginator(College.objects.with_programs_count().order_by('id'), page_size)
 
         try:
             colleges = paginator.page(page)
@@ -460,9 +509,14 @@ class FilteredCollegeListView(generics.ListAPIView):
         if not states_param:
             raise ValidationError("The 'states' query parameter is required.")
         states_list = [state.strip() for state in states_param.split(',')]
-        queryset = College.objects.filter(state__in=states_list)
+        queryset = College.objects.with_programs_count().filter(state__in=states_list).order_by('id')
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return stream_queryset(request, queryset, self.get_serializer_class(),
+                               context=self.get_serializer_context())
+
 
 class FilteredSmartCollegeListView(generics.ListAPIView):
     serializer_class = SmartCollegeSerializer
@@ -473,14 +527,13 @@ class FilteredSmartCollegeListView(generics.ListAPIView):
         if not states_param:
             raise ValidationError("The 'states' query parameter is required.")
         states_list = [state.strip() for state in states_param.split(',')]
-        queryset = SmartCollege.objects.filter(state__in=states_list)
+        queryset = SmartCollege.objects.filter(state__in=states_list).order_by('id')
         return queryset
 
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
-        # print(serializer.data)
-        return Response({'colleges': serializer.data})
+        return stream_queryset(request, queryset, self.get_serializer_class(), key='colleges',
+                               context=self.get_serializer_context())
 
 
 class CollegeRecommendationView(APIView):
@@ -489,12 +542,27 @@ class CollegeRecommendationView(APIView):
     def get(self, request):
         user = request.user
         # Get colleges from the Bookmark model
-        bookmarked_college_ids = Bookmark.objects.filter(user=user).values_list('college_id', flat=True)
-        bookmarks = College.objects.filter(id__in=bookmarked_college_ids)
-        
-        if not bookmarks.exists():
+        bookmarked_college_ids = list(Bookmark.objects.filter(user=user).values_list('college_id', flat=True))
+
+        if not bookmarked_college_ids:
             return Response({'colleges': [], 'message': 'No bookmarks yet'}, status=status.HTTP_200_OK)
 
+        # Score the whole catalog against the bookmark centroid (cached per bookmark set)
+        recommended_ids = recommend_college_ids(user.id, bookmarked_college_ids)
+        if recommended_ids is None:
+            top_10 = self._ranked_by_query(bookmarked_college_ids)
+        else:
+            by_id = College.objects.with_programs_count().in_bulk(recommended_ids)
+            top_10 = [by_id[i] for i in recommended_ids if i in by_id]
+        serializer = CollegeSerializer(top_10, many=True)
+
+        return Response({'colleges': serializer.data}, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def _ranked_by_query(bookmarked_college_ids):
+        """Same-state candidates scored against the bookmark averages; used when the engine can't be built."""
+        bookmarks = College.objects.filter(id__in=bookmarked_college_ids)
+
         # 1. Build Profile
         states = list(bookmarks.values_list('state', flat=True).distinct())
         avg_sat = bookmarks.aggregate(Avg('sat_score'))['sat_score__avg'] or 1100
@@ -503,32 +571,26 @@ class CollegeRecommendationView(APIView):
 
         # 2. Query Candidates (Limit to relevant states)
         # Exclude already bookmarked
-        queryset = College.objects.filter(state__in=states).exclude(id__in=bookmarked_college_ids)
-        
-        # 3. Simple scoring in Python (for speed/simplicity since it's filtered by states)
-        # For even more speed, we could do this in SQL but Python is fine for <1000 records
+        queryset = College.objects.with_programs_count().filter(state__in=states).exclude(id__in=bookmarked_college_ids)
         candidates = list(queryset[:500]) # Safety limit
-        
+
+        # 3. Score in Python
         scored_candidates = []
         for c in candidates:
             # Normalized differences
             sat_score = c.sat_score or 1100
             adm_rate = c.admission_rate or 0.6
             cost = c.cost_of_attendance or 30000
-            
+
             sat_diff = abs(sat_score - avg_sat) / 1600
             adm_diff = abs(adm_rate - avg_adm)
             cost_diff = abs(cost - avg_cost) / 60000
-            
+
             score = (sat_diff * 0.4) + (adm_diff * 0.4) + (cost_diff * 0.2)
             scored_candidates.append((c, score))
 
         scored_candidates.sort(key=lambda x: x[1]) # Lower is better
-        
-        top_10 = [c[0] for c in scored_candidates[:10]]
-        serializer = CollegeSerializer(top_10, many=True)
-        
-        return Response({'colleges': serializer.data}, status=status.HTTP_200_OK)
+        return [c[0] for c in scored_candidates[:10]]
 
 
 class CollegeProgramListView(APIView):
@@ -559,6 +621,37 @@ class CollegeProgramListView(APIView):
 #         return queryset
 
 
+def paginate_college_ids(ids, page, page_size, cursor=None, ordering=('id',)):
+    """
+    Paginate an already-ordered list of College ids (from the college index or
+    the full-text index) and load only the current page's rows. Passing a
+    cursor (even an empty one) switches to cursor pages; `ordering` names the
+    columns the ids are sorted by so the next cursor also works for the ORM path,
+    or is RANK_ORDERING for orders no column holds.
+    """
+    if cursor is not None:
+        page_ids, start, has_more = id_list_page(ids, cursor, page_size, ordering=ordering)
+        by_id = College.objects.with_programs_count().in_bulk(page_ids)
+        rows = [by_id[i] for i in page_ids if i in by_id]
+        next_cursor = None
+        if has_more and rows:
+            next_cursor = encode_row_cursor(rows[-1], ordering, offset=start + page_ids.index(rows[-1].id))
+        return CursorPage(rows, next_cursor)
+
+    paginator = Paginator(ids, page_size)
+    try:
+        colleges = paginator.page(page)
+    except PageNotAnInteger:
+        colleges = paginator.page(1)
+    except EmptyPage:
+        colleges = paginator.page(paginator.num_pages)
+
+    page_ids = list(colleges.object_list)
+    by_id = College.objects.with_programs_count().in_bulk(page_ids)
+    colleges.object_list = [by_id[i] for i in page_ids if i in by_id]
+    return colleges
+
+
 class ProgramSearchListView(generics.ListAPIView):
     serializer_class = CollegeSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
@@ -570,11 +663,19 @@ class ProgramSearchListView(generics.ListAPIView):
 
         page = int(self.request.query_params.get('page', 1))
         page_size = int(self.request.query_params.get('page_size', 12))
+        cursor = self.request.query_params.get('cursor', '') if wants_cursor(self.request) else None
 
-        queryset = College.objects.filter(
+        ranked_ids = ranked_college_ids(search_query, fields=('programs',))
+        if ranked_ids is not None:
+            return paginate_college_ids(ranked_ids, page, page_size, cursor=cursor, ordering=RANK_ORDERING)
+
+        queryset = College.objects.with_programs_count().filter(
             programs__cipdesc__icontains=search_query
         ).distinct()
 
+        if cursor is not None:
+            return keyset_page(queryset, ('name', 'id'), cursor, page_size)
+
         paginator = Paginator(queryset, page_size)
         try:
             colleges = paginator.page(page)
@@ -586,12 +687,17 @@ class ProgramSearchListView(generics.ListAPIView):
         return colleges
 
     def list(self, request, *args, **kwargs):
+        return Response(cached_search('program_search', request, self._list_payload,
+                                      defaults={'page': '1', 'page_size': '12'}))
+
+    def _list_payload(self):
         queryset = self.filter_queryset(self.get_queryset())
         serializer = self.get_serializer(queryset, many=True)
-        return Response({
+        return {
             'colleges': serializer.data,
-            'has_more': queryset.has_next()
-        })
+            'has_more': queryset.has_next(),
+            'next_cursor': getattr(queryset, 'next_cursor', None)
+        }
 
 
 class DetailedSearchListView(generics.ListAPIView):
@@ -599,7 +705,44 @@ class DetailedSearchListView(generics.ListAPIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_queryset(self):
-        queryset = College.objects.all()
+        page = int(self.request.query_params.get('page', 1))
+        page_size = int(self.request.query_params.get('page_size', 12))
+        cursor = self.request.query_params.get('cursor', '') if wants_cursor(self.request) else None
+
+        if getattr(settings, 'COLLEGE_INDEX_ENABLED', False):
+            colleges = self._search_college_index(page, page_size, cursor)
+            if colleges is not None:
+                return colleges
+
+        queryset = self.filter_colleges(College.objects.with_programs_count())
+
+        # Add Ordering
+        # id tiebreak keeps pages stable across requests (and matches the college index)
+        sort_param = self.request.query_params.get('sort', 'name')
+        if cursor is not None:
+            ordering = SORT_ORDERINGS.get(sort_param, SORT_ORDERINGS['name'])
+            return keyset_page(queryset, ordering, cursor, page_size)
+
+        if sort_param == 'admission_rate':
+            queryset = queryset.order_by('admission_rate', 'id')
+        elif sort_param == 'cost':
+            queryset = queryset.order_by('cost_of_attendance', 'id')
+        elif sort_param == 'grad_rate':
+            queryset = queryset.order_by('-grad_rate', 'id')
+        else:
+            queryset = queryset.order_by('name', 'id')
+
+        paginator = Paginator(queryset, page_size)
+        try:
+            colleges = paginator.page(page)
+        except PageNotAnInteger:
+            colleges = paginator.page(1)
+        except EmptyPage:
+            colleges = paginator.page(paginator.num_pages)
+        return colleges
+
+    def filter_colleges(self, queryset):
+        """Apply the detailed-search filters in the query string to a College queryset."""
         state_param = self.request.query_params.get('state', None)
         city_param = self.request.query_params.get('city', None)
         program_param = self.request.query_params.get('program', None)
@@ -614,8 +757,6 @@ class DetailedSearchListView(generics.ListAPIView):
         max_cost_param = self.request.query_params.get('max_cost', None)
         min_admission_param = self.request.query_params.get('min_admission', None)
         max_admission_param = self.request.query_params.get('max_admission', None)
-        page = int(self.request.query_params.get('page', 1))
-        page_size = int(self.request.query_params.get('page_size', 12))
 
         if state_param:
             queryset = queryset.filter(state__iexact=state_param)
@@ -628,41 +769,21 @@ class DetailedSearchListView(generics.ListAPIView):
         
         if name_param and name_param.lower() != 'all':
             name_lower = name_param.lower()
-            state_map = {
-                'alabama': 'AL', 'alaska': 'AK', 'arizona': 'AZ', 'arkansas': 'AR', 'california': 'CA',
-                'colorado': 'CO', 'connecticut': 'CT', 'delaware': 'DE', 'florida': 'FL', 'georgia': 'GA',
-                'hawaii': 'HI', 'idaho': 'ID', 'illinois': 'IL', 'indiana': 'IN', 'iowa': 'IA',
-                'kansas': 'KS', 'kentucky': 'KY', 'louisiana': 'LA', 'maine': 'ME', 'maryland': 'MD',
-                'massachusetts': 'MA', 'michigan': 'MI', 'minnesota': 'MN', 'mississippi': 'MS',
-                'missouri': 'MO', 'montana': 'MT', 'nebraska': 'NE', 'nevada': 'NV', 'new hampshire': 'NH',
-                'new jersey': 'NJ', 'new mexico': 'NM', 'new york': 'NY', 'north carolina': 'NC',
-                'north dakota': 'ND', 'ohio': 'OH', 'oklahoma': 'OK', 'oregon': 'OR', 'pennsylvania': 'PA',
-                'rhode island': 'RI', 'south carolina': 'SC', 'south dakota': 'SD', 'tennessee': 'TN',
-                'texas': 'TX', 'utah': 'UT', 'vermont': 'VT', 'virginia': 'VA', 'washington': 'WA',
-                'west virginia': 'WV', 'wisconsin': 'WI', 'wyoming': 'WY', 'washington dc': 'DC', 'district of columbia': 'DC'
-            }
-
             if name_lower == 'hbcu':
                 queryset = queryset.filter(hbcu=True)
-            elif name_lower in state_map:
-                queryset = queryset.filter(state__iexact=state_map[name_lower])
+            elif name_lower in STATE_NAME_TO_ABBR:
+                queryset = queryset.filter(state__iexact=STATE_NAME_TO_ABBR[name_lower])
             elif name_lower in ['ivy', 'ivy league']:
-                ivy_list = [
-                    'Brown University', 
-                    'Columbia University in the City of New York', 
-                    'Cornell University', 
-                    'Dartmouth College', 
-                    'Harvard University', 
-                    'Princeton University', 
-                    'University of Pennsylvania', 
-                    'Yale University'
-                ]
-                queryset = queryset.filter(name__in=ivy_list)
+                queryset = queryset.filter(name__in=IVY_LEAGUE)
             else:
-                queryset = queryset.filter(
-                    Q(name__icontains=name_param) |
-                    Q(programs__cipdesc__icontains=name_param)
-                ).distinct()
+                text_match = match_filter(name_param)
+                if text_match is not None:
+                    queryset = queryset.filter(text_match)
+                else:
+                    queryset = queryset.filter(
+                        Q(name__icontains=name_param) |
+                        Q(programs__cipdesc__icontains=name_param)
+                    ).distinct()
 
         if control_param:
             queryset = queryset.filter(control=control_param)
@@ -711,8 +832,12 @@ class DetailedSearchListView(generics.ListAPIView):
                 pass
 
         if program_param:
-            queryset = queryset.filter(
-                programs__cipdesc__icontains=program_param).distinct()
+            program_match = match_filter(program_param, fields=('programs',))
+            if program_match is not None:
+                queryset = queryset.filter(program_match)
+            else:
+                queryset = queryset.filter(
+                    programs__cipdesc__icontains=program_param).distinct()
         if min_sat_param:
             try:
                 min_sat = int(min_sat_param)
@@ -726,58 +851,166 @@ class DetailedSearchListView(generics.ListAPIView):
             except ValueError:
                 pass
 
-        # Add Ordering
+        return queryset
+
+    def _search_college_index(self, page, page_size, cursor=None):
+        """
+        Answer the structured filters from the in-memory college index. Returns
+        None when the request needs text matching (name/program) so the caller
+        falls back to the ORM query.
+        """
+        ids = self._college_index_ids()
+        if ids is None:
+            return None
         sort_param = self.request.query_params.get('sort', 'name')
-        if sort_param == 'admission_rate':
-            queryset = queryset.order_by('admission_rate')
-        elif sort_param == 'cost':
-            queryset = queryset.order_by('cost_of_attendance')
-        elif sort_param == 'grad_rate':
-            queryset = queryset.order_by('-grad_rate')
-        else:
-            queryset = queryset.order_by('name')
+        return paginate_college_ids(ids.tolist(), page, page_size, cursor=cursor,
+                                    ordering=SORT_ORDERINGS.get(sort_param, SORT_ORDERINGS['name']))
 
-        paginator = Paginator(queryset, page_size)
-        try:
-            colleges = paginator.page(page)
-        except PageNotAnInteger:
-            colleges = paginator.page(1)
-        except EmptyPage:
-            colleges = paginator.page(paginator.num_pages)
-        return colleges
+    def _college_index_ids(self):
+        """Matching ids in sort order from the college index, or None if the ORM must answer."""
+        params = self.request.query_params
+        if params.get('program'):
+            return None
+
+        states = [params['state']] if params.get('state') else []
+        names = None
+        hbcu = params.get('hbcu') == 'true'
+
+        name_param = params.get('name')
+        if name_param and name_param.lower() != 'all':
+            name_lower = name_param.lower()
+            if name_lower == 'hbcu':
+                hbcu = True
+            elif name_lower in STATE_NAME_TO_ABBR:
+                states.append(STATE_NAME_TO_ABBR[name_lower])
+            elif name_lower in ['ivy', 'ivy league']:
+                names = IVY_LEAGUE
+            else:
+                return None
+
+        control = None
+        if params.get('control'):
+            try:
+                control = int(params['control'])
+            except ValueError:
+                return None
+
+        def parse(key, cast):
+            try:
+                return cast(params[key]) if params.get(key) else None
+            except ValueError:
+                return None
+
+        index = get_college_index()
+        if index is None:
+            return None
+
+        ids = index.search(
+            states=states,
+            city=params.get('city'),
+            names=names,
+            control=control,
+            locale_category=params.get('locale_category'),
+            hbcu=hbcu,
+            hsi=params.get('hsi') == 'true',
+            cost_range=(parse('min_cost', int), parse('max_cost', int)),
+            admission_range=(parse('min_admission', float), parse('max_admission', float)),
+            sat_range=(parse('min_sat', int), parse('max_sat', int)),
+            sort=params.get('sort', 'name'),
+        )
+        return ids
 
     def list(self, request, *args, **kwargs):
+        return Response(cached_search('detailed_search', request, self._list_payload,
+                                      defaults={'sort': 'name', 'page': '1', 'page_size': '12'}))
+
+    def _list_payload(self):
         queryset = self.filter_queryset(self.get_queryset())
         serializer = self.get_serializer(queryset, many=True)
         data = serializer.data
         suggestion = None
+        suggestions = []
         
         name_param = self.request.query_params.get('name', None)
         if not data and name_param:
-            # Try intelligent fuzzy matching
-            name_lower = name_param.lower()
-            original_names = list(College.objects.values_list('name', flat=True))
-            
-            def get_score(n):
-                n_lower = n.lower()
-                ratio = difflib.SequenceMatcher(None, name_lower, n_lower).ratio()
-                # Bonus if any word starts with the first 3 letters of query
-                if any(word.startswith(name_lower[:3]) for word in n_lower.split()):
-                    ratio += 0.4
-                return ratio
-
-            scored_matches = sorted([(get_score(n), n) for n in original_names], key=lambda x: x[0], reverse=True)
-            
-            if scored_matches and scored_matches[0][0] > 0.4:
-                suggestion = scored_matches[0][1]
+            # "Did you mean" candidates from the per-worker trigram index
+            suggestions = suggest_college_names(name_param)
+            if suggestions:
+                suggestion = suggestions[0]
                 # We do NOT overwrite data with the suggested college here 
                 # because the suggested college likely doesn't match the user's active filters.
                 # The suggestion string is returned separately and handled by the UI.
 
-        return Response({
+        return {
             'colleges': data,
             'has_more': queryset.has_next() if hasattr(queryset, 'has_next') else False,
-            'suggestion': suggestion
+            'next_cursor': getattr(queryset, 'next_cursor', None),
+            'suggestion': suggestion,
+            'suggestions': suggestions
+        }
+
+
+class NearbyCollegeListView(DetailedSearchListView):
+    """
+    Colleges around a point: ?lat=&lng= with radius_km (everything within the
+    radius) and/or k (the k nearest), combined with any detailed-search
+    filter. Results are nearest first and carry distance_km.
+    """
+    FILTER_PARAMS = ('state', 'city', 'program', 'name', 'control', 'locale_category', 'hbcu', 'hsi',
+                     'min_sat', 'max_sat', 'min_cost', 'max_cost', 'min_admission', 'max_admission')
+    DEFAULT_K = 12
+    MAX_K = 500
+
+    def get_queryset(self):
+        params = self.request.query_params
+        try:
+            lat = float(params['lat'])
+            lng = float(params['lng'])
+            radius_km = float(params['radius_km']) if params.get('radius_km') else None
+            k = int(params['k']) if params.get('k') else None
+        except (KeyError, ValueError):
+            raise serializers.ValidationError("'lat' and 'lng' are required; 'radius_km' and 'k' must be numbers.")
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180) or (radius_km is not None and radius_km <= 0):
+            raise serializers.ValidationError("Coordinates or radius out of range.")
+        if k is None and radius_km is None:
+            k = self.DEFAULT_K
+        if k is not None:
+            k = max(1, min(k, self.MAX_K))
+
+        page = int(params.get('page', 1))
+        page_size = int(params.get('page_size', 12))
+        cursor = params.get('cursor', '') if wants_cursor(self.request) else None
+
+        geo = get_geo_index()
+        if geo is None:
+            raise serializers.ValidationError("Location search is temporarily unavailable.")
+
+        # Restrict to colleges matching the detailed-search filters, if any
+        allowed = None
+        if any(params.get(key) for key in self.FILTER_PARAMS):
+            if getattr(settings, 'COLLEGE_INDEX_ENABLED', False):
+                allowed = self._college_index_ids()
+            if allowed is None:
+                allowed = list(self.filter_colleges(College.objects.all()).values_list('id', flat=True))
+
+        if k is not None:
+            ids, distances = geo.nearest(lat, lng, k, allowed=allowed,
+                                         max_radius_km=radius_km or MAX_DISTANCE_KM)
+        else:
+            ids, distances = geo.within_radius(lat, lng, radius_km, allowed=allowed)
+
+        self.distances = dict(zip(ids.tolist(), distances.tolist()))
+        return paginate_college_ids(ids.tolist(), page, page_size, cursor=cursor, ordering=RANK_ORDERING)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        data = self.get_serializer(queryset, many=True).data
+        for row in data:
+            row['distance_km'] = round(self.distances.get(row['id'], 0.0), 2)
+        return Response({
+            'colleges': data,
+            'has_more': queryset.has_next(),
+            'next_cursor': getattr(queryset, 'next_cursor', None)
         })
 
 
@@ -804,69 +1037,46 @@ api_view(['GET', 'POST'])
 
 @permission_classes([IsAuthenticatedOrReadOnly])
 def search(request, name):
+    payload = cached_search('search', request, lambda: _search_payload(name), extra={'name': name})
+    return JsonResponse(payload)
+
+
+def _search_payload(name):
     name_lower = name.lower()
     suggestion = None
+    suggestions = []
     
-    state_map = {
-        'alabama': 'AL', 'alaska': 'AK', 'arizona': 'AZ', 'arkansas': 'AR', 'california': 'CA',
-        'colorado': 'CO', 'connecticut': 'CT', 'delaware': 'DE', 'florida': 'FL', 'georgia': 'GA',
-        'hawaii': 'HI', 'idaho': 'ID', 'illinois': 'IL', 'indiana': 'IN', 'iowa': 'IA',
-        'kansas': 'KS', 'kentucky': 'KY', 'louisiana': 'LA', 'maine': 'ME', 'maryland': 'MD',
-        'massachusetts': 'MA', 'michigan': 'MI', 'minnesota': 'MN', 'mississippi': 'MS',
-        'missouri': 'MO', 'montana': 'MT', 'nebraska': 'NE', 'nevada': 'NV', 'new hampshire': 'NH',
-        'new jersey': 'NJ', 'new mexico': 'NM', 'new york': 'NY', 'north carolina': 'NC',
-        'north dakota': 'ND', 'ohio': 'OH', 'oklahoma': 'OK', 'oregon': 'OR', 'pennsylvania': 'PA',
-        'rhode island': 'RI', 'south carolina': 'SC', 'south dakota': 'SD', 'tennessee': 'TN',
-        'texas': 'TX', 'utah': 'UT', 'vermont': 'VT', 'virginia': 'VA', 'washington': 'WA',
-        'west virginia': 'WV', 'wisconsin': 'WI', 'wyoming': 'WY', 'washington dc': 'DC', 'district of columbia': 'DC'
-    }
-
     if name_lower == 'all':
-        data = College.objects.all().order_by('name')[:12]
+        data = College.objects.with_programs_count().order_by('name')[:12]
     elif name_lower == 'hbcu':
-        data = College.objects.filter(hbcu=True).order_by('name')[:12]
-    elif name_lower in state_map:
-        data = College.objects.filter(state__iexact=state_map[name_lower]).order_by('name')[:12]
+        data = College.objects.with_programs_count().filter(hbcu=True).order_by('name')[:12]
+    elif name_lower in STATE_NAME_TO_ABBR:
+        data = College.objects.with_programs_count().filter(state__iexact=STATE_NAME_TO_ABBR[name_lower]).order_by('name')[:12]
     elif name_lower in ['ivy', 'ivy league']:
-        ivy_list = [
-            'Brown University', 
-            'Columbia University in the City of New York', 
-            'Cornell University', 
-            'Dartmouth College', 
-            'Harvard University', 
-            'Princeton University', 
-            'University of Pennsylvania', 
-            'Yale University'
-        ]
-        data = College.objects.filter(name__in=ivy_list).order_by('name')[:12]
+        data = College.objects.with_programs_count().filter(name__in=IVY_LEAGUE).order_by('name')[:12]
     else:
-        data = College.objects.filter(
-            Q(name__icontains=name) |
-            Q(programs__cipdesc__icontains=name)
-        ).distinct()[:12]
+        ranked_ids = ranked_college_ids(name, limit=12)
+        if ranked_ids is not None:
+            data = preserve_order(College.objects.with_programs_count(), ranked_ids)
+        else:
+            data = College.objects.with_programs_count().filter(
+                Q(name__icontains=name) |
+                Q(programs__cipdesc__icontains=name)
+            ).distinct()[:12]
         
     if not data.exists() and name_lower not in ['hbcu', 'ivy', 'ivy league']:
         # Intelligent fuzzy match
-        original_names = list(College.objects.values_list('name', flat=True))
-        
-        def get_score(n):
-            n_lower = n.lower()
-            ratio = difflib.SequenceMatcher(None, name_lower, n_lower).ratio()
-            if any(word.startswith(name_lower[:3]) for word in n_lower.split()):
-                ratio += 0.4
-            return ratio
-
-        scored_matches = sorted([(get_score(n), n) for n in original_names], key=lambda x: x[0], reverse=True)
-        
-        if scored_matches and scored_matches[0][0] > 0.4:
-            suggestion = scored_matches[0][1]
-            data = College.objects.filter(name=suggestion)
+        suggestions = suggest_college_names(name)
+        if suggestions:
+            suggestion = suggestions[0]
+            data = College.objects.with_programs_count().filter(name=suggestion)
             
     serializer = CollegeSerializer(data, many=True)
-    return JsonResponse({
+    return {
         "college": serializer.data,
-        "suggestion": suggestion
-    })
+        "suggestion": suggestion,
+        "suggestions": suggestions
+    }
 
 
 @api_view(['POST'])
@@ -883,222 +1093,58 @@ def register(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UploadApiView(APIView):
+class BaseUploadJobView(APIView):
+    """
+    Accepts a CSV upload and queues it as an ImportJob for the
+    process_import_jobs worker instead of importing it inside the request.
+    Responds 202 with the job's token; poll import-job-status for progress.
+    """
     serializer_class = UploadFileSerializer
     parser_classes = [MultiPartParser, FormParser]
+    import_kind = None
 
     def post(self, request):
-        print(request)
-        try:
-            data = request.FILES['file']
-            # if not serializer.is_valid():
-            #     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-            df = pd.read_csv(data, sep=',', on_bad_lines="skip",
-                             index_col=False, na_values=None, na_filter=True, dtype='unicode').convert_dtypes()
-            print("df is here", df)
-
-            colleges = list()
-            for index, row in df.iterrows():
-                # enrollment_all = int(row['UG']) if pd.notna(
-                #     row['UG']) and not pd.isna(row['UG']) else print("row", row)
-
-                college, created = College.objects.get_or_create(
-                    name=row['INSTNM'],
-                    city=row['CITY'],
-                    state=row['STABBR'],
-                    website=row['INSTURL'],
-                    admission_rate=row['ADM_RATE'],
-                    sat_score=row['SAT_AVG'],
-                    cost_of_attendance=row['COSTT4_A'],
-                    tuition_in_state=row['TUITIONFEE_IN'],
-                    tuition_out_state=row['TUITIONFEE_OUT'],
-                    latitude=row['LATITUDE'],
-                    longitude=row['LONGITUDE'],
-                    ft_faculty_rate=row['PFTFAC'],
-                    enrollment_all=row['UGDS'],
-                    UNITID=row['UNITID']
-                )
-
-                if created:
-                    colleges.append(college)
-                    messages.success(
-                        request, f'Successfully imported {college.name}')
-                else:
-                    messages.warning(request, f'{college.name} already exists')
-            College.objects.bulk_create(colleges)
-            return Response({'message': 'File uploaded successfully'}, status=status.HTTP_201_CREATED)
-        except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = UploadFileSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+        job = enqueue_import(self.import_kind, serializer.validated_data['file'], request.user)
+        return Response({
+            'message': 'File accepted for import',
+            'job_id': job.token,
+            'status': job.status,
+            'status_url': request.build_absolute_uri(reverse('import-job-status', args=[job.token])),
+        }, status=status.HTTP_202_ACCEPTED)
 
-class UploadApiView2(APIView):
-    serializer_class = UploadFileSerializer
-    parser_classes = [MultiPartParser, FormParser]
-    # permission_classes = [IsAuthenticated]
 
-    def post(self, request):
-        try:
-            data = request.FILES['file']
-            raw_data = data.read()
-            encoding = chardet.detect(raw_data)['encoding']
-            if not encoding:
-                raise Exception("Could not detect the encoding of the file")
-            decoded_data = raw_data.decode(encoding, 'replace')
-            df = pd.read_csv(StringIO(decoded_data),  sep=',', on_bad_lines='skip', index_col=False,
-                             na_values=None, na_filter=True, dtype='unicode').convert_dtypes()
-
-            colleges = []
-            for index, row in df.iterrows():
-                try:
-                    unit_id = row['UNITID']
-                    college = College.objects.filter(
-                        Q(UNITID=unit_id)
-                    ).first()
+class UploadApiView(BaseUploadJobView):
+    import_kind = 'colleges'
 
-                    if college and all([college.admission_rate, college.sat_score, college.cost_of_attendance, college.tuition_in_state,
-                                        college.tuition_out_state, college.latitude, college.longitude,
-                                        college.ft_faculty_rate, college.enrollment_all,
-                                        row.get('HLOFFER'), row.get('CCBASIC')]):
-                        admission_rate = college.admission_rate
-                        sat_score = college.sat_score
-                        website = college.website
-                        cost_of_attendance = college.cost_of_attendance
-                        tuition_in_state = college.tuition_in_state
-                        tuition_out_state = college.tuition_out_state
-                        latitude = college.latitude
-                        longitude = college.longitude
-                        enrollment_all = college.enrollment_all
-                        ft_faculty_rate = college.ft_faculty_rate
-                        hloffers = str(row.get('HLOFFER')) if pd.notna(
-                            row.get('HLOFFER')) else None
-                        ccbasic = str(row.get('CCBASIC')) if pd.notna(
-                            row.get('CCBASIC')) else None
-                        smart_college, created = SmartCollege.objects.update_or_create(
-                            name=row['INSTNM'],
-                            defaults={
-                                'city': row['CITY'],
-                                'state': row['STABBR'],
-                                'website': website,
-                                'admission_rate': admission_rate,
-                                'sat_score': sat_score,
-                                'cost_of_attendance': cost_of_attendance,
-                                'tuition_in_state': tuition_in_state,
-                                'tuition_out_state': tuition_out_state,
-                                'latitude': latitude,
-                                'longitude': longitude,
-                                'enrollment_all': enrollment_all,
-                                'ft_faculty_rate': ft_faculty_rate,
-                                'HLOFFER': hloffers,
-                                'CCBASIC': ccbasic,
-                            }
-                        )
 
-                        if created:
-                            messages.success(
-                                request, f'Successfully imported {smart_college.name}')
-                        else:
-                            messages.warning(
-                                request, f'{smart_college.name} updated')
-                except (ValueError, KeyError) as e:
-                    messages.error(
-                        request, f"Error processing row {index+1}: {e}")
-            return Response({'message': 'File uploaded successfully'}, status=status.HTTP_201_CREATED)
-        except Exception as e:
-            messages.error(request, f"An unexpected error occurred: {e}")
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+class UploadApiView2(BaseUploadJobView):
+    # permission_classes = [IsAuthenticated]
+    import_kind = 'smart_colleges'
 
 
-class UploadApiView3(APIView):
-    serializer_class = UploadFileSerializer
-    parser_classes = [MultiPartParser, FormParser]
+class UploadApiView3(BaseUploadJobView):
     permission_classes = [IsAuthenticated]
+    import_kind = 'college_updates'
 
-    def post(self, request):
-        try:
-            data = request.FILES['file']
-            df = pd.read_csv(data, sep=',', on_bad_lines='skip', index_col=False,
-                             na_values=None, na_filter=True, dtype='unicode', encoding='latin1').convert_dtypes()
 
-            colleges = []
-            for index, row in df.iterrows():
-                try:
-                    unit_id = row['UNITID'] if pd.notna(
-                        row['UNITID']) else None
-                    enrollment_all = int(row['UG']) if pd.notna(
-                        row['UG']) and not pd.isna(row['UG']) else None
-                    college, created = College.objects.update_or_create(
-                        name=row['INSTNM'],
-                        defaults={
-                            'city': row['CITY'],
-                            'state': row['STABBR'],
-                            'website': row['INSTURL'],
-                            'admission_rate': row['ADM_RATE'],
-                            'sat_score': row['SAT_AVG'],
-                            'cost_of_attendance': row['COSTT4_A'],
-                            'tuition_in_state': row['TUITIONFEE_IN'],
-                            'tuition_out_state': row['TUITIONFEE_OUT'],
-                            'latitude': row['LATITUDE'],
-                            'longitude': row['LONGITUDE'],
-                            'ft_faculty_rate': row['PFTFAC'],
-                            'UNITID': unit_id,
-                            'enrollment_all': enrollment_all,
-                        }
-                    )
-                    if created:
-                        messages.success(
-                            request, f'Successfully imported {college.name}')
-                    else:
-                        messages.warning(request, f'{college.name} updated')
-                except (ValueError, KeyError) as e:
-                    messages.error(
-                        request, f"Error processing row {index+1}: {e}")
-            return Response({'message': 'File uploaded successfully'}, status=status.HTTP_201_CREATED)
-        except Exception as e:
-            messages.error(request, f"An unexpected error occurred: {e}")
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+class UploadApiView4(BaseUploadJobView):
+    # permission_classes = [IsAuthenticated]
+    import_kind = 'programs'
 
 
-class UploadApiView4(APIView):
-    serializer_class = UploadFileSerializer
-    parser_classes = [MultiPartParser, FormParser]
-    # permission_classes = [IsAuthenticated]
+class ImportJobStatusView(APIView):
+    permission_classes = [AllowAny]
 
-    def post(self, request):
-        try:
-            data = request.FILES['file']
-            df = pd.read_csv(data, sep=',', on_bad_lines='skip', index_col=False,
-                             na_values=None, na_filter=True, dtype='unicode', encoding='latin1').convert_dtypes()
-            programs = []
-            for index, row in df.iterrows():
-                try:
-                    unit_id = row['UNITID'] if pd.notna(
-                        row['UNITID']) else None
-                    college = College.objects.filter(Q(UNITID=unit_id)).first()
-                    if college:
-                        college_program, created = CollegeProgram.objects.get_or_create(
-                            college=college,
-                            cipcode=row['CIPCODE'],
-                            defaults={
-                                'cipdesc': row['CIPDESC'],
-                                'UNITID': unit_id,
-                                'creddesc': row['CREDDESC'],
-                            }
-                        )
-                        if created:
-                            print("college_program", college_program)
-                            messages.success(
-                                request, f'Successfully imported {college_program.cipdesc}')
-                        else:
-                            messages.warning(
-                                request, f'{college_program.cipdesc} updated')
-                except (ValueError, KeyError) as e:
-                    messages.error(
-                        request, f'Error processing row {index+1}: {e}')
-            return Response({'message': 'File uploaded successfully'}, status=status.HTTP_201_CREATED)
-        except Exception as e:
-            messages.error(request, f"An unexpected error occurred: {e}")
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    def get(self, request, token):
+        job = get_object_or_404(ImportJob, token=token)
+        # Anonymous uploads are visible to anyone holding the token, which only the uploader was sent
+        if job.created_by_id and job.created_by_id != request.user.id and not request.user.is_staff:
+            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+        return Response(ImportJobSerializer(job).data)
 
 
 class LikeListView(APIView):
@@ -1867,9 +1913,21 @@ class PostListView(APIView):
 
             # 4. Ordering
             if college_id:
-                qs = qs.order_by('-is_announcement', '-created_at')
+                ordering = ('-is_announcement', '-created_at', '-id')
             else:
-                qs = qs.order_by('-created_at')
+                ordering = ('-created_at', '-id')
+
+            if wants_cursor(request):
+                # Keyset page: no COUNT and no OFFSET however deep the feed is scrolled
+                posts_page = keyset_page(qs, ordering, request.query_params.get('cursor'), int(page_size))
+                serializer = PostSerializer(posts_page, many=True, context={'request': request})
+                return Response({
+                    'results': serializer.data,
+                    'has_next': posts_page.has_next(),
+                    'next_cursor': posts_page.next_cursor
+                }, status=status.HTTP_200_OK)
+
+            qs = qs.order_by(*ordering)
 
             # 5. Pagination
             paginator = Paginator(qs, page_size)
@@ -1886,6 +1944,8 @@ class PostListView(APIView):
                 'total_pages': paginator.num_pages,
                 'current_page': posts_page.number
             }, status=status.HTTP_200_OK)
+        except InvalidCursor as e:
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             import traceback
             print(traceback.format_exc())
@@ -2225,13 +2285,14 @@ class BookmarkedCollegesView(generics.ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        bookmarks = Bookmark.objects.filter(
-            user=user).select_related('college')
+        bookmarks = Bookmark.objects.filter(user=user)
         return bookmarks
 
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
-        colleges = [bookmark.college for bookmark in queryset]  # Process here
+        college_ids = list(queryset.values_list('college_id', flat=True))
+        by_id = College.objects.with_programs_count().in_bulk(college_ids)
+        colleges = [by_id[i] for i in college_ids if i in by_id]
         serializer = self.get_serializer(colleges, many=True)
         return Response(serializer.data)
 
@@ -2783,6 +2844,16 @@ class ArticleListView(APIView):
         else:
             articles = Article.objects.all()
 
+        if wants_cursor(request):
+            articles_page = keyset_page(articles, ('-created_at', '-id'),
+                                        request.query_params.get('cursor'), page_size)
+            serializer = ArticleSerializer(articles_page, many=True)
+            return Response({
+                'articles': serializer.data,
+                'has_more': articles_page.has_next(),
+                'next_cursor': articles_page.next_cursor
+            }, status=status.HTTP_200_OK)
+
         paginator = Paginator(articles, page_size)
         try:
             articles_page = paginator.page(page)
@@ -2870,8 +2941,10 @@ class CityAutoCompleteView(APIView):
         query = request.query_params.get('query', '')
         if len(query) < 2:
             return Response([])
-        cities = College.objects.filter(city__icontains=query).values_list(
-            'city', flat=True).distinct()[:10]
+        cities = autocomplete('city', query)
+        if cities is None:
+            cities = College.objects.filter(city__icontains=query).values_list(
+                'city', flat=True).distinct()[:10]
         return Response(list(cities))
 
 
@@ -2882,8 +2955,10 @@ class ProgramAutoCompleteView(APIView):
         query = request.query_params.get('query', '')
         if len(query) < 2:
             return Response([])
-        programs = CollegeProgram.objects.filter(cipdesc__icontains=query).values_list(
-            'cipdesc', flat=True).distinct()[:10]
+        programs = autocomplete('program', query)
+        if programs is None:
+            programs = CollegeProgram.objects.filter(cipdesc__icontains=query).values_list(
+                'cipdesc', flat=True).distinct()[:10]
         return Response(list(programs))
 
 class CollegeAutoCompleteView(APIView):
@@ -2893,13 +2968,21 @@ class CollegeAutoCompleteView(APIView):
         query = request.query_params.get('query', '')
         if len(query) < 2:
             return Response([])
-        colleges = College.objects.filter(name__icontains=query).values_list(
-            'name', flat=True).distinct()[:10]
+        colleges = autocomplete('college', query)
+        if colleges is None:
+            colleges = College.objects.filter(name__icontains=query).values_list(
+                'name', flat=True).distinct()[:10]
         return Response(list(colleges))
 
 from django.http import StreamingHttpResponse
-from langchain_community.vectorstores import FAISS
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from django.views import View
+from django.utils.decorators import method_decorator
+from django.contrib.auth.models import AnonymousUser
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from collegetracker.embeddings import VECTOR_INDEX_PATH, CachedQueryEmbeddings
+from collegetracker.vector_index import index_file_version, load_vector_store, manifest_embeddings, read_manifest
 import os
 
 # Configure Gemini once at module level and cache the model
@@ -2909,6 +2992,12 @@ from collegetracker.agent_engine import WormieManagedAgent
 _GEMINI_MODEL = None
 _VECTOR_STORE = None
 _EMBEDDINGS = None
+_EMBEDDINGS_SPEC = None
+# Manifest (inode, mtime) the loaded index came from; checked every few seconds
+# so workers pick up build_vector_index updates without a restart
+_VECTOR_INDEX_VERSION = None
+_VECTOR_INDEX_CHECKED_AT = 0.0
+VECTOR_INDEX_CHECK_INTERVAL = 5.0
 _MANAGED_AGENT = None
 
 def _get_managed_agent():
@@ -2931,17 +3020,27 @@ def _get_gemini_model():
     return _GEMINI_MODEL
 
 def _get_vector_store():
-    global _VECTOR_STORE, _EMBEDDINGS
-    index_path = "college_faiss_index"
-    if _VECTOR_STORE is None and os.path.exists(index_path):
-        try:
-            api_key = os.environ.get("GEMINI_API_KEY")
-            if api_key:
-                if _EMBEDDINGS is None:
-                    _EMBEDDINGS = GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001", google_api_key=api_key)
-                _VECTOR_STORE = FAISS.load_local(index_path, _EMBEDDINGS, allow_dangerous_deserialization=True)
-        except Exception as e:
-            print(f"Error loading FAISS index: {e}")
+    global _VECTOR_STORE, _EMBEDDINGS, _EMBEDDINGS_SPEC, _VECTOR_INDEX_VERSION, _VECTOR_INDEX_CHECKED_AT
+    now = time.monotonic()
+    if _VECTOR_STORE is not None and now - _VECTOR_INDEX_CHECKED_AT < VECTOR_INDEX_CHECK_INTERVAL:
+        return _VECTOR_STORE
+    _VECTOR_INDEX_CHECKED_AT = now
+
+    index_path = VECTOR_INDEX_PATH
+    version = index_file_version(index_path)
+    if version is None or version == _VECTOR_INDEX_VERSION:
+        return _VECTOR_STORE
+    try:
+        manifest = read_manifest(index_path)
+        spec = (manifest['embedding'], manifest.get('idf_file')) if manifest else None
+        if _EMBEDDINGS is None or spec != _EMBEDDINGS_SPEC:
+            # Same backend the index was built with; query vectors cached by normalized text
+            _EMBEDDINGS = CachedQueryEmbeddings(manifest_embeddings(index_path, manifest))
+            _EMBEDDINGS_SPEC = spec
+        _VECTOR_STORE, _ = load_vector_store(index_path, _EMBEDDINGS, manifest)
+        _VECTOR_INDEX_VERSION = version
+    except Exception as e:
+        print(f"Error loading FAISS index: {e}")
     return _VECTOR_STORE
 
 try:
@@ -2965,6 +3064,35 @@ class ChatHistoryView(APIView):
         return Response({'message': 'Chat history cleared'})
 
 
+def _chat_history(user, raw_history):
+    # Parse history for Gemini
+    gemini_history = []
+    for msg in raw_history:
+        role = msg.get('role')
+        content = msg.get('parts', [""])[0]
+        if role and content:
+            gemini_history.append({"role": role, "parts": [content]})
+
+    # --- CONVERSATIONAL PERSISTENCE: Restore history if UI was cleared ---
+    if not gemini_history and user.is_authenticated:
+        # Retrieve last 8 messages to maintain context even after visual clear
+        last_messages = ChatMessage.objects.filter(user=user).order_by('-created_at')[:8]
+        # Map and reverse to maintain chronological order for Gemini
+        for m in reversed(last_messages):
+            gemini_history.append({
+                "role": m.role if m.role else "user",
+                "parts": [m.content]
+            })
+    return gemini_history
+
+
+def _proactive_greeting(user):
+    if user.is_authenticated:
+        first_name = user.first_name or "there"
+        return f"👋 Hi {first_name}! I'm connected and ready to chat. Ask me anything about colleges!"
+    return "👋 Hi there! I'm Wormie. I can answer your college questions in real-time now."
+
+
 class AIChatView(APIView):
     permission_classes = [AllowAny]
 
@@ -2982,13 +3110,7 @@ class AIChatView(APIView):
         # --- SPECIAL: PROACTIVE GREETING (Keep generic for now or use LLM later) ---
         if user_message == "PROACTIVE_GREETING":
              # ... (Keep existing proactive logic or simplify. For now, let's keep it simple to focus on streaming chat)
-            response = ""
-            if request.user.is_authenticated:
-                 first_name = request.user.first_name or "there"
-                 response = f"👋 Hi {first_name}! I'm connected and ready to chat. Ask me anything about colleges!"
-            else:
-                 response = "👋 Hi there! I'm Wormie. I can answer your college questions in real-time now."
-            return Response({'reply': response}, status=status.HTTP_200_OK)
+            return Response({'reply': _proactive_greeting(request.user)}, status=status.HTTP_200_OK)
 
 
         # --- 1. GATHER CONTEXT FOR LLM (Hybrid Retrieval) ---
@@ -3281,25 +3403,7 @@ class AIChatView(APIView):
         try:
             agent = _get_managed_agent()
 
-            # Parse history for Gemini
-            raw_history = request.data.get('history', [])
-            gemini_history = []
-            for msg in raw_history:
-                role = msg.get('role')
-                content = msg.get('parts', [""])[0]
-                if role and content:
-                    gemini_history.append({"role": role, "parts": [content]})
-            
-            # --- CONVERSATIONAL PERSISTENCE: Restore history if UI was cleared ---
-            if not gemini_history and request.user.is_authenticated:
-                # Retrieve last 8 messages to maintain context even after visual clear
-                last_messages = ChatMessage.objects.filter(user=request.user).order_by('-created_at')[:8]
-                # Map and reverse to maintain chronological order for Gemini
-                for m in reversed(last_messages):
-                    gemini_history.append({
-                        "role": m.role if m.role else "user",
-                        "parts": [m.content]
-                    })
+            gemini_history = _chat_history(request.user, request.data.get('history', []))
 
             user_obj = request.user if request.user.is_authenticated else None
             stream_gen = agent.stream_chat(
@@ -3321,6 +3425,58 @@ class AIChatView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAIChatView(View):
+    """
+    ASGI version of AIChatView for the uvicorn deployment (ASYNC_CHAT_VIEW=True).
+    The Gemini round trips are awaited, so a long chat no longer pins one of the
+    server's threads while the other API endpoints wait behind it.
+
+    The hybrid-retrieval prompt AIChatView assembles is never passed to the
+    managed agent (it builds its own system prompt and fetches data through
+    tools), so this view skips it and only does the ORM work the agent uses.
+    """
+
+    async def post(self, request):
+        try:
+            auth = await sync_to_async(JWTAuthentication().authenticate)(request)
+        except AuthenticationFailed as e:
+            detail = e.detail if isinstance(e.detail, dict) else {'detail': e.detail}
+            return JsonResponse(detail, status=status.HTTP_401_UNAUTHORIZED)
+        user = auth[0] if auth else AnonymousUser()
+
+        try:
+            data = json.loads(request.body or b'{}')
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON body'}, status=status.HTTP_400_BAD_REQUEST)
+        user_message = data.get('message', '')
+
+        if user_message == "PROACTIVE_GREETING":
+            return JsonResponse({'reply': _proactive_greeting(user)})
+
+        # Save user message to memory
+        if user.is_authenticated:
+            await ChatMessage.objects.acreate(user=user, role='user', content=user_message)
+
+        try:
+            gemini_history = await sync_to_async(_chat_history)(user, data.get('history', []))
+            stream_gen = _get_managed_agent().astream_chat(
+                user_message=user_message,
+                user=user if user.is_authenticated else None,
+                chat_history=gemini_history
+            )
+        except Exception as e:
+            print(f"LLM Setup Error: {e}")
+            import traceback
+            traceback.print_exc()
+            return JsonResponse({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        response = StreamingHttpResponse(stream_gen, content_type='text/plain')
+        response['X-Accel-Buffering'] = 'no'
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+
 class AdvisorListView(APIView):
     permission_classes = [AllowAny]  # Publicly viewable marketplace
 
@@ -3657,6 +3813,9 @@ class AITelemetryView(APIView):
         total_calls = AICallLog.objects.count()
         success_calls = AICallLog.objects.filter(success=True).count()
         avg_latency = AICallLog.objects.filter(success=True).aggregate(Avg('latency_ms'))['latency_ms__avg'] or 0.0
+        avg_ttfb = AICallLog.objects.filter(success=True).aggregate(Avg('ttfb_ms'))['ttfb_ms__avg'] or 0.0
+        cache_hits = AICallLog.objects.filter(cache_hit=True).count()
+        latency_saved = AICallLog.objects.filter(cache_hit=True).aggregate(Sum('latency_saved_ms'))['latency_saved_ms__sum'] or 0
 
         logs_data = []
         for log in logs:
@@ -3666,6 +3825,8 @@ class AITelemetryView(APIView):
                 'prompt': log.prompt_summary,
                 'response': log.response_summary,
                 'latency_ms': log.latency_ms,
+                'ttfb_ms': log.ttfb_ms,
+                'cache_hit': log.cache_hit,
                 'success': log.success,
                 'created_at': log.created_at.isoformat()
             })
@@ -3674,10 +3835,22 @@ class AITelemetryView(APIView):
             'total_calls': total_calls,
             'success_rate': (success_calls / max(1, total_calls)) * 100,
             'avg_latency': avg_latency,
+            'avg_ttfb': avg_ttfb,
+            'cache_hit_rate': (cache_hits / max(1, total_calls)) * 100,
+            'latency_saved_ms': latency_saved,
             'logs': logs_data
         })
 
 
+class SearchCacheStatsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if not (request.user.is_staff or request.user.role == 'admin'):
+            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+        return Response(search_cache_stats())
+
+
 class RevenueAnalyticsView(APIView):
     permission_classes = [IsAuthenticated]
 
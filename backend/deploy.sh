@@ -5,11 +5,17 @@
 # This script handles the full deployment lifecycle:
 #   1. Runs database migrations against Cloud SQL (via proxy)
 #   2. Deploys the backend to Google Cloud Run
+#   3. Deploys the CSV import worker as a second Cloud Run service from the
+#      same image (PROCESS_TYPE=import-worker). The upload endpoints only queue
+#      ImportJobs; this service applies them. Uploads reach it through the
+#      private "import_jobs" bucket storage, so the web service must have
+#      GCS_BUCKET_NAME (or IMPORT_JOBS_BUCKET_NAME) set.
 #
 # Usage:
-#   ./deploy.sh              # Full deploy (migrate + deploy)
+#   ./deploy.sh              # Full deploy (migrate + deploy + worker)
 #   ./deploy.sh --migrate    # Only run migrations
 #   ./deploy.sh --deploy     # Only deploy to Cloud Run (skip migrations)
+#   ./deploy.sh --worker     # Only redeploy the import worker
 # =============================================================
 
 set -e  # Exit on any error
@@ -18,6 +24,7 @@ set -e  # Exit on any error
 PROJECT_ID="hischolar-49a2a"
 REGION="us-central1"
 SERVICE_NAME="collegetracker-api"
+WORKER_SERVICE_NAME="collegetracker-import-worker"
 CLOUD_SQL_INSTANCE="$PROJECT_ID:$REGION:collegetracker-db"
 PROXY_PORT=5433
 
@@ -60,6 +67,8 @@ if [ "$1" == "--migrate" ]; then
     MODE="migrate"
 elif [ "$1" == "--deploy" ]; then
     MODE="deploy"
+elif [ "$1" == "--worker" ]; then
+    MODE="worker"
 fi
 
 # --- Determine Python & Virtualenv ---
@@ -89,7 +98,7 @@ echo "================================================"
 # =============================================================
 # STEP 1: Run Migrations (unless --deploy only)
 # =============================================================
-if [ "$MODE" != "deploy" ]; then
+if [ "$MODE" == "full" ] || [ "$MODE" == "migrate" ]; then
     log_step "Starting Cloud SQL Proxy..."
 
     # Check if cloud-sql-proxy is available
@@ -154,7 +163,7 @@ fi
 # =============================================================
 # STEP 2: Deploy to Cloud Run (unless --migrate only)
 # =============================================================
-if [ "$MODE" != "migrate" ]; then
+if [ "$MODE" == "full" ] || [ "$MODE" == "deploy" ]; then
     log_step "Deploying to Google Cloud Run..."
     echo "  Service: $SERVICE_NAME"
     echo "  Region:  $REGION"
@@ -175,5 +184,47 @@ if [ "$MODE" != "migrate" ]; then
     echo -e "${GREEN}================================================${NC}"
 fi
 
+# =============================================================
+# STEP 3: Deploy the import worker (full deploy or --worker)
+# =============================================================
+if [ "$MODE" == "full" ] || [ "$MODE" == "worker" ]; then
+    log_step "Deploying the import worker..."
+    echo "  Service: $WORKER_SERVICE_NAME"
+
+    # Same image, environment and database as the web service; only the process differs
+    SERVICE_JSON=$(gcloud run services describe "$SERVICE_NAME" --region "$REGION" --format=json)
+    IMAGE=$(echo "$SERVICE_JSON" | $PYTHON -c 'import json, sys; print(json.load(sys.stdin)["spec"]["template"]["spec"]["containers"][0]["image"])')
+    WORKER_ENV=$(echo "$SERVICE_JSON" | $PYTHON -c '
+import json, sys
+env = json.load(sys.stdin)["spec"]["template"]["spec"]["containers"][0].get("env", [])
+plain = {e["name"]: e["value"] for e in env if "value" in e and e["name"] != "PROCESS_TYPE"}
+if not (plain.get("GCS_BUCKET_NAME") or plain.get("IMPORT_JOBS_BUCKET_NAME")):
+    sys.exit("no GCS_BUCKET_NAME")
+for e in env:
+    if "valueFrom" in e:
+        print("secret %s is not copied; add it to the worker with --update-secrets" % e["name"], file=sys.stderr)
+plain["PROCESS_TYPE"] = "import-worker"
+# "^@@^" switches gcloud list parsing to an @@ delimiter, since values may contain commas
+print("^@@^" + "@@".join(f"{k}={v}" for k, v in plain.items()))
+') || {
+        log_err "$SERVICE_NAME has no GCS_BUCKET_NAME: queued uploads would stay on the web container's disk, out of the worker's reach."
+        exit 1
+    }
+
+    # Always on with CPU outside requests: the worker polls the queue rather than serving traffic
+    gcloud run deploy "$WORKER_SERVICE_NAME" \
+        --image "$IMAGE" \
+        --region "$REGION" \
+        --set-env-vars "$WORKER_ENV" \
+        --set-cloudsql-instances "$CLOUD_SQL_INSTANCE" \
+        --no-allow-unauthenticated \
+        --no-cpu-throttling \
+        --min-instances 1 \
+        --max-instances 1 \
+        --quiet
+
+    log_ok "Import worker deployed."
+fi
+
 echo ""
 log_ok "All done! 🎉"